@@ -104,10 +104,13 @@ class BuildAdmin(admin.ModelAdmin):
         'cpu', 
         'gpu', 
         'motherboard',
+        'total_price',
+        'benchmark_score',
         'is_public', 
         'created_at'
     ]
     list_filter = ['is_public', 'created_at']
+    readonly_fields = ['total_price', 'total_tdp', 'benchmark_score']
     search_fields = ['name', 'user__username', 'description']
     raw_id_fields = ['user']
     date_hierarchy = 'created_at'
\ No newline at end of file
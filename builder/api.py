@@ -0,0 +1,371 @@
+"""JSON API каталога и сборок (только чтение).
+
+Фильтры и сортировки списков те же, что у HTML-страниц (см. catalog.py).
+Параметр fields ограничивает набор полей: ?fields=id,name,avg_used_price.
+
+На каждый ответ выдаётся сильный ETag, посчитанный по updated_at:
+для списка — по max(updated_at) и числу строк под фильтром (одним
+агрегатным запросом), для сборки — по updated_at сборки и её компонентов.
+Если клиент прислал совпадающий If-None-Match, декоратор condition
+отвечает 304 до загрузки и сериализации данных.
+
+Списки отдаются потоком: строки читаются из БД чанками через iterator()
+и сериализуются по одной, без сборки всего ответа в памяти.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+
+from .builds import check_selection, request_build
+from .cache import get_versions
+from .catalog import (
+    RANKING_BUCKETS, RANKING_LIMIT, RANKING_MAX_LIMIT, best_value, catalog_facets, filtered_catalog,
+)
+from .compatibility import CATALOG_FIELDS
+from .models import Build
+
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def _etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def _catalog_queryset(slot, params):
+    if slot not in CATALOG_FIELDS:
+        raise Http404('Неизвестный тип комплектующих')
+    return filtered_catalog(slot, params)
+
+
+def _query_params(request):
+    return sorted((name, request.GET.getlist(name)) for name in request.GET)
+
+
+def _selected_fields(request, allowed):
+    """Запрошенные поля в порядке allowed; None — если есть неизвестные"""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(allowed)
+    names = {name.strip() for name in requested.split(',') if name.strip()}
+    if names - set(allowed):
+        return None
+    return [name for name in allowed if name in names]
+
+
+def _model_fields(model):
+    return [field.attname if field.is_relation else field.name for field in model._meta.concrete_fields]
+
+
+# ---------- каталог ----------
+
+def catalog_etag(request, slot):
+    queryset, _ = _catalog_queryset(slot, request.GET)
+    state = queryset.order_by().aggregate(last_update=Max('updated_at'), count=Count('pk'))
+    last_update = state['last_update'].isoformat() if state['last_update'] else None
+    return _etag('catalog', slot, last_update, state['count'], _query_params(request))
+
+
+def _stream_list(queryset, fields):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield '{"results": ['
+    for number, row in enumerate(queryset.values(*fields).iterator(chunk_size=STREAM_CHUNK_SIZE)):
+        yield (',' if number else '') + encoder.encode(row)
+    yield ']}'
+
+
+@require_safe
+@condition(etag_func=catalog_etag)
+def catalog_list(request, slot):
+    """Список комплектующих с фильтрами, сортировкой и выбором полей"""
+    queryset, filters = _catalog_queryset(slot, request.GET)
+    fields = _selected_fields(request, _model_fields(queryset.model))
+    if fields is None:
+        return JsonResponse({'error': 'Неизвестное поле в параметре fields.'}, status=400)
+    sort = filters['sort']
+    queryset = queryset.order_by(sort, '-pk' if sort.startswith('-') else 'pk')
+    return StreamingHttpResponse(_stream_list(queryset, fields), content_type='application/json')
+
+
+# ---------- сборки ----------
+
+BUILD_FIELDS = [
+    'id', 'name', 'description', 'user', 'is_public', 'created_at', 'updated_at',
+    'total_price', 'total_tdp', 'benchmark_score', 'recommended_psu', 'components', 'compatibility',
+]
+
+
+def facets_etag(request, slot):
+    # Количества зависят от всего каталога, а не только от отфильтрованной части
+    if slot not in CATALOG_FIELDS:
+        raise Http404('Неизвестный тип комплектующих')
+    return _etag('facets', slot, get_versions(slot), _query_params(request))
+
+
+@require_safe
+@condition(etag_func=facets_etag)
+def facet_counts(request, slot):
+    """Количества по значениям фасетов при текущих фильтрах (те же параметры, что у списка)"""
+    _, filters = _catalog_queryset(slot, request.GET)
+    return JsonResponse({'facets': catalog_facets(slot, filters)}, json_dumps_params={'ensure_ascii': False})
+
+
+def _visible_build(request, pk):
+    # Сборка нужна и для ETag, и для ответа: request_build загружает её один раз на запрос
+    loaded = request_build(request, pk)
+    if loaded is None:
+        raise Http404('Сборка не найдена')
+    if not loaded.visible_to(request.user):
+        return None
+    return loaded
+
+
+def build_etag(request, pk):
+    loaded = _visible_build(request, pk)
+    if loaded is None:
+        # Для чужой приватной сборки не выдаём даже ETag
+        return None
+    stamps = [loaded.build.updated_at.isoformat()]
+    for _, component in loaded.components:
+        stamps.append(component.updated_at.isoformat() if component else None)
+    return _etag('build', pk, stamps, _query_params(request))
+
+
+def serialize_build(loaded):
+    build = loaded.build
+    components = {
+        slot: {name: getattr(component, name) for name in _model_fields(type(component))} if component else None
+        for slot, component in loaded.components
+    }
+    return {
+        'id': build.pk,
+        'name': build.name,
+        'description': build.description,
+        'user': build.user.username,
+        'is_public': build.is_public,
+        'created_at': build.created_at,
+        'updated_at': build.updated_at,
+        'total_price': loaded.total_price,
+        'total_tdp': loaded.total_tdp,
+        'benchmark_score': loaded.benchmark_score,
+        'recommended_psu': loaded.recommended_psu,
+        'components': components,
+        'compatibility': loaded.compatibility_dicts(),
+    }
+
+
+@require_safe
+@condition(etag_func=build_etag)
+def build_detail(request, pk):
+    """Сборка с компонентами, итогами и результатами проверки совместимости"""
+    loaded = _visible_build(request, pk)
+    if loaded is None:
+        return JsonResponse({'error': 'Эта сборка приватная.'}, status=403)
+    fields = _selected_fields(request, BUILD_FIELDS)
+    if fields is None:
+        return JsonResponse({'error': 'Неизвестное поле в параметре fields.'}, status=400)
+    data = serialize_build(loaded)
+    response = JsonResponse({name: data[name] for name in fields}, json_dumps_params={'ensure_ascii': False})
+    response['Vary'] = 'Cookie'
+    return response
+
+
+@require_safe
+def build_compare(request):
+    """Показатели нескольких сборок (?ids=1,2,3) и лучшие значения"""
+    from .comparison import BuildComparison, load_builds, parse_build_ids
+
+    comparison = BuildComparison(load_builds(parse_build_ids(request.GET), request.user))
+    response = JsonResponse({'builds': comparison.as_json()}, json_dumps_params={'ensure_ascii': False})
+    response['Vary'] = 'Cookie'
+    return response
+
+
+def _upgrades_response(queryset):
+    from .upgrades import advise_upgrades, serialize_upgrade, suggested_components
+
+    advice = advise_upgrades(queryset)
+    components = suggested_components(advice)
+    return {
+        pk: {slot: serialize_upgrade(upgrade, components) for slot, upgrade in result.items()}
+        for pk, result in advice.items()
+    }
+
+
+@require_safe
+def build_upgrades(request, pk):
+    """Лучшая совместимая замена процессора и видеокарты по приросту score на рубль"""
+    loaded = _visible_build(request, pk)
+    if loaded is None:
+        return JsonResponse({'error': 'Сборка недоступна.'}, status=403)
+    build = loaded.build
+    upgrades = _upgrades_response(Build.objects.filter(pk=build.pk))
+    response = JsonResponse({'id': build.pk, 'upgrades': upgrades[build.pk]}, json_dumps_params={'ensure_ascii': False})
+    response['Vary'] = 'Cookie'
+    return response
+
+
+@require_safe
+def my_builds_upgrades(request):
+    """То же для всех сборок текущего пользователя одним пакетом"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Требуется вход.'}, status=401)
+    upgrades = _upgrades_response(Build.objects.filter(user=request.user))
+    response = JsonResponse({
+        'builds': [{'id': pk, 'upgrades': result} for pk, result in sorted(upgrades.items())],
+    }, json_dumps_params={'ensure_ascii': False})
+    response['Vary'] = 'Cookie'
+    return response
+
+
+# ---------- рейтинг цена/производительность ----------
+
+RANKING_FIELDS = ['id', 'name', 'manufacturer', 'benchmark_score', 'avg_used_price', 'score_per_rub']
+
+
+def ranking_etag(request, slot):
+    if slot not in RANKING_BUCKETS:
+        raise Http404('Рейтинг есть только для процессоров и видеокарт')
+    state = CATALOG_FIELDS[slot][0].objects.aggregate(last_update=Max('updated_at'), count=Count('pk'))
+    last_update = state['last_update'].isoformat() if state['last_update'] else None
+    return _etag('ranking', slot, last_update, state['count'], _query_params(request))
+
+
+@require_safe
+@condition(etag_func=ranking_etag)
+def best_value_ranking(request, slot):
+    """Лучшие по score на рубль внутри сокета (CPU) или объёма памяти (GPU).
+
+    ?socket=AM4 / ?vram=8 — одна группа, без параметра — все группы;
+    ?limit= — размер топа в каждой группе.
+    """
+    field = RANKING_BUCKETS[slot]
+    bucket = request.GET.get(field) or None
+    if bucket is not None:
+        try:
+            bucket = CATALOG_FIELDS[slot][0]._meta.get_field(field).to_python(bucket)
+        except ValidationError:
+            return JsonResponse({'error': f'Неверное значение {field}.'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', RANKING_LIMIT)), 1), RANKING_MAX_LIMIT)
+    except ValueError:
+        limit = RANKING_LIMIT
+    buckets = best_value(slot, bucket, limit)
+    return JsonResponse({
+        'group_by': field,
+        'groups': [
+            {
+                field: value,
+                'items': [{name: getattr(item, name) for name in RANKING_FIELDS} for item in items],
+            }
+            for value, items in buckets.items()
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+# ---------- поиск ----------
+
+def _component_url(slot, pk):
+    # Отдельные страницы есть только у процессоров и видеокарт
+    if slot in ('cpu', 'gpu'):
+        return reverse(f'{slot}_detail', args=[pk])
+    return reverse(f'{slot}_list')
+
+
+@require_safe
+def search(request):
+    """Поиск по названию, производителю и чипсету во всех типах деталей.
+
+    ?q= — запрос (опечатки и пробелы не важны), ?slot=cpu,gpu — типы,
+    ?limit= — число результатов.
+    """
+    from .search import SEARCH_LIMIT, SEARCH_MAX_LIMIT, SLOTS, search_catalog
+
+    query = request.GET.get('q', '').strip()
+    slots = [slot for slot in request.GET.get('slot', '').split(',') if slot]
+    if any(slot not in SLOTS for slot in slots):
+        return JsonResponse({'error': 'Неизвестный тип деталей.'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        limit = SEARCH_LIMIT
+    results = search_catalog(query, slots or None, limit) if query else []
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'slot': slot,
+                'id': component.pk,
+                'name': str(component),
+                'avg_used_price': component.avg_used_price,
+                'score': score,
+                'url': _component_url(slot, component.pk),
+            }
+            for slot, component, score in results
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+# ---------- проверка совместимости в конфигураторе ----------
+
+@require_safe
+def compatibility_check(request):
+    """Совместимость и итоги несохранённой сборки: ?cpu=1&motherboard=2...
+
+    Любой слот можно не указывать. Детали берутся из индекса
+    совместимости в памяти, запросов к БД нет.
+    """
+    selected = {}
+    for slot in Build.COMPONENT_FIELDS:
+        value = request.GET.get(slot, '').strip()
+        if not value:
+            continue
+        if not value.isdigit():
+            return JsonResponse({'error': f'Некорректный id в параметре {slot}.'}, status=400)
+        selected[slot] = int(value)
+    result, missing = check_selection(selected)
+    return JsonResponse({
+        'components': {slot: selected[slot] if component else None for slot, component in result.components},
+        'missing': missing,
+        'compatible': result.is_compatible,
+        'errors': [issue.message for issue in result.compatibility if issue.type == 'error'],
+        'warnings': [issue.message for issue in result.compatibility if issue.type == 'warning'],
+        'total_price': result.total_price,
+        'total_tdp': result.total_tdp,
+        'benchmark_score': result.benchmark_score,
+        'recommended_psu': result.recommended_psu,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+# ---------- варианты для формы сборки ----------
+
+@require_safe
+async def component_options(request, slot):
+    """Совместимые варианты для type-ahead в форме сборки.
+
+    ?q= — слова из подписи, ?cpu=1&motherboard=2... — уже выбранные детали,
+    ?limit= — число вариантов. Совместимость и подписи берутся из памяти
+    процесса; запросы к БД нужны только для их первой загрузки.
+    """
+    from .choices import OPTIONS_LIMIT, OPTIONS_MAX_LIMIT, compatible_options
+
+    if slot not in CATALOG_FIELDS:
+        raise Http404('Неизвестный тип комплектующих')
+    selected = {
+        other: int(request.GET[other])
+        for other in Build.COMPONENT_FIELDS
+        if other != slot and request.GET.get(other, '').isdigit()
+    }
+    try:
+        limit = min(max(int(request.GET.get('limit', OPTIONS_LIMIT)), 1), OPTIONS_MAX_LIMIT)
+    except ValueError:
+        limit = OPTIONS_LIMIT
+    query = request.GET.get('q', '').strip()
+    results = await sync_to_async(compatible_options)(slot, selected, query, limit)
+    return JsonResponse({'slot': slot, 'query': query, 'results': results}, json_dumps_params={'ensure_ascii': False})
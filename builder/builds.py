@@ -0,0 +1,140 @@
+"""Загрузка сборки для страницы, API и выгрузок.
+
+Сборка, все шесть компонентов и владелец читаются одним запросом
+(select_related). Совместимость, итоги и данные графика бюджета
+считаются один раз и складываются в неизменяемый LoadedBuild, который
+дальше используют view, API и график — без повторных обращений к
+компонентам и без ленивых запросов из шаблона.
+
+В пределах одного HTTP-запроса сборка загружается один раз
+(request_build, в async view — arequest_build): API берёт её и для
+ETag, и для ответа.
+
+Для ещё не сохранённой сборки (конфигуратор) то же самое считает
+check_selection: детали берутся из индекса совместимости в памяти, а
+проверка и итоги — те же check_compatibility и методы Build, поэтому
+запросов к БД нет.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from .charts import budget_chart_spec, budget_items
+from .compatibility import get_index
+from .models import Build
+from .rules import get_rules
+
+
+BUILD_RELATED = ('user', *Build.COMPONENT_FIELDS)
+
+CompatibilityIssue = namedtuple('CompatibilityIssue', 'type message')
+
+
+def check_compatibility(build):
+    """Проверка совместимости компонентов (правила из rules.py)"""
+    return get_rules().check(build)
+
+
+class LoadedBuild(namedtuple('LoadedBuild', [
+    'build', 'components', 'compatibility', 'total_price', 'total_tdp',
+    'recommended_psu', 'benchmark_score', 'budget_items',
+])):
+    """Сборка с посчитанными совместимостью, итогами и данными графика.
+
+    components — пары (слот, компонент или None) в порядке Build.COMPONENT_FIELDS,
+    compatibility — кортеж CompatibilityIssue, budget_items — пары (подпись, цена)
+    для графика (они же ключ кэша HTML графика в charts.render_budget_chart).
+    Сам объект build изменять не следует: результат считается по нему один раз.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_build(cls, build):
+        return cls(
+            build=build,
+            components=tuple((slot, getattr(build, slot)) for slot in Build.COMPONENT_FIELDS),
+            compatibility=tuple(CompatibilityIssue(**issue) for issue in check_compatibility(build)),
+            total_price=Decimal(build.get_total_price()).quantize(Decimal('0.01')),
+            total_tdp=build.get_total_tdp(),
+            recommended_psu=build.get_recommended_psu_wattage(),
+            benchmark_score=build.get_benchmark_score(),
+            budget_items=budget_items(build),
+        )
+
+    @property
+    def is_compatible(self):
+        return all(issue.type != 'error' for issue in self.compatibility)
+
+    @property
+    def chart_spec(self):
+        """Описание графика бюджета для plotly.js (None, если цен нет)"""
+        return budget_chart_spec(self.budget_items) if self.budget_items else None
+
+    def visible_to(self, user):
+        """Приватную сборку видит только владелец"""
+        return self.build.is_public or (user.is_authenticated and self.build.user_id == user.pk)
+
+    def compatibility_dicts(self):
+        return [issue._asdict() for issue in self.compatibility]
+
+
+class SpecBuild(namedtuple('SpecBuild', Build.COMPONENT_FIELDS)):
+    """Несохранённая сборка из спецификаций индекса совместимости.
+
+    У спецификаций есть все поля, которые читают правила совместимости и
+    методы итогов Build, поэтому они используются как есть.
+    """
+    __slots__ = ()
+
+    BASE_TDP = Build.BASE_TDP
+    PSU_MARGIN = Build.PSU_MARGIN
+    GPU_SCORE_WEIGHT = Build.GPU_SCORE_WEIGHT
+    CPU_SCORE_WEIGHT = Build.CPU_SCORE_WEIGHT
+
+    get_total_price = Build.get_total_price
+    get_total_tdp = Build.get_total_tdp
+    get_recommended_psu_wattage = Build.get_recommended_psu_wattage
+    get_benchmark_score = Build.get_benchmark_score
+
+
+def check_selection(selected):
+    """Совместимость и итоги для набора {слот: pk} без обращения к БД.
+
+    Возвращает LoadedBuild (его build — SpecBuild) и слоты, для которых
+    pk в каталоге не найден; такие слоты считаются невыбранными.
+    """
+    index = get_index()
+    specs, missing = {}, []
+    for slot in Build.COMPONENT_FIELDS:
+        pk = selected.get(slot)
+        spec = index.get(slot, pk) if pk is not None else None
+        if pk is not None and spec is None:
+            missing.append(slot)
+        specs[slot] = spec
+    return LoadedBuild.from_build(SpecBuild(**specs)), missing
+
+
+def load_build(pk):
+    """Сборка с компонентами и владельцем одним запросом (None, если её нет)"""
+    build = Build.objects.select_related(*BUILD_RELATED).filter(pk=pk).first()
+    return LoadedBuild.from_build(build) if build is not None else None
+
+
+async def aload_build(pk):
+    """load_build через async ORM"""
+    build = await Build.objects.select_related(*BUILD_RELATED).filter(pk=pk).afirst()
+    return LoadedBuild.from_build(build) if build is not None else None
+
+
+def request_build(request, pk):
+    """load_build с запоминанием на время HTTP-запроса"""
+    cache = request.__dict__.setdefault('_loaded_builds', {})
+    if pk not in cache:
+        cache[pk] = load_build(pk)
+    return cache[pk]
+
+
+async def arequest_build(request, pk):
+    cache = request.__dict__.setdefault('_loaded_builds', {})
+    if pk not in cache:
+        cache[pk] = await aload_build(pk)
+    return cache[pk]
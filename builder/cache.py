@@ -0,0 +1,100 @@
+"""Кэш отрендеренных фрагментов каталога, главной и страниц сборок.
+
+Фрагменты хранятся без TTL. Вместо удаления по таймауту каждый ключ
+содержит «версию» данных, из которых он построен:
+
+* для каталога — счётчик версии типа комплектующих, который увеличивается
+  сигналами post_save/post_delete (см. signals.py);
+* для сборки — updated_at самой сборки и всех её компонентов.
+
+После изменения данных старые ключи просто перестают запрашиваться
+и вытесняются бэкендом кэша.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+
+VERSION_KEY = 'builder:version:{}'
+
+
+def get_versions(*names):
+    """Текущие версии по именам (cpu, gpu, ..., build)"""
+    keys = {VERSION_KEY.format(name): name for name in names}
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Ключ мог быть вытеснен: новая версия не должна совпасть со старыми
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+async def aget_versions(*names):
+    """get_versions для async view (асинхронный API кэша)"""
+    keys = {VERSION_KEY.format(name): name for name in names}
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), None)
+            found[key] = await cache.aget(key)
+    return tuple(found[key] for key in keys)
+
+
+def bump_version(name):
+    key = VERSION_KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def make_key(prefix, *parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'builder:{prefix}:{digest}'
+
+
+def _normalized_filters(filters):
+    return tuple(sorted(
+        (name, str(value).strip())
+        for name, value in filters.items()
+        if value not in (None, '')
+    ))
+
+
+def catalog_fragment_key(slot, **filters):
+    """Ключ фрагмента списка: версия каталога + нормализованные фильтры"""
+    return make_key(f'catalog:{slot}', get_versions(slot), _normalized_filters(filters))
+
+
+async def acatalog_fragment_key(slot, **filters):
+    return make_key(f'catalog:{slot}', await aget_versions(slot), _normalized_filters(filters))
+
+
+def build_fragment_key(build):
+    """Ключ фрагмента сборки: updated_at сборки и всех её компонентов"""
+    stamps = [build.pk, build.updated_at.isoformat()]
+    for slot in build.COMPONENT_FIELDS:
+        component = getattr(build, slot)
+        stamps.append((slot, component.pk, component.updated_at.isoformat()) if component else (slot, None))
+    return make_key('build', *stamps)
+
+
+def cached_fragment(key, render):
+    """HTML из кэша или результат render(), сохранённый без срока жизни"""
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, None)
+    return mark_safe(html)
+
+
+async def acached_fragment(key, render):
+    """cached_fragment для async view: render — корутина"""
+    html = await cache.aget(key)
+    if html is None:
+        html = await render()
+        await cache.aset(key, html, None)
+    return mark_safe(html)
@@ -0,0 +1,299 @@
+"""Фильтры и сортировки списков каталога.
+
+Общие для HTML-страниц каталога и JSON API: параметр запроса -> lookup
+модели. Значения, которые нельзя привести к типу поля, игнорируются,
+так же как неизвестная сортировка заменяется сортировкой по умолчанию.
+"""
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Case, Count, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from .cache import aget_versions, get_versions, make_key
+from .compatibility import CATALOG_FIELDS
+
+
+CATALOG_FILTERS = {
+    'cpu': {
+        'socket': 'socket',
+        'manufacturer': 'manufacturer__icontains',
+        'min_price': 'avg_used_price__gte',
+        'max_price': 'avg_used_price__lte',
+        'price_below': 'avg_used_price__lt',
+    },
+    'gpu': {
+        'manufacturer': 'manufacturer__icontains',
+        'vram': 'vram',
+        'min_price': 'avg_used_price__gte',
+        'max_price': 'avg_used_price__lte',
+        'price_below': 'avg_used_price__lt',
+    },
+    'motherboard': {
+        'socket': 'socket',
+        'form_factor': 'form_factor',
+        'memory_type': 'memory_type',
+        'manufacturer': 'manufacturer__icontains',
+        'min_price': 'avg_used_price__gte',
+        'max_price': 'avg_used_price__lte',
+        'price_below': 'avg_used_price__lt',
+    },
+    'ram': {
+        'memory_type': 'memory_type',
+        'capacity': 'capacity',
+        'manufacturer': 'manufacturer__icontains',
+        'min_price': 'avg_used_price__gte',
+        'max_price': 'avg_used_price__lte',
+        'price_below': 'avg_used_price__lt',
+    },
+    'psu': {
+        'efficiency': 'efficiency',
+        'min_wattage': 'wattage__gte',
+        'manufacturer': 'manufacturer__icontains',
+        'min_price': 'avg_used_price__gte',
+        'max_price': 'avg_used_price__lte',
+        'price_below': 'avg_used_price__lt',
+    },
+    'case': {
+        'form_factor': 'form_factor',
+        'manufacturer': 'manufacturer__icontains',
+        'min_price': 'avg_used_price__gte',
+        'max_price': 'avg_used_price__lte',
+        'price_below': 'avg_used_price__lt',
+    },
+}
+
+# Сортировка по умолчанию и допустимые сортировки
+CATALOG_SORTS = {
+    'cpu': ('-benchmark_score', [
+        'avg_used_price', '-avg_used_price', 'benchmark_score', '-benchmark_score', 'name', '-score_per_rub',
+    ]),
+    'gpu': ('-benchmark_score', [
+        'avg_used_price', '-avg_used_price', 'benchmark_score', '-benchmark_score', 'name', '-score_per_rub',
+    ]),
+    'motherboard': ('name', ['avg_used_price', '-avg_used_price', 'name']),
+    'ram': ('-capacity', ['avg_used_price', '-avg_used_price', 'capacity', '-capacity', 'speed', '-speed']),
+    'psu': ('-wattage', ['avg_used_price', '-avg_used_price', 'wattage', '-wattage']),
+    'case': ('name', ['avg_used_price', '-avg_used_price', 'name', 'max_gpu_length']),
+}
+
+
+def filtered_catalog(slot, params):
+    """Queryset каталога с фильтрами из params и словарь применённых фильтров.
+
+    В словаре есть все параметры фильтров слота (None, если не заданы)
+    и ключ sort с уже проверенной сортировкой.
+    """
+    model = CATALOG_FIELDS[slot][0]
+    queryset = model.objects.all()
+    filters = {}
+    for param, lookup in CATALOG_FILTERS[slot].items():
+        value = params.get(param) or None
+        if value is not None:
+            field = model._meta.get_field(lookup.split('__')[0])
+            try:
+                field.to_python(value)
+            except ValidationError:
+                value = None
+            else:
+                queryset = queryset.filter(**{lookup: value})
+        filters[param] = value
+
+    default_sort, sorts = CATALOG_SORTS[slot]
+    sort = params.get('sort', default_sort)
+    filters['sort'] = sort if sort in sorts else default_sort
+    return queryset, filters
+
+
+# ---------- рейтинг цена/производительность ----------
+
+# Поле, внутри значений которого строится рейтинг
+RANKING_BUCKETS = {
+    'cpu': 'socket',
+    'gpu': 'vram',
+}
+RANKING_LIMIT = 10
+RANKING_MAX_LIMIT = 100
+
+
+def best_value(slot, bucket=None, limit=RANKING_LIMIT):
+    """Топ-limit позиций по score_per_rub: {значение группы: [позиции]}.
+
+    Для одной группы — выборка по индексу (группа, score_per_rub, id),
+    для всех групп сразу — один запрос с ROW_NUMBER() OVER (PARTITION BY ...).
+    """
+    model = CATALOG_FIELDS[slot][0]
+    field = RANKING_BUCKETS[slot]
+    # score_per_rub = 0 у позиций без цены; условие по нему же оставляет в плане индекс
+    queryset = model.objects.filter(score_per_rub__gt=0)
+    if bucket is not None:
+        items = queryset.filter(**{field: bucket}).order_by('-score_per_rub', '-pk')[:limit]
+        return {bucket: list(items)}
+
+    ranked = queryset.annotate(rank=Window(
+        RowNumber(),
+        partition_by=F(field),
+        order_by=[F('score_per_rub').desc(), F('pk').desc()],
+    )).filter(rank__lte=limit).order_by(field, 'rank')
+    buckets = {}
+    for item in ranked:
+        buckets.setdefault(getattr(item, field), []).append(item)
+    return buckets
+
+
+# ---------- фасеты ----------
+
+# Поля, по значениям которых показываются количества (параметр фильтра = имя поля)
+FACETS = {
+    'cpu': ('socket', 'manufacturer'),
+    'gpu': ('vram', 'manufacturer'),
+    'motherboard': ('socket', 'form_factor', 'memory_type', 'manufacturer'),
+    'ram': ('memory_type', 'capacity', 'manufacturer'),
+    'psu': ('efficiency', 'manufacturer'),
+    'case': ('form_factor', 'manufacturer'),
+}
+
+# Границы ценовых диапазонов, ₽. Диапазон полуоткрытый: [нижняя, верхняя),
+# поэтому ссылка фасета фильтрует по min_price и price_below (строго меньше),
+# а не по max_price, который включает границу
+PRICE_BUCKETS = (5000, 10000, 20000, 40000, 80000)
+
+# Фильтры-диапазоны применяются в SQL; фильтры по значению — при подсчёте фасетов
+RANGE_LOOKUPS = ('__gte', '__lte', '__gt', '__lt')
+
+
+def _price_bucket():
+    return Case(
+        *[When(avg_used_price__lt=edge, then=Value(number)) for number, edge in enumerate(PRICE_BUCKETS)],
+        default=Value(len(PRICE_BUCKETS)),
+        output_field=IntegerField(),
+    )
+
+
+def _price_bucket_range(number):
+    low = PRICE_BUCKETS[number - 1] if number > 0 else None
+    high = PRICE_BUCKETS[number] if number < len(PRICE_BUCKETS) else None
+    return low, high
+
+
+def _price_bucket_label(number):
+    low, high = _price_bucket_range(number)
+    if low is None:
+        return f'до {high:,} ₽'.replace(',', ' ')
+    if high is None:
+        return f'от {low:,} ₽'.replace(',', ' ')
+    return f'{low:,}–{high:,} ₽'.replace(',', ' ')
+
+
+def _facet_combinations_query(slot, filters):
+    """Ключ кэша и GROUP BY-запрос для _facet_combinations"""
+    ranges = {
+        param: value for param, value in filters.items()
+        if value is not None and CATALOG_FILTERS[slot].get(param, '').endswith(RANGE_LOOKUPS)
+    }
+    model = CATALOG_FIELDS[slot][0]
+    queryset = model.objects.filter(**{CATALOG_FILTERS[slot][param]: value for param, value in ranges.items()})
+    queryset = (
+        queryset.order_by().annotate(price_bucket=_price_bucket())
+        .values_list(*FACETS[slot], 'price_bucket').annotate(count=Count('pk'))
+    )
+    return f'facets:{slot}', sorted(ranges.items()), queryset
+
+
+def _facet_combinations(slot, filters):
+    """Количество деталей по каждому сочетанию значений фасетов и ценового диапазона.
+
+    Один GROUP BY-запрос; результат кэшируется по версии каталога
+    и фильтрам-диапазонам, поэтому фильтры по значению его не меняют.
+    """
+    prefix, ranges, queryset = _facet_combinations_query(slot, filters)
+    key = make_key(prefix, get_versions(slot), ranges)
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(queryset)
+        cache.set(key, rows, None)
+    return rows
+
+
+async def _afacet_combinations(slot, filters):
+    prefix, ranges, queryset = _facet_combinations_query(slot, filters)
+    key = make_key(prefix, await aget_versions(slot), ranges)
+    rows = await cache.aget(key)
+    if rows is None:
+        rows = [row async for row in queryset]
+        await cache.aset(key, rows, None)
+    return rows
+
+
+def _matches(slot, param, value, wanted):
+    if CATALOG_FILTERS[slot][param].endswith('__icontains'):
+        return wanted.lower() in str(value).lower()
+    return str(value) == str(wanted)
+
+
+def catalog_facets(slot, filters):
+    """Фасеты списка slot с количествами при текущих фильтрах.
+
+    Количество у значения фасета считается со всеми фильтрами, кроме
+    фильтра этого же фасета — так видно, сколько деталей будет после
+    переключения значения. Возвращает список словарей
+    {'param', 'label', 'values': [{'value', 'label', 'count', 'selected'}]};
+    ценовые диапазоны — фасет price с параметрами min_price/price_below.
+    """
+    return _facets_from_rows(slot, filters, _facet_combinations(slot, filters))
+
+
+async def acatalog_facets(slot, filters):
+    """catalog_facets через async ORM"""
+    return _facets_from_rows(slot, filters, await _afacet_combinations(slot, filters))
+
+
+def _facets_from_rows(slot, filters, rows):
+    model = CATALOG_FIELDS[slot][0]
+    params = FACETS[slot]
+    active = {param: filters[param] for param in params if filters.get(param) is not None}
+    counts = {param: {} for param in params}
+    price_counts = {}
+
+    for *values, bucket, count in rows:
+        failed = [
+            param for param, value in zip(params, values)
+            if param in active and not _matches(slot, param, value, active[param])
+        ]
+        if len(failed) > 1:
+            continue
+        for param, value in zip(params, values):
+            if not failed or failed == [param]:
+                counts[param][value] = counts[param].get(value, 0) + count
+        if not failed:
+            price_counts[bucket] = price_counts.get(bucket, 0) + count
+
+    facets = []
+    for param in params:
+        field = model._meta.get_field(param)
+        labels = dict(field.flatchoices)
+        facets.append({
+            'param': param,
+            'label': field.verbose_name,
+            'values': [
+                {
+                    'value': value,
+                    'label': labels.get(value, value),
+                    'count': count,
+                    'selected': param in active and _matches(slot, param, value, active[param]),
+                }
+                for value, count in sorted(counts[param].items(), key=lambda item: (-item[1], str(item[0])))
+            ],
+        })
+
+    selected_range = (filters.get('min_price'), filters.get('price_below'))
+    price_values = []
+    for bucket, count in sorted(price_counts.items()):
+        low, high = _price_bucket_range(bucket)
+        price_values.append({
+            'value': {'min_price': low, 'price_below': high},
+            'label': _price_bucket_label(bucket),
+            'count': count,
+            'selected': selected_range == (str(low) if low else None, str(high) if high else None),
+        })
+    facets.append({'param': 'price', 'label': 'Цена', 'values': price_values})
+    return facets
@@ -0,0 +1,158 @@
+"""Графики сборок (Plotly).
+
+Построение go.Figure и to_html — самая дорогая часть страницы сборки,
+поэтому HTML графика запоминается по набору цен компонентов. Кроме того,
+есть облегчённый режим (settings.BUDGET_CHART_MODE = 'json'): сервер отдаёт
+только data/layout, а рисует график plotly.js в браузере — без импорта
+plotly на сервере вообще.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+
+BUDGET_CHART_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40']
+
+BUDGET_CHART_LABELS = [
+    ('cpu', 'Процессор'),
+    ('gpu', 'Видеокарта'),
+    ('motherboard', 'Мат. плата'),
+    ('ram', 'RAM'),
+    ('psu', 'Блок питания'),
+    ('case', 'Корпус'),
+]
+
+
+def budget_items(build):
+    """Пары (подпись, цена) для выбранных компонентов — ключ кэша графика"""
+    items = []
+    for slot, label in BUDGET_CHART_LABELS:
+        component = getattr(build, slot)
+        if component and component.avg_used_price:
+            items.append((label, float(component.avg_used_price)))
+    return tuple(items)
+
+
+def budget_chart_spec(items):
+    """Описание графика в формате Plotly (data + layout) без импорта plotly"""
+    return {
+        'data': [{
+            'type': 'pie',
+            'labels': [label for label, _ in items],
+            'values': [value for _, value in items],
+            'hole': 0.4,
+            'textinfo': 'label+percent',
+            'marker': {'colors': BUDGET_CHART_COLORS},
+        }],
+        'layout': {
+            'title': {'text': 'Распределение бюджета'},
+            'showlegend': True,
+            'height': 400,
+            'margin': {'t': 50, 'b': 50, 'l': 50, 'r': 50},
+        },
+    }
+
+
+@lru_cache(maxsize=256)
+def render_budget_chart(items):
+    """HTML графика для набора цен; одинаковые наборы рендерятся один раз"""
+    import plotly.graph_objects as go
+
+    spec = budget_chart_spec(items)
+    fig = go.Figure(data=[go.Pie(**{k: v for k, v in spec['data'][0].items() if k != 'type'})])
+    fig.update_layout(
+        title=spec['layout']['title']['text'],
+        showlegend=True,
+        height=400,
+        margin=dict(t=50, b=50, l=50, r=50)
+    )
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def client_side_charts():
+    return getattr(settings, 'BUDGET_CHART_MODE', 'html') == 'json'
+
+
+def generate_budget_chart(build):
+    """Генерация графика распределения бюджета (Plotly)"""
+    items = budget_items(build)
+    if not items:
+        return None
+    return render_budget_chart(items)
+
+
+def price_history_chart_spec(history):
+    """Линия средней цены по периодам и коридор min–max (формат Plotly)"""
+    dates = [row['period_start'] for row in history]
+    return {
+        'data': [
+            {
+                'type': 'scatter', 'mode': 'lines', 'name': 'Минимум',
+                'x': dates, 'y': [row['min'] for row in history],
+                'line': {'width': 0}, 'showlegend': False,
+            },
+            {
+                'type': 'scatter', 'mode': 'lines', 'name': 'Максимум',
+                'x': dates, 'y': [row['max'] for row in history],
+                'line': {'width': 0}, 'fill': 'tonexty', 'fillcolor': 'rgba(54, 162, 235, 0.2)',
+                'showlegend': False,
+            },
+            {
+                'type': 'scatter', 'mode': 'lines+markers', 'name': 'Средняя цена',
+                'x': dates, 'y': [row['avg'] for row in history],
+                'line': {'color': BUDGET_CHART_COLORS[1]},
+            },
+        ],
+        'layout': {
+            'title': {'text': 'История цены'},
+            'height': 300,
+            'margin': {'t': 50, 'b': 40, 'l': 60, 'r': 20},
+            'yaxis': {'title': {'text': '₽'}},
+        },
+    }
+
+
+COMPARISON_METRICS = [
+    ('price', 'Цена', '{:,.0f} ₽'),
+    ('score', 'Benchmark Score', '{:,.0f}'),
+    ('score_per_1000', 'Score на 1000 ₽', '{:.1f}'),
+    ('tdp', 'Энергопотребление', '{:,.0f} Вт'),
+]
+
+
+def comparison_chart_spec(rows, lower_is_better=('price', 'tdp')):
+    """Сгруппированная столбчатая диаграмма сравнения сборок (формат Plotly).
+
+    Показатели разного масштаба приводятся к процентам от лучшего значения,
+    фактические значения выводятся в подписях столбцов.
+    """
+    # id в подписи: у разных сборок может совпадать название
+    names = [f"{row['name']} (#{row['id']})" for row in rows]
+    data = []
+    for (metric, label, template), color in zip(COMPARISON_METRICS, BUDGET_CHART_COLORS):
+        values = [row[metric] for row in rows]
+        if metric in lower_is_better:
+            best = min((value for value in values if value > 0), default=0)
+            relative = [best / value * 100 if value > 0 else 0 for value in values]
+        else:
+            best = max(values, default=0)
+            relative = [value / best * 100 if best > 0 else 0 for value in values]
+        data.append({
+            'type': 'bar',
+            'name': label,
+            'x': names,
+            'y': [round(value, 1) for value in relative],
+            'text': [template.format(value).replace(',', ' ') for value in values],
+            'hovertemplate': '%{x}<br>' + label + ': %{text}<extra></extra>',
+            'marker': {'color': color},
+        })
+    return {
+        'data': data,
+        'layout': {
+            'title': {'text': 'Сравнение сборок (% от лучшего значения)'},
+            'barmode': 'group',
+            'height': 450,
+            'margin': {'t': 50, 'b': 80, 'l': 50, 'r': 20},
+            'yaxis': {'title': {'text': '%'}, 'range': [0, 105]},
+        },
+    }
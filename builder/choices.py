@@ -0,0 +1,110 @@
+"""Варианты выбора деталей для формы сборки.
+
+Списки (pk, подпись) строятся одним запросом values_list на тип деталей,
+без создания моделей, и хранятся в памяти процесса, пока не изменилась
+версия каталога этого типа (cache.get_versions). Подписи совпадают
+с __str__ моделей.
+
+Небольшие списки форма рисует обычным select. Если вариантов больше
+TYPEAHEAD_THRESHOLD, select содержит только выбранную деталь, а
+остальные подгружаются по мере ввода из api.component_options:
+совместимые с уже выбранными слотами (индекс совместимости) и
+подходящие под введённый текст.
+"""
+import threading
+
+from .cache import get_versions
+from .compatibility import CATALOG_FIELDS, get_index
+
+
+# Подписи как в __str__ моделей: поля и формат
+CHOICE_LABELS = {
+    'cpu': (('manufacturer', 'name'), '{} {}'),
+    'gpu': (('manufacturer', 'name'), '{} {}'),
+    'motherboard': (('manufacturer', 'name'), '{} {}'),
+    'ram': (('manufacturer', 'name', 'capacity'), '{} {} {}GB'),
+    'psu': (('manufacturer', 'name', 'wattage'), '{} {} {}W'),
+    'case': (('manufacturer', 'name'), '{} {}'),
+}
+
+# С какого размера каталога select заменяется на type-ahead
+TYPEAHEAD_THRESHOLD = 300
+OPTIONS_LIMIT = 20
+OPTIONS_MAX_LIMIT = 100
+
+
+class ChoiceList:
+    """Варианты одного типа деталей в порядке сортировки модели"""
+
+    def __init__(self, rows):
+        self.choices = rows
+        self.labels = dict(rows)
+        self.search_text = {pk: label.lower().replace('ё', 'е') for pk, label in rows}
+
+    @classmethod
+    def from_db(cls, slot):
+        model = CATALOG_FIELDS[slot][0]
+        fields, template = CHOICE_LABELS[slot]
+        rows = [
+            (pk, template.format(*values))
+            for pk, *values in model.objects.values_list('pk', *fields).iterator(chunk_size=5000)
+        ]
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.choices)
+
+    @property
+    def typeahead(self):
+        return len(self.choices) > TYPEAHEAD_THRESHOLD
+
+    def matching(self, query, pks):
+        """pk из набора pks, в подписи которых есть все слова запроса"""
+        query_words = query.lower().replace('ё', 'е').split()
+        search_text = self.search_text
+        return [
+            pk for pk in pks
+            if pk in search_text and all(word in search_text[pk] for word in query_words)
+        ]
+
+
+_choice_lists = {}
+_choice_lists_lock = threading.Lock()
+
+
+def get_choice_list(slot):
+    """Список для текущей версии каталога slot; перестраивается после изменений"""
+    version = get_versions(slot)
+    cached = _choice_lists.get(slot)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _choice_lists_lock:
+        cached = _choice_lists.get(slot)
+        if cached is None or cached[0] != version:
+            cached = (version, ChoiceList.from_db(slot))
+            _choice_lists[slot] = cached
+    return cached[1]
+
+
+def reset_choice_lists():
+    with _choice_lists_lock:
+        _choice_lists.clear()
+
+
+def compatible_options(slot, selected, query='', limit=OPTIONS_LIMIT):
+    """Варианты slot, совместимые с выбранными деталями и подходящие под query.
+
+    selected — {слот: pk}; без запроса возвращаются самые дешёвые, иначе
+    совпадения по подписи от дешёвых к дорогим. Результат — список
+    словарей id/text/price.
+    """
+    index = get_index()
+    choice_list = get_choice_list(slot)
+    pks = index.compatible(slot, selected)
+    if query.strip():
+        pks = choice_list.matching(query, pks)
+    specs = index.specs[slot]
+    return [
+        {'id': pk, 'text': choice_list.labels[pk], 'price': specs[pk].avg_used_price}
+        for pk in index.cheapest(slot, (pk for pk in pks if pk in choice_list.labels), limit)
+    ]
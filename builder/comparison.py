@@ -0,0 +1,113 @@
+"""Сравнение нескольких сборок (TZ, US-5).
+
+Все сборки вместе с компонентами загружаются одним запросом
+(select_related). Цена, TDP, Benchmark Score и производительность на
+рубль считаются сразу для всех сборок по массивам NumPy, повторяя
+формулы Build.get_total_price(), get_total_tdp() и get_benchmark_score().
+"""
+import numpy as np
+from django.db.models import Q
+
+from .builds import BUILD_RELATED
+from .models import Build
+
+
+MAX_COMPARED_BUILDS = 50
+
+
+def parse_build_ids(params):
+    """Уникальные id сборок из ?ids=1,2,3 (или ?ids=1&ids=2) в порядке перечисления"""
+    ids = []
+    for value in params.getlist('ids'):
+        for part in value.split(','):
+            part = part.strip()
+            if part.isdigit() and int(part) not in ids:
+                ids.append(int(part))
+    return ids[:MAX_COMPARED_BUILDS]
+
+
+def load_builds(ids, user):
+    """Доступные пользователю сборки из списка ids — одним запросом, в порядке ids"""
+    visible = Q(is_public=True)
+    if user.is_authenticated:
+        visible |= Q(user=user)
+    builds = Build.objects.filter(visible, pk__in=ids).select_related(*BUILD_RELATED)
+    by_pk = {build.pk: build for build in builds}
+    return [by_pk[pk] for pk in ids if pk in by_pk]
+
+
+def _column(builds, slot, field):
+    return np.array(
+        [float(getattr(getattr(build, slot), field) or 0) if getattr(build, slot) else 0.0 for build in builds],
+        dtype=np.float64,
+    )
+
+
+class BuildComparison:
+    """Показатели набора сборок в виде массивов (по одному элементу на сборку)"""
+
+    # Показатель -> лучше ли большее значение
+    METRICS = {
+        'price': False,
+        'tdp': False,
+        'score': True,
+        'score_per_1000': True,
+    }
+
+    def __init__(self, builds):
+        self.builds = list(builds)
+        prices = np.column_stack(
+            [_column(self.builds, slot, 'avg_used_price') for slot in Build.COMPONENT_FIELDS]
+        ) if self.builds else np.empty((0, len(Build.COMPONENT_FIELDS)))
+        self.price = prices.sum(axis=1)
+
+        cpu_tdp = _column(self.builds, 'cpu', 'tdp')
+        gpu_tdp = _column(self.builds, 'gpu', 'tdp')
+        self.tdp = (cpu_tdp + gpu_tdp + Build.BASE_TDP).astype(np.int64)
+        self.recommended_psu = (self.tdp * Build.PSU_MARGIN).astype(np.int64)
+
+        cpu_score = _column(self.builds, 'cpu', 'benchmark_score')
+        gpu_score = _column(self.builds, 'gpu', 'benchmark_score')
+        self.score = (gpu_score * Build.GPU_SCORE_WEIGHT + cpu_score * Build.CPU_SCORE_WEIGHT).astype(np.int64)
+
+        # Очков производительности на каждую 1000 ₽
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.score_per_1000 = np.where(self.price > 0, self.score / self.price * 1000, 0.0)
+
+    def __len__(self):
+        return len(self.builds)
+
+    def best(self):
+        """Индекс лучшей сборки по каждому показателю"""
+        if not self.builds:
+            return {}
+        best = {}
+        for metric, higher in self.METRICS.items():
+            values = getattr(self, metric)
+            best[metric] = int(np.argmax(values) if higher else np.argmin(values))
+        return best
+
+    def rows(self):
+        """Строки таблицы сравнения с отметками лучших значений"""
+        best = self.best()
+        return [
+            {
+                'build': build,
+                'id': build.pk,
+                'name': build.name,
+                'price': float(self.price[i]),
+                'tdp': int(self.tdp[i]),
+                'recommended_psu': int(self.recommended_psu[i]),
+                'score': int(self.score[i]),
+                'score_per_1000': round(float(self.score_per_1000[i]), 2),
+                'best': {metric for metric, index in best.items() if index == i},
+            }
+            for i, build in enumerate(self.builds)
+        ]
+
+    def as_json(self):
+        rows = self.rows()
+        for row in rows:
+            del row['build']
+            row['best'] = sorted(row['best'])
+        return rows
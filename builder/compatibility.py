@@ -0,0 +1,299 @@
+"""Индекс совместимости комплектующих в памяти процесса.
+
+Вместо того чтобы на каждый запрос заново сравнивать сокеты, типы памяти
+и размеры, каталог один раз раскладывается по группам:
+
+* CPU и материнские платы — по сокету;
+* материнские платы и RAM — по типу памяти;
+* материнские платы и корпуса — по форм-фактору;
+* видеокарты, корпуса и БП — в отсортированные списки по длине,
+  максимальной длине GPU и мощности.
+
+Вопрос «что подходит к выбранным деталям» превращается в пересечение
+множеств первичных ключей. Индекс строится лениво при первом обращении
+и дальше поддерживается сигналами post_save/post_delete (см. signals.py).
+Изменения в обход сигналов (import_catalog, другие процессы) видны по
+версиям каталога из cache.get_versions — тогда индекс перестраивается
+целиком, как и поисковый (search.py).
+"""
+import heapq
+import threading
+from functools import lru_cache
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+from .cache import get_versions
+from .models import CPU, GPU, Motherboard, RAM, PSU, Case
+from .rules import DEFAULT_RULES, get_rules
+
+
+# Поля, которые хранятся в индексе, в порядке колонок
+# (поля правил из настроек добавляются после них, см. spec_fields)
+CATALOG_FIELDS = {
+    'cpu': (CPU, ('pk', 'socket', 'tdp', 'benchmark_score', 'avg_used_price')),
+    'gpu': (GPU, ('pk', 'tdp', 'length', 'benchmark_score', 'avg_used_price')),
+    'motherboard': (Motherboard, ('pk', 'socket', 'form_factor', 'memory_type', 'avg_used_price')),
+    'ram': (RAM, ('pk', 'memory_type', 'avg_used_price')),
+    'psu': (PSU, ('pk', 'wattage', 'avg_used_price')),
+    'case': (Case, ('pk', 'form_factor', 'max_gpu_length', 'avg_used_price')),
+}
+
+SLOT_BY_MODEL = {model: slot for slot, (model, _) in CATALOG_FIELDS.items()}
+
+# Правила по умолчанию индекс проверяет группами и диапазонами (_allowed),
+# остальные правила (из настроек) — векторно через RuleSet.violations_batch
+INDEXED_RULES = frozenset(rule['name'] for rule in DEFAULT_RULES)
+
+# Поля, по которым детали группируются по точному значению
+GROUP_FIELDS = {
+    'cpu': ('socket',),
+    'motherboard': ('socket', 'form_factor', 'memory_type'),
+    'ram': ('memory_type',),
+    'case': ('form_factor',),
+}
+
+# Числовые поля, по которым нужны диапазонные выборки
+RANGE_FIELDS = {
+    'gpu': ('length',),
+    'case': ('max_gpu_length',),
+    'psu': ('wattage',),
+}
+
+
+def spec_fields(slot):
+    """Колонки спецификации: CATALOG_FIELDS и после них поля, которые читают правила"""
+    _, fields = CATALOG_FIELDS[slot]
+    return tuple(dict.fromkeys(fields + get_rules().fields(slot)))
+
+
+@lru_cache(maxsize=None)
+def _spec_type(slot, fields):
+    return namedtuple(f'{CATALOG_FIELDS[slot][0].__name__}Spec', fields)
+
+
+def load_catalog():
+    """Выгрузка каталога в виде списков спецификаций (по одному запросу на модель)"""
+    catalog = {}
+    for slot, (model, _) in CATALOG_FIELDS.items():
+        fields = spec_fields(slot)
+        catalog[slot] = [_spec_type(slot, fields)._make(row) for row in model.objects.order_by().values_list(*fields)]
+    return catalog
+
+
+def spec_from_instance(slot, instance):
+    fields = spec_fields(slot)
+    return _spec_type(slot, fields)._make(getattr(instance, field) for field in fields)
+
+
+def required_psu_wattage(cpu_tdp, gpu_tdp):
+    """Порог правила мощности БП (rules.py) по голым числам"""
+    return get_rules().rule('psu_wattage').required({'cpu.tdp': cpu_tdp, 'gpu.tdp': gpu_tdp})
+
+
+def supported_form_factors():
+    """Форм-фактор корпуса -> подходящие форм-факторы плат (из правил)"""
+    return get_rules().rule('form_factor').mapping
+
+
+class CompatibilityIndex:
+    """Группы и отсортированные списки первичных ключей по правилам совместимости"""
+
+    def __init__(self, catalog):
+        self.version = 0
+        self._lock = threading.Lock()
+        self.specs = {slot: {} for slot in CATALOG_FIELDS}
+        self.groups = {
+            (slot, field): {}
+            for slot, fields in GROUP_FIELDS.items()
+            for field in fields
+        }
+        self.ranges = {
+            (slot, field): []
+            for slot, fields in RANGE_FIELDS.items()
+            for field in fields
+        }
+        for slot, specs in catalog.items():
+            for spec in specs:
+                self._insert(slot, spec, sort=False)
+        for values in self.ranges.values():
+            values.sort()
+
+    # ---------- изменение ----------
+
+    def _insert(self, slot, spec, sort=True):
+        self.specs[slot][spec.pk] = spec
+        for field in GROUP_FIELDS.get(slot, ()):
+            self.groups[(slot, field)].setdefault(getattr(spec, field), set()).add(spec.pk)
+        for field in RANGE_FIELDS.get(slot, ()):
+            item = (getattr(spec, field), spec.pk)
+            if sort:
+                insort(self.ranges[(slot, field)], item)
+            else:
+                self.ranges[(slot, field)].append(item)
+
+    def _remove(self, slot, pk):
+        spec = self.specs[slot].pop(pk, None)
+        if spec is None:
+            return
+        for field in GROUP_FIELDS.get(slot, ()):
+            self.groups[(slot, field)].get(getattr(spec, field), set()).discard(pk)
+        for field in RANGE_FIELDS.get(slot, ()):
+            values = self.ranges[(slot, field)]
+            item = (getattr(spec, field), pk)
+            pos = bisect_left(values, item)
+            if pos < len(values) and values[pos] == item:
+                del values[pos]
+
+    def update(self, slot, spec):
+        """Добавление или замена одной позиции каталога"""
+        with self._lock:
+            self._remove(slot, spec.pk)
+            self._insert(slot, spec)
+            self.version += 1
+
+    def discard(self, slot, pk):
+        with self._lock:
+            self._remove(slot, pk)
+            self.version += 1
+
+    # ---------- выборки ----------
+
+    def get(self, slot, pk):
+        return self.specs[slot].get(pk)
+
+    def rows(self):
+        """Снимок каталога в формате load_catalog()"""
+        return {slot: list(specs.values()) for slot, specs in self.specs.items()}
+
+    def with_value(self, slot, field, value):
+        return set(self.groups[(slot, field)].get(value, ()))
+
+    def at_most(self, slot, field, value):
+        values = self.ranges[(slot, field)]
+        return {pk for _, pk in values[:bisect_right(values, (value, float('inf')))]}
+
+    def at_least(self, slot, field, value):
+        values = self.ranges[(slot, field)]
+        return {pk for _, pk in values[bisect_left(values, (value, float('-inf'))):]}
+
+    def _allowed(self, slot, other, spec):
+        """Детали типа slot, совместимые с одной выбранной деталью (None — без ограничений)"""
+        if slot == 'cpu' and other == 'motherboard':
+            return self.with_value('cpu', 'socket', spec.socket)
+        if slot == 'motherboard' and other == 'cpu':
+            return self.with_value('motherboard', 'socket', spec.socket)
+        if slot == 'motherboard' and other == 'ram':
+            return self.with_value('motherboard', 'memory_type', spec.memory_type)
+        if slot == 'ram' and other == 'motherboard':
+            return self.with_value('ram', 'memory_type', spec.memory_type)
+        if slot == 'motherboard' and other == 'case':
+            allowed = set()
+            for form_factor in supported_form_factors().get(spec.form_factor, ()):
+                allowed |= self.with_value('motherboard', 'form_factor', form_factor)
+            return allowed
+        if slot == 'case' and other == 'motherboard':
+            allowed = set()
+            for case_ff, supported in supported_form_factors().items():
+                if spec.form_factor in supported:
+                    allowed |= self.with_value('case', 'form_factor', case_ff)
+            return allowed
+        if slot == 'gpu' and other == 'case':
+            return self.at_most('gpu', 'length', spec.max_gpu_length)
+        if slot == 'case' and other == 'gpu':
+            return self.at_least('case', 'max_gpu_length', spec.length)
+        return None
+
+    def compatible(self, slot, selected):
+        """Первичные ключи деталей slot, совместимых со всеми выбранными.
+
+        selected — словарь {слот: pk}; пустые и неизвестные значения пропускаются.
+        Для БП учитывается рекомендуемая мощность, если выбраны CPU и GPU.
+        Дополнительные правила из настроек проверяются по оставшимся кандидатам.
+        """
+        chosen = {
+            other: self.get(other, pk)
+            for other, pk in selected.items()
+            if other != slot and other in self.specs and pk is not None
+        }
+        chosen = {other: spec for other, spec in chosen.items() if spec is not None}
+
+        result = None
+        for other, spec in chosen.items():
+            allowed = self._allowed(slot, other, spec)
+            if allowed is not None:
+                result = allowed if result is None else result & allowed
+
+        if slot == 'psu':
+            cpu_tdp = chosen['cpu'].tdp if 'cpu' in chosen else 0
+            gpu_tdp = chosen['gpu'].tdp if 'gpu' in chosen else 0
+            if cpu_tdp or gpu_tdp:
+                allowed = self.at_least('psu', 'wattage', required_psu_wattage(cpu_tdp, gpu_tdp))
+                result = allowed if result is None else result & allowed
+
+        result = set(self.specs[slot]) if result is None else result
+        return self._check_rules(slot, chosen, result)
+
+    def _check_rules(self, slot, chosen, pks):
+        """Отсев кандидатов по правилам, которые индекс не раскладывает по группам"""
+        rules = get_rules()
+        if not pks or not any(rule.name not in INDEXED_RULES and slot in rule.slots for rule in rules.rules):
+            return pks
+        pks = list(pks)
+        specs = self.specs[slot]
+        rows = {other: [chosen.get(other)] for other in CATALOG_FIELDS}
+        rows[slot] = [specs[pk] for pk in pks]
+        violated = rules.violations_batch(rules.columns(rows), slots=[slot], exclude=INDEXED_RULES)
+        return {pk for pk, bad in zip(pks, violated.tolist()) if not bad}
+
+    def cheapest(self, slot, pks, limit):
+        """limit самых дешёвых позиций из набора первичных ключей"""
+        specs = self.specs[slot]
+        return heapq.nsmallest(limit, pks, key=lambda pk: (specs[pk].avg_used_price, pk))
+
+
+_index = None
+_versions = None
+_rules = None
+_index_lock = threading.RLock()
+
+
+def get_index():
+    """Индекс для текущих версий каталога и правил; перестраивается после изменений в обход сигналов"""
+    global _index, _versions, _rules
+    versions = get_versions(*CATALOG_FIELDS)
+    if _index is not None and _versions == versions and _rules is get_rules():
+        return _index
+    with _index_lock:
+        versions, rules = get_versions(*CATALOG_FIELDS), get_rules()
+        if _index is None or _versions != versions or _rules is not rules:
+            _index, _versions, _rules = CompatibilityIndex(load_catalog()), versions, rules
+    return _index
+
+
+def update_specs(slot, specs=(), removed=()):
+    """Изменения деталей одного типа через ORM (вызывается после одного bump_version(slot)).
+
+    Как и search.update_document, индекс принимает изменения, только если до
+    них он был актуален: версия slot выросла ровно на единицу, остальные не
+    менялись. Иначе он перестроится при следующем обращении.
+    """
+    global _versions
+    with _index_lock:
+        if _index is None or _rules is not get_rules():
+            return
+        versions = get_versions(*CATALOG_FIELDS)
+        position = list(CATALOG_FIELDS).index(slot)
+        expected = _versions[:position] + (_versions[position] + 1,) + _versions[position + 1:]
+        if versions != expected:
+            return
+        for pk in removed:
+            _index.discard(slot, pk)
+        for spec in specs:
+            _index.update(slot, spec)
+        _versions = versions
+
+
+def reset_index():
+    global _index, _versions, _rules
+    with _index_lock:
+        _index = _versions = _rules = None
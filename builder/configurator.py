@@ -0,0 +1,360 @@
+"""Автоподбор сборки с максимальным Benchmark Score под заданный бюджет.
+
+Перебор всех комбинаций из шести комплектующих невозможен уже на сотне
+позиций каждого типа, поэтому поиск разбит на независимые части:
+
+* материнская плата + RAM зависят только от сокета и форм-фактора корпуса,
+  для каждой пары заранее берётся самый дешёвый вариант;
+* корпус зависит только от форм-фактора и длины видеокарты — для каждого
+  форм-фактора строится «лестница» самых дешёвых корпусов по длине;
+* блок питания зависит только от суммарного TDP — самый дешёвый БП нужной
+  мощности ищется бинарным поиском;
+* процессоры и видеокарты отсекаются фронтами Парето (цена ↑, score ↓)
+  внутри групп с одинаковыми сокетом/TDP и TDP/классом длины.
+
+Для каждого процессора из фронта все видеокарты проверяются векторно (NumPy).
+
+Разложение выше повторяет правила совместимости по умолчанию. Правила
+из настроек (rules.py) учитываются так: правила одной детали отсеивают
+позиции каталога заранее, правила платы и памяти — при выборе платформы,
+остальные проверяются у готового кандидата (violations_batch), и при
+нарушении берётся следующая видеокарта.
+"""
+import numpy as np
+
+from .compatibility import (
+    CATALOG_FIELDS, INDEXED_RULES, get_index, load_catalog, required_psu_wattage, supported_form_factors,
+)
+from .models import Build
+from .rules import get_rules
+
+
+def pareto_front(price, score):
+    """Индексы позиций, которые не хуже других по паре (цена, score).
+
+    Позиции сортируются по цене; позиция остаётся во фронте, только если её
+    score строго выше, чем у всех более дешёвых.
+    """
+    if not len(price):
+        return np.empty(0, dtype=np.intp)
+    order = np.lexsort((-score, price))
+    sorted_score = score[order]
+    best_before = np.maximum.accumulate(sorted_score)
+    keep = np.empty(len(order), dtype=bool)
+    keep[0] = True
+    keep[1:] = sorted_score[1:] > best_before[:-1]
+    return order[keep]
+
+
+def _grouped_front(keys, price, score):
+    """Объединение фронтов Парето по группам с одинаковым ключом"""
+    groups = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+    front = []
+    for members in groups.values():
+        members = np.asarray(members, dtype=np.intp)
+        front.extend(members[pareto_front(price[members], score[members])])
+    return np.asarray(sorted(front), dtype=np.intp)
+
+
+def _cheapest_ladder(thresholds, prices):
+    """Самый дешёвый вариант с порогом не ниже заданного.
+
+    Возвращает отсортированные пороги, минимальную цену и индекс позиции
+    для каждого суффикса. В конец добавлен «пустой» элемент с ценой inf.
+    """
+    order = np.argsort(thresholds, kind='stable')
+    sorted_thresholds = thresholds[order]
+    # Минимум по суффиксу = накопленный минимум по развёрнутому массиву
+    reversed_prices = prices[order][::-1]
+    running_min = np.minimum.accumulate(reversed_prices)
+    positions = np.arange(len(order))
+    is_new_min = np.ones(len(order), dtype=bool)
+    is_new_min[1:] = reversed_prices[1:] < running_min[:-1]
+    argmin_pos = np.maximum.accumulate(np.where(is_new_min, positions, 0))
+
+    best_price = np.append(running_min[::-1], np.inf)
+    best_index = np.append(order[::-1][argmin_pos][::-1], -1)
+    return sorted_thresholds, best_price, best_index
+
+
+class AutoBuilder:
+    """Поиск лучшей по производительности совместимой сборки под бюджет.
+
+    Индексы строятся один раз по снимку каталога, после чего ``find`` можно
+    вызывать для любого бюджета.
+    """
+
+    PLATFORM_SLOTS = {'motherboard', 'ram'}
+
+    def __init__(self, catalog):
+        self.rules = get_rules()
+        extra = [rule for rule in self.rules.rules if rule.name not in INDEXED_RULES]
+        self.platform_rules = [rule for rule in extra if len(rule.slots) > 1 and rule.slots <= self.PLATFORM_SLOTS]
+        self.checked_rules = [rule for rule in extra if len(rule.slots) > 1 and not rule.slots <= self.PLATFORM_SLOTS]
+        catalog = dict(catalog)
+        for rule in extra:
+            if len(rule.slots) == 1:
+                slot, = rule.slots
+                violated = rule.violated_batch(self.rules.columns({slot: catalog[slot]}))
+                catalog[slot] = [row for row, bad in zip(catalog[slot], violated.tolist()) if not bad]
+        self.rows = catalog
+        self._index_platforms(catalog['motherboard'], catalog['ram'])
+        self._index_cases(catalog['case'])
+        self._index_psus(catalog['psu'])
+        self._index_cpus(catalog['cpu'])
+        self._index_gpus(catalog['gpu'])
+
+    @classmethod
+    def from_db(cls):
+        return cls(load_catalog())
+
+    # ---------- индексы ----------
+
+    def _cheapest_rams(self, motherboards, rams):
+        """Самая дешёвая подходящая RAM для каждой платы: (цена, индекс) или None"""
+        if self.platform_rules:
+            return self._cheapest_rams_by_rules(motherboards, rams)
+        # Правила по умолчанию: достаточно самой дешёвой RAM для каждого типа памяти
+        cheapest_ram = {}
+        for i, row in enumerate(rams):
+            memory_type, price = row[1], float(row[2])
+            if memory_type not in cheapest_ram or price < cheapest_ram[memory_type][0]:
+                cheapest_ram[memory_type] = (price, i)
+        return [cheapest_ram.get(row[3]) for row in motherboards]
+
+    def _cheapest_rams_by_rules(self, motherboards, rams):
+        # Матрица «платы × модули памяти» по всем правилам, где участвуют только они
+        if not motherboards or not rams:
+            return [None] * len(motherboards)
+        columns = {
+            **{key: value[:, None] for key, value in self.rules.columns({'motherboard': motherboards}).items()},
+            **{key: value[None, :] for key, value in self.rules.columns({'ram': rams}).items()},
+        }
+        violated = np.zeros((len(motherboards), len(rams)), dtype=bool)
+        for rule in self.rules.rules:
+            if rule.slots <= self.PLATFORM_SLOTS:
+                violated |= rule.violated_batch(columns)
+        prices = np.where(violated, np.inf, np.array([float(row[2]) for row in rams])[None, :])
+        best = prices.argmin(axis=1)
+        return [
+            (float(prices[i, j]), int(j)) if np.isfinite(prices[i, j]) else None
+            for i, j in enumerate(best)
+        ]
+
+    def _index_platforms(self, motherboards, rams):
+        cheapest_ram = self._cheapest_rams(motherboards, rams)
+
+        # (сокет, форм-фактор платы) -> самая дешёвая пара плата + RAM
+        by_socket_ff = {}
+        for i, row in enumerate(motherboards):
+            socket, form_factor, price = row[1], row[2], row[4]
+            if cheapest_ram[i] is None:
+                continue
+            ram_price, ram_index = cheapest_ram[i]
+            total = float(price) + ram_price
+            key = (socket, form_factor)
+            if key not in by_socket_ff or total < by_socket_ff[key][0]:
+                by_socket_ff[key] = (total, i, ram_index)
+
+        # (сокет, форм-фактор корпуса) -> лучшая платформа из подходящих плат
+        self.platforms = {}
+        for (socket, mb_ff), candidate in by_socket_ff.items():
+            for case_ff, supported in supported_form_factors().items():
+                if mb_ff not in supported:
+                    continue
+                key = (socket, case_ff)
+                if key not in self.platforms or candidate[0] < self.platforms[key][0]:
+                    self.platforms[key] = candidate
+
+    def _index_cases(self, cases):
+        by_ff = {}
+        for i, row in enumerate(cases):
+            by_ff.setdefault(row[1], []).append((i, row[2], float(row[3])))
+
+        self.case_ladders = {}
+        for form_factor, items in by_ff.items():
+            indexes = np.array([item[0] for item in items], dtype=np.intp)
+            lengths = np.array([item[1] for item in items], dtype=np.int64)
+            prices = np.array([item[2] for item in items])
+            sorted_lengths, best_price, best_index = _cheapest_ladder(lengths, prices)
+            self.case_ladders[form_factor] = (sorted_lengths, best_price, indexes[best_index.clip(0)])
+
+    def _index_psus(self, psus):
+        wattages = np.array([row[1] for row in psus], dtype=np.int64)
+        prices = np.array([float(row[2]) for row in psus])
+        self.psu_wattages, self.psu_price, self.psu_index = _cheapest_ladder(wattages, prices)
+
+    def _index_cpus(self, cpus):
+        self.cpu_socket = [row[1] for row in cpus]
+        self.cpu_tdp = np.array([row[2] for row in cpus], dtype=np.int64)
+        self.cpu_score = np.array([row[3] for row in cpus], dtype=np.float64)
+        self.cpu_price = np.array([float(row[4]) for row in cpus])
+        keys = list(zip(self.cpu_socket, self.cpu_tdp.tolist()))
+        front = _grouped_front(keys, self.cpu_price, self.cpu_score)
+        # Сначала самые производительные — так быстрее срабатывает отсечение
+        self.cpu_front = front[np.argsort(-self.cpu_score[front], kind='stable')]
+
+    def _index_gpus(self, gpus):
+        self.gpu_tdp = np.array([row[1] for row in gpus], dtype=np.int64)
+        self.gpu_length = np.array([row[2] for row in gpus], dtype=np.int64)
+        self.gpu_score = np.array([row[3] for row in gpus], dtype=np.float64)
+        self.gpu_price = np.array([float(row[4]) for row in gpus])
+
+        # Видеокарты с одинаковым классом длины помещаются в одни и те же корпуса
+        case_lengths = np.unique(np.concatenate(
+            [ladder[0] for ladder in self.case_ladders.values()] or [np.empty(0, dtype=np.int64)]
+        ))
+        length_class = np.searchsorted(case_lengths, self.gpu_length, side='left')
+        keys = list(zip(self.gpu_tdp.tolist(), length_class.tolist()))
+        front = _grouped_front(keys, self.gpu_price, self.gpu_score)
+
+        self.gpu_front = front
+        self.gpu_front_max_score = self.gpu_score[front].max() if len(front) else 0.0
+
+        # Стоимость самого дешёвого корпуса каждого форм-фактора для каждой карты
+        self.gpu_case_price = {}
+        self.gpu_case_index = {}
+        front_lengths = self.gpu_length[front]
+        for form_factor, (lengths, best_price, case_index) in self.case_ladders.items():
+            pos = np.searchsorted(lengths, front_lengths, side='left')
+            self.gpu_case_price[form_factor] = best_price[pos]
+            self.gpu_case_index[form_factor] = case_index[np.minimum(pos, len(lengths) - 1)]
+
+        # Для каждого сокета: минимальная доплата за плату + RAM + корпус
+        self.socket_extra = {}
+        for socket in set(self.cpu_socket):
+            extra = np.full(len(front), np.inf)
+            choice = np.full(len(front), '', dtype=object)
+            for form_factor, case_price in self.gpu_case_price.items():
+                platform = self.platforms.get((socket, form_factor))
+                if platform is None:
+                    continue
+                candidate = case_price + platform[0]
+                better = candidate < extra
+                extra[better] = candidate[better]
+                choice[better] = form_factor
+            self.socket_extra[socket] = (extra, choice)
+
+    # ---------- поиск ----------
+
+    def _psu_price(self, required):
+        pos = np.searchsorted(self.psu_wattages, required, side='left')
+        return self.psu_price[pos], pos
+
+    def find(self, budget):
+        """Лучшая сборка в пределах бюджета: словарь {слот: pk} или None"""
+        budget = float(budget)
+        if not len(self.gpu_front):
+            return None
+
+        gpu_price = self.gpu_price[self.gpu_front]
+        gpu_tdp = self.gpu_tdp[self.gpu_front]
+        gpu_value = self.gpu_score[self.gpu_front] * Build.GPU_SCORE_WEIGHT
+
+        best = None
+        for cpu in self.cpu_front:
+            cpu_value = self.cpu_score[cpu] * Build.CPU_SCORE_WEIGHT
+            if best is not None and cpu_value + self.gpu_front_max_score * Build.GPU_SCORE_WEIGHT < best[0]:
+                # Процессоры отсортированы по score: дальше улучшения быть не может
+                break
+            if self.cpu_price[cpu] > budget:
+                continue
+
+            extra, _ = self.socket_extra[self.cpu_socket[cpu]]
+            required = ((self.cpu_tdp[cpu] + gpu_tdp + Build.BASE_TDP) * Build.PSU_MARGIN).astype(np.int64)
+            psu_price, _ = self._psu_price(required)
+            total = self.cpu_price[cpu] + gpu_price + extra + psu_price
+            fits = total <= budget
+            if not fits.any():
+                continue
+
+            value = np.where(fits, gpu_value, -np.inf) + cpu_value
+            j = self._best_gpu(cpu, value, total)
+            if j is None:
+                continue
+            top = value[j]
+            if best is None or top > best[0] or (top == best[0] and total[j] < best[1]):
+                best = (top, total[j], cpu, j)
+
+        if best is None:
+            return None
+        return self._assemble(best[2], best[3])
+
+    def _best_gpu(self, cpu, value, total):
+        """Позиция во фронте видеокарт: наибольшая ценность, при равенстве — дешевле.
+
+        Если есть правила, проверяемые у готового кандидата, кандидаты
+        перебираются в том же порядке до первого совместимого.
+        """
+        if not self.checked_rules:
+            top = value.max()
+            return int(np.argmin(np.where(value == top, total, np.inf)))
+        for j in np.lexsort((total, -value)):
+            if value[j] == -np.inf:
+                break
+            if self._passes(cpu, j):
+                return int(j)
+        return None
+
+    def _passes(self, cpu, j):
+        columns = self.rules.columns({
+            slot: [self.rows[slot][i]] for slot, i in self._positions(cpu, j).items()
+        })
+        return not any(rule.violated_batch(columns)[0] for rule in self.checked_rules)
+
+    def _positions(self, cpu, j):
+        """Индексы деталей кандидата (процессор cpu, видеокарта j из фронта) в self.rows"""
+        gpu = self.gpu_front[j]
+        socket = self.cpu_socket[cpu]
+        _, choice = self.socket_extra[socket]
+        case_ff = choice[j]
+        _, mb, ram = self.platforms[(socket, case_ff)]
+        case = self.gpu_case_index[case_ff][j]
+        required = required_psu_wattage(self.cpu_tdp[cpu], self.gpu_tdp[gpu])
+        psu = self.psu_index[np.searchsorted(self.psu_wattages, required, side='left')]
+        return {'cpu': cpu, 'gpu': gpu, 'motherboard': mb, 'ram': ram, 'psu': psu, 'case': case}
+
+    def _assemble(self, cpu, j):
+        return {slot: self.rows[slot][i][0] for slot, i in self._positions(cpu, j).items()}
+
+
+_cached_builder = (None, None)
+
+
+def get_auto_builder():
+    """AutoBuilder по текущему индексу совместимости; пересобирается после изменений каталога"""
+    global _cached_builder
+    index = get_index()
+    key = (id(index), index.version)
+    cached_key, builder = _cached_builder
+    if cached_key != key:
+        builder = AutoBuilder(index.rows())
+        _cached_builder = (key, builder)
+    return builder
+
+
+def find_best_build(budget, catalog=None):
+    """Подбор сборки под бюджет; возвращает несохранённый Build или None.
+
+    Детали, которых уже нет в БД (удалены в обход сигналов), выбрасываются
+    из индекса или из catalog, и подбор повторяется без них.
+    """
+    while True:
+        builder = AutoBuilder(catalog) if catalog is not None else get_auto_builder()
+        found = builder.find(budget)
+        if found is None:
+            return None
+        components = {
+            slot: CATALOG_FIELDS[slot][0].objects.filter(pk=pk).first()
+            for slot, pk in found.items()
+        }
+        missing = [slot for slot, component in components.items() if component is None]
+        if not missing:
+            return Build(**components)
+        for slot in missing:
+            if catalog is not None:
+                catalog = {**catalog, slot: [row for row in catalog[slot] if row[0] != found[slot]]}
+            else:
+                get_index().discard(slot, found[slot])
@@ -1,9 +1,63 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.forms.models import ModelChoiceIterator
+from django.urls import reverse
+from django.utils.html import format_html
+from .choices import get_choice_list
+from .compatibility import SLOT_BY_MODEL
 from .models import Build, CPU, GPU, Motherboard, RAM, PSU, Case
 
 
+class CachedChoiceIterator(ModelChoiceIterator):
+    """Варианты из кэшированного списка (pk, подпись) вместо обхода queryset"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from get_choice_list(self.field.slot).choices
+
+    def __len__(self):
+        return len(get_choice_list(self.field.slot)) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return True
+
+
+class CatalogChoiceField(forms.ModelChoiceField):
+    """Выбор детали: варианты из choices.get_choice_list, проверка — по pk в queryset"""
+    iterator = CachedChoiceIterator
+
+    @property
+    def slot(self):
+        return SLOT_BY_MODEL[self.queryset.model]
+
+
+class TypeaheadSelect(forms.Select):
+    """Select только с выбранной деталью и полем поиска; варианты подгружаются по мере ввода"""
+
+    def __init__(self, slot, labels, empty_label, attrs=None):
+        super().__init__(attrs)
+        self.slot = slot
+        self.labels = labels
+        self.empty_label = empty_label
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [item for item in value if str(item).isdigit() and int(item) in self.labels]
+        options = [self.create_option(name, '', self.empty_label or '', not selected, 0, attrs=attrs)]
+        for position, pk in enumerate(selected, 1):
+            options.append(self.create_option(name, pk, self.labels[int(pk)], True, position, attrs=attrs))
+        return [(None, options, 0)]
+
+    def render(self, name, value, attrs=None, renderer=None):
+        select = super().render(name, value, attrs, renderer)
+        return format_html(
+            '<input type="search" class="form-control mb-1" placeholder="Поиск: производитель, модель" '
+            'autocomplete="off" data-typeahead-url="{}" data-typeahead-for="{}">{}',
+            reverse('api_component_options', args=[self.slot]), f'id_{name}', select,
+        )
+
+
 class BuildForm(forms.ModelForm):
     """Форма создания/редактирования сборки"""
     
@@ -28,6 +82,7 @@ class BuildForm(forms.ModelForm):
             'case': forms.Select(attrs={'class': 'form-select'}),
             'is_public': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
+        field_classes = {slot: CatalogChoiceField for slot in Build.COMPONENT_FIELDS}
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -42,6 +97,14 @@ class BuildForm(forms.ModelForm):
         self.fields['ram'].empty_label = '— Выберите RAM —'
         self.fields['psu'].empty_label = '— Выберите блок питания —'
         self.fields['case'].empty_label = '— Выберите корпус (опционально) —'
+        
+        # Большой каталог не выводится в select целиком: только выбранное + поиск
+        for slot in Build.COMPONENT_FIELDS:
+            field = self.fields[slot]
+            choice_list = get_choice_list(slot)
+            if choice_list.typeahead:
+                field.widget = TypeaheadSelect(slot, choice_list.labels, field.empty_label, field.widget.attrs)
+                field.widget.is_required = field.required
 
 
 class CPUFilterForm(forms.Form):
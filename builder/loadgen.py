@@ -0,0 +1,58 @@
+"""Нагрузочный клиент для bench_servers.
+
+Запускается в отдельном процессе (multiprocessing, spawn), чтобы клиент
+не делил GIL с замеряемым сервером, поэтому зависит только от
+стандартной библиотеки и не импортирует Django. Каждый из concurrency
+потоков держит своё keep-alive соединение и шлёт запросы по очереди.
+"""
+import http.client
+import itertools
+import threading
+import time
+
+
+def _worker(host, port, paths, count, results, errors):
+    connection = None
+    for path in itertools.islice(itertools.cycle(paths), count):
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(path)
+            if connection is not None:
+                connection.close()
+            connection = None
+            continue
+        results.append((time.perf_counter() - start, response.status))
+        if response.will_close:
+            connection.close()
+            connection = None
+    if connection is not None:
+        connection.close()
+
+
+def run_load(host, port, paths, requests, concurrency):
+    """requests GET-запросов по путям paths в concurrency потоков.
+
+    Возвращает словарь: общее время, список (задержка, статус) и число
+    запросов, завершившихся ошибкой соединения.
+    """
+    results, errors = [], []
+    per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    threads = [
+        # Потоки начинают с разных путей, чтобы не ходить строем
+        threading.Thread(
+            target=_worker, args=(host, port, paths[i % len(paths):] + paths[:i % len(paths)], count, results, errors),
+        )
+        for i, count in enumerate(per_worker) if count
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'elapsed': time.perf_counter() - start, 'results': results, 'errors': len(errors)}
@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from builder.configurator import AutoBuilder
+from builder.models import CPU, Motherboard, RAM, Case
+
+
+class Command(BaseCommand):
+    help = 'Замер скорости автоподбора сборки на синтетическом каталоге'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parts', type=int, default=12000, help='Всего комплектующих в каталоге')
+        parser.add_argument('--runs', type=int, default=20, help='Количество замеров')
+        parser.add_argument('--limit-ms', type=float, default=100.0, help='Допустимое время ответа')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        catalog = self.generate_catalog(rng, options['parts'] // 6)
+        budgets = [rng.randint(15000, 150000) for _ in range(options['runs'])]
+
+        index_times, find_times = [], []
+        for budget in budgets:
+            start = time.perf_counter()
+            builder = AutoBuilder(catalog)
+            index_times.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            builder.find(budget)
+            find_times.append((time.perf_counter() - start) * 1000)
+
+        total_times = [a + b for a, b in zip(index_times, find_times)]
+        self.stdout.write(f'Каталог: {options["parts"]} позиций, замеров: {options["runs"]}')
+        self.stdout.write(f'Построение индексов: медиана {statistics.median(index_times):.1f} мс')
+        self.stdout.write(f'Поиск: медиана {statistics.median(find_times):.2f} мс, максимум {max(find_times):.2f} мс')
+        self.stdout.write(f'Итого на запрос: максимум {max(total_times):.1f} мс')
+
+        if max(total_times) > options['limit_ms']:
+            raise CommandError(f'Автоподбор медленнее {options["limit_ms"]} мс')
+        self.stdout.write(self.style.SUCCESS('OK'))
+
+    @staticmethod
+    def generate_catalog(rng, per_slot):
+        sockets = [value for value, _ in CPU.SOCKET_CHOICES]
+        memory_types = [value for value, _ in RAM.MEMORY_TYPE_CHOICES]
+        form_factors = [value for value, _ in Motherboard.FORM_FACTOR_CHOICES]
+
+        def price(low, high):
+            return rng.randint(low // 100, high // 100) * 100
+
+        return {
+            'cpu': [
+                (i, rng.choice(sockets), rng.choice([35, 65, 95, 105, 125]),
+                 rng.randint(5000, 40000), price(2000, 40000))
+                for i in range(per_slot)
+            ],
+            'gpu': [
+                (i, rng.choice([75, 120, 150, 170, 200, 220, 285, 320]), rng.randint(160, 340),
+                 rng.randint(3000, 30000), price(4000, 90000))
+                for i in range(per_slot)
+            ],
+            'motherboard': [
+                (i, rng.choice(sockets), rng.choice(form_factors), rng.choice(memory_types), price(2500, 25000))
+                for i in range(per_slot)
+            ],
+            'ram': [
+                (i, rng.choice(memory_types), price(1000, 12000))
+                for i in range(per_slot)
+            ],
+            'psu': [
+                (i, rng.choice([400, 450, 500, 550, 600, 650, 750, 850, 1000]), price(1500, 12000))
+                for i in range(per_slot)
+            ],
+            'case': [
+                (i, rng.choice([value for value, _ in Case.FORM_FACTOR_CHOICES]), rng.randint(180, 420),
+                 price(1500, 10000))
+                for i in range(per_slot)
+            ],
+        }
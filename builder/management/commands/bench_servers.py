@@ -0,0 +1,210 @@
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+from django.utils import timezone
+
+from builder.loadgen import run_load
+from builder.models import Build
+from builder.synthetic import MAX_ROWS, MIN_ROWS, fill_catalog
+
+from .bench_views import Command as BenchViewsCommand
+
+
+SERVERS = ('wsgi', 'asgi')
+CATALOG_VIEWS = ('cpu_list', 'gpu_list', 'motherboard_list', 'ram_list', 'psu_list', 'case_list')
+HOST = '127.0.0.1'
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Обработчик runserver без строки в лог на каждый запрос"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность страниц под WSGI (многопоточный сервер runserver) '
+        'и ASGI (uvicorn) при параллельной нагрузке на синтетическом каталоге (JSON)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000,
+                            help=f'Всего строк в таблицах каталога и сборок ({MIN_ROWS}–{MAX_ROWS})')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов на каждую страницу')
+        parser.add_argument('--concurrency', type=int, default=16, help='Одновременных соединений клиента')
+        parser.add_argument('--warmup', type=int, default=20, help='Запросов прогрева перед замером')
+        parser.add_argument('--server', choices=(*SERVERS, 'both'), default='both')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--db-file', help='Файл тестовой БД (по умолчанию — во временном каталоге)')
+        parser.add_argument('--output', help='Записать отчёт JSON в файл (по умолчанию — в stdout)')
+
+    def handle(self, *args, **options):
+        if not MIN_ROWS <= options['rows'] <= MAX_ROWS:
+            raise CommandError(f'--rows должно быть от {MIN_ROWS} до {MAX_ROWS}')
+        if options['concurrency'] < 1 or options['requests'] < options['concurrency']:
+            raise CommandError('Нужно хотя бы по одному запросу на соединение')
+        servers = SERVERS if options['server'] == 'both' else (options['server'],)
+        if 'asgi' in servers and not self.uvicorn_available():
+            if options['server'] == 'asgi':
+                raise CommandError('Для замера ASGI нужен uvicorn: pip install uvicorn')
+            self.stderr.write('uvicorn не установлен: замер только под WSGI')
+            servers = ('wsgi',)
+
+        # Серверы работают в своих потоках со своими соединениями: нужна БД в файле,
+        # общая для всех потоков (in-memory тестовая БД у каждого соединения своя)
+        db_file = options['db_file'] or os.path.join(tempfile.mkdtemp(prefix='bench_servers_'), 'bench.sqlite3')
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = db_file
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'}, serialized_aliases=set())
+        try:
+            sizes = fill_catalog(options['rows'], options['seed'])
+            paths = self.scenario_paths(options['seed'])
+            # Клиент — в отдельном процессе, чтобы не делить GIL с сервером
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = {server: self.run_server(server, paths, options, pool) for server in servers}
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'commit': BenchViewsCommand.git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'params': {key: options[key] for key in ('rows', 'requests', 'concurrency', 'warmup', 'seed')},
+            'tables': sizes,
+            'servers': results,
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(text + '\n')
+            self.write_summary(report)
+        else:
+            self.stdout.write(text)
+
+    @staticmethod
+    def uvicorn_available():
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def scenario_paths(seed):
+        """Имя -> список путей, по которым клиент ходит по кругу"""
+        rng = random.Random(seed)
+        public_ids = list(Build.objects.filter(is_public=True).values_list('pk', flat=True)[:1000])
+        if not public_ids:
+            raise CommandError('В синтетическом каталоге нет публичных сборок')
+        paths = {'home': [reverse('home')]}
+        for name in CATALOG_VIEWS:
+            paths[name] = [reverse(name)]
+        paths['build_detail'] = [reverse('build_detail', args=[pk]) for pk in rng.sample(public_ids, min(200, len(public_ids)))]
+        return paths
+
+    def run_server(self, server, paths, options, pool):
+        # Кэш общий для обоих серверов в этом процессе: каждый начинает с пустого
+        cache.clear()
+        results = {}
+        serve = self.serve_wsgi if server == 'wsgi' else self.serve_asgi
+        with serve() as port:
+            for name, scenario_paths in paths.items():
+                if options['warmup']:
+                    pool.submit(run_load, HOST, port, scenario_paths, options['warmup'], 1).result()
+                load = pool.submit(
+                    run_load, HOST, port, scenario_paths, options['requests'], options['concurrency'],
+                ).result()
+                results[name] = self.summarize(load)
+        return results
+
+    # Серверы запускаются в фоновом потоке и отдают порт
+
+    @staticmethod
+    @contextmanager
+    def serve_wsgi():
+        from django.core.wsgi import get_wsgi_application
+
+        httpd = ThreadedWSGIServer((HOST, 0), QuietRequestHandler)
+        httpd.set_app(get_wsgi_application())
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield httpd.server_address[1]
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            thread.join()
+
+    @staticmethod
+    @contextmanager
+    def serve_asgi():
+        import uvicorn
+        from django.core.asgi import get_asgi_application
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind((HOST, 0))
+        config = uvicorn.Config(get_asgi_application(), lifespan='off', log_level='warning', access_log=False)
+        server = uvicorn.Server(config)
+        thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if not thread.is_alive() or time.monotonic() > deadline:
+                raise CommandError('uvicorn не запустился')
+            time.sleep(0.01)
+        try:
+            yield sock.getsockname()[1]
+        finally:
+            server.should_exit = True
+            thread.join()
+            sock.close()
+
+    @staticmethod
+    def summarize(load):
+        latencies = [latency for latency, _ in load['results']]
+        failed = sum(1 for _, status in load['results'] if status != 200) + load['errors']
+        if len(latencies) < 2:
+            raise CommandError('Сервер не ответил на запросы')
+        p95 = statistics.quantiles(latencies, n=20, method='inclusive')[-1]
+        return {
+            'requests': len(latencies) + load['errors'],
+            'failed': failed,
+            'throughput_rps': round(len(latencies) / load['elapsed'], 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(p95 * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+        }
+
+    def write_summary(self, report):
+        tables = ', '.join(f'{table} {count}' for table, count in report['tables'].items())
+        self.stdout.write(f'Каталог: {tables}; соединений: {report["params"]["concurrency"]}')
+        servers = report['servers']
+        for name in next(iter(servers.values())):
+            line = f'{name:<18}'
+            for server, scenarios in servers.items():
+                stats = scenarios[name]
+                line += f'  {server} {stats["throughput_rps"]:>8} rps p95 {stats["p95_ms"]:>8} мс'
+                if stats['failed']:
+                    line += f' (ошибок {stats["failed"]})'
+            if len(servers) == 2:
+                ratio = servers['asgi'][name]['throughput_rps'] / servers['wsgi'][name]['throughput_rps']
+                line += f'  ASGI/WSGI {ratio:.2f}'
+            self.stdout.write(line)
@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Код, который выполняется в отдельном интерпретаторе: старт приложения
+# как под WSGI, затем форк воркеров, каждый из которых рисует график
+WORKER_SCRIPT = r'''
+import json, os, sys, time
+sys.path.insert(0, {base_dir!r})
+os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings'
+os.environ['BUILDER_PRELOAD'] = {preload!r}
+
+def memory():
+    stats = {{}}
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Private_Clean', 'Private_Dirty'):
+                stats[name] = int(rest.split()[0])
+    return {{'rss_kb': stats['Rss'], 'private_kb': stats['Private_Clean'] + stats['Private_Dirty']}}
+
+start = time.perf_counter()
+import config.wsgi
+master = {{'startup_ms': (time.perf_counter() - start) * 1000, **memory()}}
+
+workers = []
+for _ in range({workers}):
+    read_end, write_end = os.pipe()
+    if os.fork() == 0:
+        os.close(read_end)
+        start = time.perf_counter()
+        from builder.charts import render_budget_chart
+        render_budget_chart((('CPU', 8500.0), ('GPU', 7000.0)))
+        result = {{'first_chart_ms': (time.perf_counter() - start) * 1000, **memory()}}
+        os.write(write_end, json.dumps(result).encode())
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        workers.append(json.loads(pipe.read()))
+    os.wait()
+
+print(json.dumps({{'master': master, 'workers': workers}}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Время старта и память воркеров с прогревом plotly/numpy и без него (только Linux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('Замер памяти поддерживается только в Linux')
+
+        for title, preload in [('Без прогрева (ленивые импорты)', '0'), ('С прогревом до форка', '1')]:
+            report = self.run_scenario(preload, options['workers'])
+            master = report['master']
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(
+                f'  мастер: старт {master["startup_ms"]:.0f} мс, RSS {master["rss_kb"] / 1024:.1f} МБ'
+            )
+            for number, worker in enumerate(report['workers'], 1):
+                self.stdout.write(
+                    f'  воркер {number}: первый график {worker["first_chart_ms"]:.0f} мс, '
+                    f'RSS {worker["rss_kb"] / 1024:.1f} МБ, '
+                    f'собственная память {worker["private_kb"] / 1024:.1f} МБ'
+                )
+
+    def run_scenario(self, preload, workers):
+        script = WORKER_SCRIPT.format(base_dir=str(settings.BASE_DIR), preload=preload, workers=workers)
+        completed = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, cwd=settings.BASE_DIR
+        )
+        if completed.returncode:
+            raise CommandError(completed.stderr)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
@@ -0,0 +1,189 @@
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from builder.models import Build, compatible_builds
+from builder.synthetic import MAX_ROWS, MIN_ROWS, fill_catalog
+
+
+LIST_VIEWS = ('cpu_list', 'gpu_list', 'motherboard_list', 'ram_list', 'psu_list', 'case_list', 'build_list')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер страниц на синтетическом каталоге: пропускная способность, '
+        'p50/p95 времени ответа и число SQL-запросов (JSON)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000,
+                            help=f'Всего строк в таблицах каталога и сборок ({MIN_ROWS}–{MAX_ROWS})')
+        parser.add_argument('--runs', type=int, default=50, help='Замеров на каждую страницу')
+        parser.add_argument('--warmup', type=int, default=3, help='Запросов прогрева перед замерами')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--cold-cache', action='store_true', help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--db-file', help='Хранить тестовую БД в файле, а не в памяти')
+        parser.add_argument('--output', help='Записать отчёт JSON в файл (по умолчанию — в stdout)')
+        parser.add_argument('--baseline', help='Отчёт прошлого запуска для сравнения p95')
+
+    def handle(self, *args, **options):
+        if not MIN_ROWS <= options['rows'] <= MAX_ROWS:
+            raise CommandError(f'--rows должно быть от {MIN_ROWS} до {MAX_ROWS}')
+        if options['runs'] < 2:
+            raise CommandError('Нужно хотя бы два замера на страницу')
+        baseline = self.load_baseline(options['baseline']) if options['baseline'] else None
+
+        # Замеры идут на отдельной тестовой БД: рабочая не затрагивается
+        if options['db_file']:
+            settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = options['db_file']
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'}, serialized_aliases=set())
+        try:
+            cache.clear()
+            start = time.perf_counter()
+            sizes = fill_catalog(options['rows'], options['seed'])
+            generate_seconds = time.perf_counter() - start
+            scenarios = self.run_scenarios(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'commit': self.git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'params': {key: options[key] for key in ('rows', 'runs', 'warmup', 'seed', 'cold_cache')},
+            'tables': sizes,
+            'generate_seconds': round(generate_seconds, 2),
+            'scenarios': scenarios,
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(text + '\n')
+            self.write_summary(report, baseline)
+        else:
+            self.stdout.write(text)
+
+    def scenarios(self, seed):
+        """Имя -> (клиент, метод, функция, возвращающая URL и данные для очередного запроса)"""
+        rng = random.Random(seed)
+        anonymous = Client()
+        member = Client()
+        member.force_login(Build.objects.order_by('pk').first().user)
+
+        public_ids = list(Build.objects.filter(is_public=True).values_list('pk', flat=True)[:1000])
+        if not public_ids:
+            raise CommandError('В синтетическом каталоге нет публичных сборок')
+        # Для POST — совместимые детали из первой совместимой сборки
+        sample = compatible_builds(Build.objects.order_by('pk')).first()
+        if sample is None:
+            raise CommandError('В синтетическом каталоге нет совместимых сборок')
+        post_data = {slot: getattr(sample, f'{slot}_id') or '' for slot in Build.COMPONENT_FIELDS}
+
+        scenarios = {'home': (anonymous, 'get', lambda: (reverse('home'), None))}
+        for name in LIST_VIEWS:
+            scenarios[name] = (anonymous, 'get', lambda url=reverse(name): (url, None))
+        scenarios['build_detail'] = (
+            anonymous, 'get', lambda: (reverse('build_detail', args=[rng.choice(public_ids)]), None)
+        )
+        scenarios['build_create'] = (member, 'get', lambda: (reverse('build_create'), None))
+        scenarios['compatibility_check'] = (
+            anonymous, 'get', lambda: (reverse('api_compatibility_check'), post_data),
+        )
+        scenarios['build_create_post'] = (
+            member, 'post',
+            lambda: (reverse('build_create'), {'name': 'Бенчмарк', 'is_public': 'on', **post_data}),
+        )
+        return scenarios
+
+    def run_scenarios(self, options):
+        results = {}
+        for name, (client, method, next_request) in self.scenarios(options['seed']).items():
+            for _ in range(options['warmup']):
+                self.request(client, method, next_request, options['cold_cache'])
+            samples = [
+                self.request(client, method, next_request, options['cold_cache'])
+                for _ in range(options['runs'])
+            ]
+            results[name] = self.summarize(samples)
+        return results
+
+    @staticmethod
+    def request(client, method, next_request, cold_cache):
+        url, data = next_request()
+        if cold_cache:
+            cache.clear()
+        start = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        latency = time.perf_counter() - start
+        if response.status_code not in (200, 302):
+            raise CommandError(f'{method.upper()} {url}: ответ {response.status_code}')
+        metrics = getattr(response.wsgi_request, 'metrics', None)
+        if metrics is None:
+            raise CommandError('Для замера нужен builder.metrics.MetricsMiddleware в MIDDLEWARE')
+        return latency, metrics
+
+    @staticmethod
+    def summarize(samples):
+        latencies = [latency for latency, _ in samples]
+        queries = [metrics.queries for _, metrics in samples]
+        p95 = statistics.quantiles(latencies, n=20, method='inclusive')[-1]
+        return {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / sum(latencies), 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(p95 * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+            'db_ms_p50': round(statistics.median(metrics.db_time for _, metrics in samples) * 1000, 2),
+            'template_ms_p50': round(statistics.median(metrics.template_time for _, metrics in samples) * 1000, 2),
+        }
+
+    @staticmethod
+    def load_baseline(path):
+        try:
+            with open(path, encoding='utf-8') as source:
+                return json.load(source)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Не удалось прочитать {path}: {exc}')
+
+    def write_summary(self, report, baseline):
+        tables = ', '.join(f'{table} {count}' for table, count in report['tables'].items())
+        self.stdout.write(f'Каталог: {tables}; заполнен за {report["generate_seconds"]} с')
+        previous = (baseline or {}).get('scenarios', {})
+        for name, stats in report['scenarios'].items():
+            line = (
+                f'{name:<18} {stats["throughput_rps"]:>8} rps  p50 {stats["p50_ms"]:>8} мс  '
+                f'p95 {stats["p95_ms"]:>8} мс  SQL {stats["queries_max"]}'
+            )
+            if name in previous:
+                change = (stats['p95_ms'] / previous[name]['p95_ms'] - 1) * 100 if previous[name]['p95_ms'] else 0
+                line += f'  p95 {change:+.0f}% к базовому'
+            self.stdout.write(line)
+
+    @staticmethod
+    def git_commit():
+        try:
+            completed = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR
+            )
+        except OSError:
+            return None
+        return completed.stdout.strip() or None
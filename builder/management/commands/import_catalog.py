@@ -0,0 +1,226 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from builder.cache import bump_version
+from builder.compatibility import CATALOG_FIELDS
+from builder.models import Build, PricePerformanceMixin, build_compatibility_expressions, build_totals_expressions
+from builder.prices import record_prices
+
+
+MODELS = {slot: model for slot, (model, _) in CATALOG_FIELDS.items()}
+
+# Служебные поля, которые не берутся из файла (кроме них пропускаются
+# нередактируемые поля, например вычисляемый score_per_rub)
+SKIP_FIELDS = {'id', 'created_at', 'updated_at'}
+
+TRUE_VALUES = {'1', 't', 'true', 'yes', 'да'}
+FALSE_VALUES = {'0', 'f', 'false', 'no', 'нет'}
+
+
+def read_rows(path, file_format):
+    """Построчное чтение CSV или JSONL без загрузки файла в память.
+
+    Отдаёт пары (номер строки файла, запись). Строка JSONL, которую не удалось
+    разобрать, отдаётся как ValidationError: чтение продолжается, а handle()
+    считает её ошибочной записью.
+    """
+    with open(path, newline='', encoding='utf-8') as stream:
+        if file_format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(stream, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as error:
+                    row = ValidationError(f'некорректный JSON: {error.msg} (символ {error.colno})')
+                else:
+                    if not isinstance(row, dict):
+                        row = ValidationError('строка JSONL должна быть объектом')
+                yield number, row
+
+
+class RowConverter:
+    """Проверка и приведение строки файла к полям модели (включая choices)"""
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = [
+            field for field in model._meta.concrete_fields
+            if field.name not in SKIP_FIELDS and field.editable
+        ]
+
+    def __call__(self, row):
+        values = {}
+        errors = []
+        for field in self.fields:
+            raw = row.get(field.name)
+            if raw in (None, ''):
+                if field.has_default():
+                    values[field.name] = field.get_default()
+                    continue
+                errors.append(f'{field.name}: обязательное поле')
+                continue
+            if isinstance(field, models.BooleanField) and isinstance(raw, str):
+                lowered = raw.strip().lower()
+                raw = True if lowered in TRUE_VALUES else False if lowered in FALSE_VALUES else raw
+            try:
+                values[field.name] = field.clean(raw, None)
+            except ValidationError as error:
+                errors.append(f'{field.name}: {"; ".join(error.messages)}')
+        if errors:
+            raise ValidationError(errors)
+        instance = self.model(**values)
+        if isinstance(instance, PricePerformanceMixin):
+            instance.refresh_score_per_rub()
+        return instance
+
+
+class Command(BaseCommand):
+    help = 'Потоковый импорт комплектующих и цен из CSV/JSONL с пакетным upsert'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv или .jsonl')
+        parser.add_argument(
+            '--model', choices=sorted(MODELS),
+            help='Тип комплектующих; без него тип берётся из колонки model каждой строки',
+        )
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='По умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--strict', action='store_true', help='Остановиться на первой ошибочной строке')
+        parser.add_argument(
+            '--price-history', action='store_true',
+            help='Записать цены строк в историю (время — колонка observed_at или текущее); '
+                 'avg_used_price пересчитывается по скользящему окну',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+        file_format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+
+        self.batch_size = options['batch_size']
+        self.converters = {slot: RowConverter(model) for slot, model in MODELS.items()}
+        self.buffers = {slot: {} for slot in MODELS}
+        self.price_history = options['price_history']
+        self.observations = {slot: [] for slot in MODELS}
+        self.recorded = 0
+        self.imported = dict.fromkeys(MODELS, 0)
+        invalid = 0
+        started = time.perf_counter()
+
+        try:
+            for count, (number, row) in enumerate(read_rows(path, file_format), 1):
+                try:
+                    if isinstance(row, ValidationError):
+                        raise row
+                    slot = options['model'] or row.get('model')
+                    if slot not in MODELS:
+                        raise ValidationError(f'неизвестный тип комплектующих: {slot!r}')
+                    instance = self.converters[slot](row)
+                    observed_at = self.parse_observed_at(row) if self.price_history else None
+                except ValidationError as error:
+                    invalid += 1
+                    message = f'Строка {number}: {", ".join(error.messages)}'
+                    if options['strict']:
+                        raise CommandError(message)
+                    if invalid <= 20:
+                        self.stderr.write(message)
+                    continue
+
+                # Повтор ключа внутри пакета: побеждает последняя строка
+                key = tuple(getattr(instance, field) for field in instance.NATURAL_KEY)
+                self.buffers[slot][key] = instance
+                if self.price_history:
+                    # Все строки попадают в историю, даже если ключ повторяется
+                    self.observations[slot].append((key, instance.avg_used_price, observed_at))
+                if len(self.buffers[slot]) >= self.batch_size or len(self.observations[slot]) >= self.batch_size:
+                    self.flush(slot)
+
+                if count % 100000 == 0:
+                    self.report(count, started)
+
+            for slot in MODELS:
+                self.flush(slot)
+        finally:
+            # Пакеты, записанные до ошибки (--strict, сбой БД), уже в базе:
+            # версии кэша и итоги сборок должны их учесть
+            self.after_import()
+
+        total = sum(self.imported.values())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано строк: {total}, с ошибками: {invalid}, '
+            f'{elapsed:.1f} с ({total / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
+        for slot, count in self.imported.items():
+            if count:
+                self.stdout.write(f'  {slot}: {count}')
+        if self.recorded:
+            self.stdout.write(f'  наблюдений цен: {self.recorded}')
+
+    def flush(self, slot):
+        batch = list(self.buffers[slot].values())
+        if not batch:
+            return
+        model = MODELS[slot]
+        update_fields = [
+            field.name for field in model._meta.concrete_fields
+            if not field.primary_key and field.name not in model.NATURAL_KEY and field.name != 'created_at'
+        ]
+        with transaction.atomic():
+            model.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=list(model.NATURAL_KEY),
+                update_fields=update_fields,
+            )
+            if self.price_history:
+                # bulk_create с update_conflicts проставляет pk и существующим строкам
+                pks = {key: instance.pk for key, instance in self.buffers[slot].items()}
+                self.recorded += record_prices(
+                    (slot, pks[key], price, observed_at)
+                    for key, price, observed_at in self.observations[slot]
+                )
+        self.imported[slot] += len(batch)
+        self.buffers[slot] = {}
+        self.observations[slot] = []
+
+    def parse_observed_at(self, row):
+        raw = row.get('observed_at')
+        if not raw:
+            return None
+        observed_at = parse_datetime(raw)
+        if observed_at is None:
+            raise ValidationError(f'observed_at: неверный формат даты {raw!r}')
+        if timezone.is_naive(observed_at):
+            observed_at = timezone.make_aware(observed_at)
+        return observed_at
+
+    def after_import(self):
+        """bulk_create не отправляет сигналы — обновляем зависимые данные сами"""
+        touched = [slot for slot, count in self.imported.items() if count]
+        if not touched:
+            return
+        for slot in touched:
+            bump_version(slot)
+        # Один UPDATE по всем сборкам вместо пересохранения каждой
+        Build.objects.update(**build_totals_expressions(), **build_compatibility_expressions())
+        bump_version('build')
+
+    def report(self, rows, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'  ...{rows} строк, {rows / elapsed:.0f} строк/с')
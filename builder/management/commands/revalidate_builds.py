@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+
+from builder.cache import bump_version
+from builder.models import Build, revalidate_builds
+from builder.rules import get_rules
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт флагов совместимости сохранённых сборок (одним UPDATE с JOIN по деталям)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--slot', choices=Build.COMPONENT_FIELDS,
+            help='Проверить только сборки с деталями этого типа из --ids',
+        )
+        parser.add_argument('--ids', help='pk деталей через запятую (вместе с --slot)')
+
+    def handle(self, *args, **options):
+        queryset = Build.objects.all()
+        if options['slot'] or options['ids']:
+            if not (options['slot'] and options['ids']):
+                raise CommandError('--slot и --ids задаются вместе')
+            try:
+                ids = [int(value) for value in options['ids'].split(',') if value.strip()]
+            except ValueError:
+                raise CommandError('--ids: ожидаются целые числа через запятую')
+            queryset = queryset.filter(**{f'{options["slot"]}__in': ids})
+
+        started = time.perf_counter()
+        changed = revalidate_builds(queryset)
+        elapsed = time.perf_counter() - started
+        if changed:
+            bump_version('build')
+
+        flag_names = get_rules().flag_labels()
+        counts = queryset.aggregate(
+            total=Count('pk'),
+            **{f'flag_{flag}': Count('pk', filter=Q(compatibility_flags__in=self.values_with(flag, flag_names)))
+               for flag in flag_names},
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено сборок: {counts["total"]}, изменились флаги: {changed} ({elapsed:.2f} с)'
+        ))
+        for flag, name in flag_names.items():
+            if counts[f'flag_{flag}']:
+                self.stdout.write(f'  {name}: {counts[f"flag_{flag}"]}')
+
+    @staticmethod
+    def values_with(flag, flag_names):
+        # Флаг как список значений, в которых он выставлен: обычный IN без битовых операций
+        return [value for value in range(sum(flag_names) + 1) if value & flag]
@@ -0,0 +1,230 @@
+"""Метрики запросов: SQL, время БД, рендер шаблонов и полное время ответа.
+
+К соединениям с БД подключена обёртка (connection.execute_wrapper),
+которая считает запросы и их время, пока идёт запрос под
+MetricsMiddleware. Обёртка ставится по сигналу request_started: он
+приходит в поток, где выполняется синхронный код запроса, — под ASGI
+это тот же поток, в котором работает async ORM. Время рендера шаблонов
+считает бэкенд TimedDjangoTemplates (указан в TEMPLATES). Middleware
+работает и в синхронном, и в асинхронном стеке. Итоги по каждому view:
+
+* копятся в реестре процесса и отдаются в формате Prometheus (view metrics);
+* пишутся строкой JSON в лог builder.metrics.
+
+View может объявить бюджет запросов декоратором @query_budget(n):
+превышение пишется в лог предупреждением, а в тестах его ловит
+QueryBudgetMixin (см. tests.py). Реестр у каждого воркера свой.
+"""
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+logger = logging.getLogger('builder.metrics')
+
+# Границы гистограммы времени ответа, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_current = ContextVar('builder_request_metrics', default=None)
+
+
+def query_budget(limit):
+    """Декоратор view: сколько SQL-запросов допустимо на один запрос"""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class RequestMetrics:
+    """Показатели одного запроса (доступны как request.metrics)"""
+
+    def __init__(self):
+        self.view = None
+        self.budget = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.started = 0.0
+        self.latency = 0.0
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'budget': self.budget,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'latency_ms': round(self.latency * 1000, 2),
+        }
+
+
+def _timed_execute(execute, sql, params, many, context):
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.db_time += time.perf_counter() - start
+
+
+@receiver(request_started)
+def track_queries(sender, **kwargs):
+    """Обёртка-счётчик на соединениях текущего потока (ставится один раз)"""
+    for connection in connections.all():
+        if _timed_execute not in connection.execute_wrappers:
+            # В начало: execute_wrapper() других обёрток снимает последнюю из списка
+            connection.execute_wrappers.insert(0, _timed_execute)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            if metrics is not None:
+                metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Стандартный бэкенд шаблонов, который учитывает время рендера в метриках"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class MetricsRegistry:
+    """Накопленные показатели по view для экспорта в Prometheus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, metrics):
+        with self._lock:
+            stats = self._views.setdefault(metrics.view, {
+                'requests': 0, 'queries': 0, 'db_seconds': 0.0, 'template_seconds': 0.0,
+                'latency_sum': 0.0, 'buckets': [0] * len(LATENCY_BUCKETS), 'over_budget': 0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += metrics.queries
+            stats['db_seconds'] += metrics.db_time
+            stats['template_seconds'] += metrics.template_time
+            stats['latency_sum'] += metrics.latency
+            for i, edge in enumerate(LATENCY_BUCKETS):
+                if metrics.latency <= edge:
+                    stats['buckets'][i] += 1
+            stats['over_budget'] += metrics.over_budget
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """Текст в формате Prometheus exposition 0.0.4"""
+        with self._lock:
+            views = {view: {**stats, 'buckets': list(stats['buckets'])} for view, stats in self._views.items()}
+        lines = []
+
+        def counter(name, help_text, key, kind='counter'):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for view, stats in sorted(views.items()):
+                lines.append(f'{name}{{view="{view}"}} {stats[key]}')
+
+        counter('builder_requests_total', 'Обработанные запросы.', 'requests')
+        counter('builder_db_queries_total', 'SQL-запросы.', 'queries')
+        counter('builder_db_seconds_total', 'Время выполнения SQL.', 'db_seconds')
+        counter('builder_template_seconds_total', 'Время рендера шаблонов.', 'template_seconds')
+        counter('builder_query_budget_exceeded_total', 'Запросы сверх бюджета view.', 'over_budget')
+
+        name = 'builder_request_duration_seconds'
+        lines.append(f'# HELP {name} Полное время ответа.')
+        lines.append(f'# TYPE {name} histogram')
+        for view, stats in sorted(views.items()):
+            for edge, count in zip(LATENCY_BUCKETS, stats['buckets']):
+                lines.append(f'{name}_bucket{{view="{view}",le="{edge}"}} {count}')
+            lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {stats["requests"]}')
+            lines.append(f'{name}_sum{{view="{view}"}} {stats["latency_sum"]}')
+            lines.append(f'{name}_count{{view="{view}"}} {stats["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Считает SQL, время БД и шаблонов для каждого запроса; ставится первым в MIDDLEWARE"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(metrics, token)
+        return self.report(request, response)
+
+    async def __acall__(self, request):
+        metrics, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finish(metrics, token)
+        return self.report(request, response)
+
+    @staticmethod
+    def start(request):
+        metrics = request.metrics = RequestMetrics()
+        metrics.started = time.perf_counter()
+        return metrics, _current.set(metrics)
+
+    @staticmethod
+    def finish(metrics, token):
+        metrics.latency = time.perf_counter() - metrics.started
+        _current.reset(token)
+
+    @staticmethod
+    def report(request, response):
+        metrics = request.metrics
+        match = request.resolver_match
+        metrics.view = match.view_name if match else 'unresolved'
+        metrics.budget = getattr(match.func, 'query_budget', None) if match else None
+        registry.observe(metrics)
+        if metrics.over_budget:
+            logger.warning(json.dumps({**metrics.as_dict(), 'event': 'query_budget_exceeded'}))
+        else:
+            logger.info(json.dumps({**metrics.as_dict(), 'status': response.status_code}))
+        return response
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_build_totals(apps, schema_editor):
+    """Итоги для уже существующих сборок (логика Build.get_total_*)"""
+    Build = apps.get_model('builder', 'Build')
+    builds = Build.objects.select_related('cpu', 'gpu', 'motherboard', 'ram', 'psu', 'case')
+    for build in builds.iterator():
+        components = [build.cpu, build.gpu, build.motherboard, build.ram, build.psu, build.case]
+        build.total_price = sum(c.avg_used_price for c in components if c and c.avg_used_price)
+        cpu_tdp = build.cpu.tdp if build.cpu else 0
+        gpu_tdp = build.gpu.tdp if build.gpu else 0
+        build.total_tdp = cpu_tdp + gpu_tdp + 50
+        cpu_score = build.cpu.benchmark_score if build.cpu else 0
+        gpu_score = build.gpu.benchmark_score if build.gpu else 0
+        build.benchmark_score = int(gpu_score * 0.6 + cpu_score * 0.4)
+        build.save(update_fields=['total_price', 'total_tdp', 'benchmark_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builder', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='build',
+            name='benchmark_score',
+            field=models.PositiveIntegerField(default=0, verbose_name='Benchmark Score'),
+        ),
+        migrations.AddField(
+            model_name='build',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Общая стоимость'),
+        ),
+        migrations.AddField(
+            model_name='build',
+            name='total_tdp',
+            field=models.PositiveIntegerField(default=0, verbose_name='Энергопотребление (Вт)'),
+        ),
+        migrations.AddIndex(
+            model_name='build',
+            index=models.Index(fields=['is_public', 'total_price'], name='build_public_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='build',
+            index=models.Index(fields=['is_public', 'benchmark_score'], name='build_public_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='build',
+            index=models.Index(fields=['is_public', 'total_tdp'], name='build_public_tdp_idx'),
+        ),
+        migrations.RunPython(fill_build_totals, migrations.RunPython.noop),
+    ]
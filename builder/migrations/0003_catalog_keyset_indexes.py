@@ -0,0 +1,153 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builder', '0002_build_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['form_factor', 'avg_used_price', 'id'], name='case_ff_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['form_factor', 'name', 'id'], name='case_ff_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['form_factor', 'max_gpu_length', 'id'], name='case_ff_gpulen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['avg_used_price', 'id'], name='case_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['name', 'id'], name='case_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['max_gpu_length', 'id'], name='case_gpulen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['socket', 'avg_used_price', 'id'], name='cpu_socket_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['socket', 'benchmark_score', 'id'], name='cpu_socket_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['socket', 'name', 'id'], name='cpu_socket_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['avg_used_price', 'id'], name='cpu_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['benchmark_score', 'id'], name='cpu_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['name', 'id'], name='cpu_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['vram', 'avg_used_price', 'id'], name='gpu_vram_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['vram', 'benchmark_score', 'id'], name='gpu_vram_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['vram', 'name', 'id'], name='gpu_vram_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['avg_used_price', 'id'], name='gpu_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['benchmark_score', 'id'], name='gpu_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['name', 'id'], name='gpu_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['socket', 'form_factor', 'avg_used_price', 'id'], name='mb_socket_ff_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['socket', 'form_factor', 'name', 'id'], name='mb_socket_ff_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['form_factor', 'avg_used_price', 'id'], name='mb_ff_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['form_factor', 'name', 'id'], name='mb_ff_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['avg_used_price', 'id'], name='mb_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['name', 'id'], name='mb_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='psu',
+            index=models.Index(fields=['efficiency', 'avg_used_price', 'id'], name='psu_eff_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='psu',
+            index=models.Index(fields=['efficiency', 'wattage', 'id'], name='psu_eff_watt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='psu',
+            index=models.Index(fields=['avg_used_price', 'id'], name='psu_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='psu',
+            index=models.Index(fields=['wattage', 'id'], name='psu_watt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ram',
+            index=models.Index(fields=['memory_type', 'avg_used_price', 'id'], name='ram_mem_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ram',
+            index=models.Index(fields=['memory_type', 'capacity', 'id'], name='ram_mem_cap_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ram',
+            index=models.Index(fields=['memory_type', 'speed', 'id'], name='ram_mem_speed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ram',
+            index=models.Index(fields=['capacity', 'avg_used_price', 'id'], name='ram_cap_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ram',
+            index=models.Index(fields=['avg_used_price', 'id'], name='ram_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ram',
+            index=models.Index(fields=['capacity', 'id'], name='ram_cap_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ram',
+            index=models.Index(fields=['speed', 'id'], name='ram_speed_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builder', '0003_catalog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='case',
+            constraint=models.UniqueConstraint(fields=('manufacturer', 'name'), name='case_natural_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='cpu',
+            constraint=models.UniqueConstraint(fields=('manufacturer', 'name'), name='cpu_natural_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='gpu',
+            constraint=models.UniqueConstraint(fields=('manufacturer', 'name'), name='gpu_natural_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='motherboard',
+            constraint=models.UniqueConstraint(fields=('manufacturer', 'name'), name='mb_natural_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='psu',
+            constraint=models.UniqueConstraint(fields=('manufacturer', 'name', 'wattage'), name='psu_natural_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='ram',
+            constraint=models.UniqueConstraint(fields=('manufacturer', 'name', 'capacity'), name='ram_natural_key'),
+        ),
+    ]
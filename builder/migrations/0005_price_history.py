@@ -0,0 +1,48 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:14
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builder', '0004_catalog_natural_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component_type', models.PositiveSmallIntegerField(choices=[(1, 'Процессор'), (2, 'Видеокарта'), (3, 'Материнская плата'), (4, 'Оперативная память'), (5, 'Блок питания'), (6, 'Корпус')], verbose_name='Тип комплектующей')),
+                ('component_id', models.PositiveIntegerField(verbose_name='ID комплектующей')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Цена')),
+                ('observed_at', models.DateTimeField(verbose_name='Время наблюдения')),
+            ],
+            options={
+                'verbose_name': 'Наблюдение цены',
+                'verbose_name_plural': 'Наблюдения цен',
+                'indexes': [models.Index(fields=['component_type', 'component_id', 'observed_at'], name='price_obs_component_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component_type', models.PositiveSmallIntegerField(choices=[(1, 'Процессор'), (2, 'Видеокарта'), (3, 'Материнская плата'), (4, 'Оперативная память'), (5, 'Блок питания'), (6, 'Корпус')], verbose_name='Тип комплектующей')),
+                ('component_id', models.PositiveIntegerField(verbose_name='ID комплектующей')),
+                ('period', models.CharField(choices=[('day', 'День'), ('week', 'Неделя')], max_length=4, verbose_name='Период')),
+                ('period_start', models.DateField(verbose_name='Начало периода')),
+                ('count', models.PositiveIntegerField(verbose_name='Количество наблюдений')),
+                ('price_sum', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Сумма цен')),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Минимальная цена')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Максимальная цена')),
+            ],
+            options={
+                'verbose_name': 'Агрегат цен',
+                'verbose_name_plural': 'Агрегаты цен',
+                'constraints': [models.UniqueConstraint(fields=('component_type', 'component_id', 'period', 'period_start'), name='price_rollup_period_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:23
+
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+def fill_score_per_rub(apps, schema_editor):
+    """score_per_rub для существующих CPU и GPU — одним UPDATE на таблицу"""
+    for name in ('CPU', 'GPU'):
+        model = apps.get_model('builder', name)
+        model.objects.filter(avg_used_price__gt=0).update(
+            score_per_rub=Cast('benchmark_score', models.FloatField()) / Cast('avg_used_price', models.FloatField())
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builder', '0005_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cpu',
+            name='score_per_rub',
+            field=models.FloatField(default=0, editable=False, verbose_name='Score на рубль'),
+        ),
+        migrations.AddField(
+            model_name='gpu',
+            name='score_per_rub',
+            field=models.FloatField(default=0, editable=False, verbose_name='Score на рубль'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['socket', 'score_per_rub', 'id'], name='cpu_socket_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cpu',
+            index=models.Index(fields=['score_per_rub', 'id'], name='cpu_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['vram', 'score_per_rub', 'id'], name='gpu_vram_value_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpu',
+            index=models.Index(fields=['score_per_rub', 'id'], name='gpu_value_idx'),
+        ),
+        migrations.RunPython(fill_score_per_rub, migrations.RunPython.noop),
+    ]
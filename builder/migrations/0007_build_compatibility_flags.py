@@ -0,0 +1,49 @@
+# Generated by Django 5.2.10 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+SUPPORTED_FORM_FACTORS = {
+    'ATX': ('ATX', 'mATX', 'ITX'),
+    'mATX': ('mATX', 'ITX'),
+    'ITX': ('ITX',),
+}
+
+
+def fill_compatibility_flags(apps, schema_editor):
+    """Флаги для уже существующих сборок (логика Build.get_compatibility_flags)"""
+    Build = apps.get_model('builder', 'Build')
+    builds = Build.objects.select_related('cpu', 'gpu', 'motherboard', 'ram', 'psu', 'case')
+    for build in builds.iterator():
+        flags = 0
+        if build.cpu and build.motherboard and build.cpu.socket != build.motherboard.socket:
+            flags |= 1
+        if build.ram and build.motherboard and build.ram.memory_type != build.motherboard.memory_type:
+            flags |= 2
+        if build.gpu and build.case and build.gpu.length > build.case.max_gpu_length:
+            flags |= 4
+        if build.motherboard and build.case:
+            if build.motherboard.form_factor not in SUPPORTED_FORM_FACTORS.get(build.case.form_factor, ()):
+                flags |= 8
+        tdp = (build.cpu.tdp if build.cpu else 0) + (build.gpu.tdp if build.gpu else 0) + 50
+        if build.psu and build.psu.wattage < int(tdp * 1.3):
+            flags |= 16
+        if flags:
+            build.compatibility_flags = flags
+            build.save(update_fields=['compatibility_flags'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builder', '0006_score_per_rub'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='build',
+            name='compatibility_flags',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Проблемы совместимости'),
+        ),
+        migrations.RunPython(fill_compatibility_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builder', '0007_build_compatibility_flags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['socket', 'avg_used_price', 'id'], name='mb_socket_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherboard',
+            index=models.Index(fields=['socket', 'name', 'id'], name='mb_socket_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='psu',
+            index=models.Index(fields=['wattage', 'avg_used_price', 'id'], name='psu_watt_price_idx'),
+        ),
+    ]
@@ -1,11 +1,41 @@
 from django.db import models
+from django.db.models import DecimalField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 
 
-class CPU(models.Model):
+class PricePerformanceMixin:
+    """Материализованное соотношение benchmark_score / avg_used_price.
+
+    Хранится в поле score_per_rub, чтобы «лучшие по цене/производительности»
+    сортировались в БД по индексу. Пересчитывается при save() только если
+    менялись цена или score, а при loaddata (raw=True, в обход save()) —
+    в сигнале pre_save; массовые пути (import_catalog, prices.py)
+    вызывают refresh_score_per_rub() сами.
+    """
+    
+    SCORE_PER_RUB_SOURCE = ('benchmark_score', 'avg_used_price')
+
+    def refresh_score_per_rub(self):
+        price = self.avg_used_price
+        self.score_per_rub = float(self.benchmark_score) / float(price) if price else 0.0
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.SCORE_PER_RUB_SOURCE):
+            self.refresh_score_per_rub()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'score_per_rub'}
+        super().save(*args, **kwargs)
+
+
+class CPU(PricePerformanceMixin, models.Model):
     """Процессор"""
     
+    # Естественный ключ для импорта каталога (import_catalog)
+    NATURAL_KEY = ('manufacturer', 'name')
+    
     SOCKET_CHOICES = [
         ('AM4', 'AMD AM4'),
         ('AM5', 'AMD AM5'),
@@ -30,6 +60,7 @@ class CPU(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(0)]
     )
+    score_per_rub = models.FloatField('Score на рубль', default=0, editable=False)
     created_at = models.DateTimeField('Дата добавления', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
@@ -37,14 +68,31 @@ class CPU(models.Model):
         verbose_name = 'Процессор'
         verbose_name_plural = 'Процессоры'
         ordering = ['-benchmark_score']
+        # Составные индексы «фильтр + сортировка + id» для курсорной пагинации
+        indexes = [
+            models.Index(fields=['socket', 'avg_used_price', 'id'], name='cpu_socket_price_idx'),
+            models.Index(fields=['socket', 'benchmark_score', 'id'], name='cpu_socket_score_idx'),
+            models.Index(fields=['socket', 'name', 'id'], name='cpu_socket_name_idx'),
+            models.Index(fields=['avg_used_price', 'id'], name='cpu_price_idx'),
+            models.Index(fields=['benchmark_score', 'id'], name='cpu_score_idx'),
+            models.Index(fields=['name', 'id'], name='cpu_name_idx'),
+            models.Index(fields=['socket', 'score_per_rub', 'id'], name='cpu_socket_value_idx'),
+            models.Index(fields=['score_per_rub', 'id'], name='cpu_value_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['manufacturer', 'name'], name='cpu_natural_key'),
+        ]
 
     def __str__(self):
         return f"{self.manufacturer} {self.name}"
 
 
-class GPU(models.Model):
+class GPU(PricePerformanceMixin, models.Model):
     """Видеокарта"""
     
+    # Естественный ключ для импорта каталога (import_catalog)
+    NATURAL_KEY = ('manufacturer', 'name')
+    
     MEMORY_TYPE_CHOICES = [
         ('GDDR5', 'GDDR5'),
         ('GDDR6', 'GDDR6'),
@@ -65,6 +113,7 @@ class GPU(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(0)]
     )
+    score_per_rub = models.FloatField('Score на рубль', default=0, editable=False)
     created_at = models.DateTimeField('Дата добавления', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
@@ -72,6 +121,20 @@ class GPU(models.Model):
         verbose_name = 'Видеокарта'
         verbose_name_plural = 'Видеокарты'
         ordering = ['-benchmark_score']
+        # Составные индексы «фильтр + сортировка + id» для курсорной пагинации
+        indexes = [
+            models.Index(fields=['vram', 'avg_used_price', 'id'], name='gpu_vram_price_idx'),
+            models.Index(fields=['vram', 'benchmark_score', 'id'], name='gpu_vram_score_idx'),
+            models.Index(fields=['vram', 'name', 'id'], name='gpu_vram_name_idx'),
+            models.Index(fields=['avg_used_price', 'id'], name='gpu_price_idx'),
+            models.Index(fields=['benchmark_score', 'id'], name='gpu_score_idx'),
+            models.Index(fields=['name', 'id'], name='gpu_name_idx'),
+            models.Index(fields=['vram', 'score_per_rub', 'id'], name='gpu_vram_value_idx'),
+            models.Index(fields=['score_per_rub', 'id'], name='gpu_value_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['manufacturer', 'name'], name='gpu_natural_key'),
+        ]
 
     def __str__(self):
         return f"{self.manufacturer} {self.name}"
@@ -80,6 +143,9 @@ class GPU(models.Model):
 class Motherboard(models.Model):
     """Материнская плата"""
     
+    # Естественный ключ для импорта каталога (import_catalog)
+    NATURAL_KEY = ('manufacturer', 'name')
+    
     SOCKET_CHOICES = [
         ('AM4', 'AMD AM4'),
         ('AM5', 'AMD AM5'),
@@ -120,6 +186,20 @@ class Motherboard(models.Model):
         verbose_name = 'Материнская плата'
         verbose_name_plural = 'Материнские платы'
         ordering = ['manufacturer', 'name']
+        # Составные индексы «фильтр + сортировка + id» для курсорной пагинации
+        indexes = [
+            models.Index(fields=['socket', 'form_factor', 'avg_used_price', 'id'], name='mb_socket_ff_price_idx'),
+            models.Index(fields=['socket', 'form_factor', 'name', 'id'], name='mb_socket_ff_name_idx'),
+            models.Index(fields=['socket', 'avg_used_price', 'id'], name='mb_socket_price_idx'),
+            models.Index(fields=['socket', 'name', 'id'], name='mb_socket_name_idx'),
+            models.Index(fields=['form_factor', 'avg_used_price', 'id'], name='mb_ff_price_idx'),
+            models.Index(fields=['form_factor', 'name', 'id'], name='mb_ff_name_idx'),
+            models.Index(fields=['avg_used_price', 'id'], name='mb_price_idx'),
+            models.Index(fields=['name', 'id'], name='mb_name_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['manufacturer', 'name'], name='mb_natural_key'),
+        ]
 
     def __str__(self):
         return f"{self.manufacturer} {self.name}"
@@ -128,6 +208,9 @@ class Motherboard(models.Model):
 class RAM(models.Model):
     """Оперативная память"""
     
+    # Естественный ключ для импорта каталога (import_catalog)
+    NATURAL_KEY = ('manufacturer', 'name', 'capacity')
+    
     MEMORY_TYPE_CHOICES = [
         ('DDR4', 'DDR4'),
         ('DDR5', 'DDR5'),
@@ -152,6 +235,19 @@ class RAM(models.Model):
         verbose_name = 'Оперативная память'
         verbose_name_plural = 'Оперативная память'
         ordering = ['-capacity', '-speed']
+        # Составные индексы «фильтр + сортировка + id» для курсорной пагинации
+        indexes = [
+            models.Index(fields=['memory_type', 'avg_used_price', 'id'], name='ram_mem_price_idx'),
+            models.Index(fields=['memory_type', 'capacity', 'id'], name='ram_mem_cap_idx'),
+            models.Index(fields=['memory_type', 'speed', 'id'], name='ram_mem_speed_idx'),
+            models.Index(fields=['capacity', 'avg_used_price', 'id'], name='ram_cap_price_idx'),
+            models.Index(fields=['avg_used_price', 'id'], name='ram_price_idx'),
+            models.Index(fields=['capacity', 'id'], name='ram_cap_idx'),
+            models.Index(fields=['speed', 'id'], name='ram_speed_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['manufacturer', 'name', 'capacity'], name='ram_natural_key'),
+        ]
 
     def __str__(self):
         return f"{self.manufacturer} {self.name} {self.capacity}GB"
@@ -160,6 +256,9 @@ class RAM(models.Model):
 class PSU(models.Model):
     """Блок питания"""
     
+    # Естественный ключ для импорта каталога (import_catalog)
+    NATURAL_KEY = ('manufacturer', 'name', 'wattage')
+    
     EFFICIENCY_CHOICES = [
         ('80+', '80 Plus'),
         ('Bronze', '80+ Bronze'),
@@ -186,6 +285,18 @@ class PSU(models.Model):
         verbose_name = 'Блок питания'
         verbose_name_plural = 'Блоки питания'
         ordering = ['-wattage']
+        # Составные индексы «фильтр + сортировка + id» для курсорной пагинации
+        indexes = [
+            models.Index(fields=['efficiency', 'avg_used_price', 'id'], name='psu_eff_price_idx'),
+            models.Index(fields=['efficiency', 'wattage', 'id'], name='psu_eff_watt_idx'),
+            models.Index(fields=['avg_used_price', 'id'], name='psu_price_idx'),
+            models.Index(fields=['wattage', 'id'], name='psu_watt_idx'),
+            # min_wattage — диапазон: индекс отбирает строки по мощности, цена досортировывается
+            models.Index(fields=['wattage', 'avg_used_price', 'id'], name='psu_watt_price_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['manufacturer', 'name', 'wattage'], name='psu_natural_key'),
+        ]
 
     def __str__(self):
         return f"{self.manufacturer} {self.name} {self.wattage}W"
@@ -194,12 +305,22 @@ class PSU(models.Model):
 class Case(models.Model):
     """Корпус"""
     
+    # Естественный ключ для импорта каталога (import_catalog)
+    NATURAL_KEY = ('manufacturer', 'name')
+    
     FORM_FACTOR_CHOICES = [
         ('ATX', 'ATX'),
         ('mATX', 'Micro-ATX'),
         ('ITX', 'Mini-ITX'),
     ]
     
+    # Какие форм-факторы материнских плат помещаются в корпус
+    SUPPORTED_FORM_FACTORS = {
+        'ATX': ('ATX', 'mATX', 'ITX'),
+        'mATX': ('mATX', 'ITX'),
+        'ITX': ('ITX',),
+    }
+    
     name = models.CharField('Название', max_length=200)
     manufacturer = models.CharField('Производитель', max_length=100)
     form_factor = models.CharField('Форм-фактор', max_length=10, choices=FORM_FACTOR_CHOICES)
@@ -218,6 +339,18 @@ class Case(models.Model):
         verbose_name = 'Корпус'
         verbose_name_plural = 'Корпуса'
         ordering = ['manufacturer', 'name']
+        # Составные индексы «фильтр + сортировка + id» для курсорной пагинации
+        indexes = [
+            models.Index(fields=['form_factor', 'avg_used_price', 'id'], name='case_ff_price_idx'),
+            models.Index(fields=['form_factor', 'name', 'id'], name='case_ff_name_idx'),
+            models.Index(fields=['form_factor', 'max_gpu_length', 'id'], name='case_ff_gpulen_idx'),
+            models.Index(fields=['avg_used_price', 'id'], name='case_price_idx'),
+            models.Index(fields=['name', 'id'], name='case_name_idx'),
+            models.Index(fields=['max_gpu_length', 'id'], name='case_gpulen_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['manufacturer', 'name'], name='case_natural_key'),
+        ]
 
     def __str__(self):
         return f"{self.manufacturer} {self.name}"
@@ -226,6 +359,26 @@ class Case(models.Model):
 class Build(models.Model):
     """Сборка ПК"""
     
+    # Примерное потребление RAM, накопителей и вентиляторов (Вт)
+    BASE_TDP = 50
+    # Запас мощности блока питания
+    PSU_MARGIN = 1.3
+    
+    # Для игр GPU важнее: 60% GPU + 40% CPU
+    GPU_SCORE_WEIGHT = 0.6
+    CPU_SCORE_WEIGHT = 0.4
+    
+    # Флаги проблем совместимости (те же правила, что в builds.check_compatibility)
+    SOCKET_MISMATCH = 1
+    MEMORY_TYPE_MISMATCH = 2
+    GPU_TOO_LONG = 4
+    FORM_FACTOR_MISMATCH = 8
+    # Предупреждение: сборка с ним считается совместимой (RuleSet.error_flags)
+    PSU_TOO_WEAK = 16
+    
+    COMPONENT_FIELDS = ('cpu', 'gpu', 'motherboard', 'ram', 'psu', 'case')
+    TOTAL_FIELDS = ('total_price', 'total_tdp', 'benchmark_score')
+    
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -276,6 +429,15 @@ class Build(models.Model):
     )
     
     is_public = models.BooleanField('Публичная сборка', default=True)
+    
+    # Денормализованные итоги: пересчитываются при сохранении сборки
+    # и при изменении цены/TDP/score её компонентов (см. signals.py)
+    total_price = models.DecimalField('Общая стоимость', max_digits=12, decimal_places=2, default=0)
+    total_tdp = models.PositiveIntegerField('Энергопотребление (Вт)', default=0)
+    benchmark_score = models.PositiveIntegerField('Benchmark Score', default=0)
+    # Сумма флагов *_MISMATCH / GPU_TOO_LONG / PSU_TOO_WEAK; пересчитывается вместе с итогами
+    compatibility_flags = models.PositiveSmallIntegerField('Проблемы совместимости', default=0)
+    
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
@@ -283,10 +445,29 @@ class Build(models.Model):
         verbose_name = 'Сборка'
         verbose_name_plural = 'Сборки'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_public', 'total_price'], name='build_public_price_idx'),
+            models.Index(fields=['is_public', 'benchmark_score'], name='build_public_score_idx'),
+            models.Index(fields=['is_public', 'total_tdp'], name='build_public_tdp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
+    def save(self, *args, **kwargs):
+        self.refresh_totals()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.TOTAL_FIELDS) | {'compatibility_flags'}
+        super().save(*args, **kwargs)
+
+    def refresh_totals(self):
+        """Пересчёт денормализованных итогов и флагов совместимости по текущим компонентам"""
+        self.total_price = self.get_total_price()
+        self.total_tdp = self.get_total_tdp()
+        self.benchmark_score = self.get_benchmark_score()
+        self.compatibility_flags = self.get_compatibility_flags()
+
     def get_total_price(self):
         """Расчёт общей стоимости сборки"""
         components = [self.cpu, self.gpu, self.motherboard, self.ram, self.psu, self.case]
@@ -305,16 +486,179 @@ class Build(models.Model):
         if self.gpu:
             tdp += self.gpu.tdp
         # Добавляем примерное потребление остальных компонентов
-        tdp += 50  # RAM, накопители, вентиляторы
+        tdp += self.BASE_TDP
         return tdp
 
     def get_recommended_psu_wattage(self):
         """Рекомендуемая мощность БП (с запасом 30%)"""
-        return int(self.get_total_tdp() * 1.3)
+        return int(self.get_total_tdp() * self.PSU_MARGIN)
 
     def get_benchmark_score(self):
         """Комбинированный показатель производительности"""
         cpu_score = self.cpu.benchmark_score if self.cpu else 0
         gpu_score = self.gpu.benchmark_score if self.gpu else 0
-        # Для игр GPU важнее: 60% GPU + 40% CPU
-        return int(gpu_score * 0.6 + cpu_score * 0.4)
\ No newline at end of file
+        return int(gpu_score * self.GPU_SCORE_WEIGHT + cpu_score * self.CPU_SCORE_WEIGHT)
+
+    def get_compatibility_flags(self):
+        """Флаги проблем совместимости по текущим компонентам"""
+        from .rules import get_rules
+
+        return get_rules().flags(self)
+
+    @property
+    def is_compatible(self):
+        from .rules import get_rules
+
+        return get_rules().is_compatible(self.compatibility_flags)
+
+
+# Коды типов комплектующих в таблицах истории цен
+COMPONENT_TYPE_CHOICES = [
+    (1, 'Процессор'),
+    (2, 'Видеокарта'),
+    (3, 'Материнская плата'),
+    (4, 'Оперативная память'),
+    (5, 'Блок питания'),
+    (6, 'Корпус'),
+]
+COMPONENT_TYPE_CODES = dict(zip(Build.COMPONENT_FIELDS, (code for code, _ in COMPONENT_TYPE_CHOICES)))
+
+
+class PriceObservation(models.Model):
+    """Наблюдение цены комплектующей (записи только добавляются)"""
+    
+    component_type = models.PositiveSmallIntegerField('Тип комплектующей', choices=COMPONENT_TYPE_CHOICES)
+    component_id = models.PositiveIntegerField('ID комплектующей')
+    price = models.DecimalField('Цена', max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    observed_at = models.DateTimeField('Время наблюдения')
+
+    class Meta:
+        verbose_name = 'Наблюдение цены'
+        verbose_name_plural = 'Наблюдения цен'
+        indexes = [
+            models.Index(fields=['component_type', 'component_id', 'observed_at'], name='price_obs_component_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_component_type_display()} #{self.component_id}: {self.price}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Наблюдения цен не изменяются, только добавляются')
+        super().save(*args, **kwargs)
+
+
+class PriceRollup(models.Model):
+    """Агрегат цен комплектующей за день или неделю (см. prices.py)"""
+    
+    PERIOD_CHOICES = [
+        ('day', 'День'),
+        ('week', 'Неделя'),
+    ]
+    
+    component_type = models.PositiveSmallIntegerField('Тип комплектующей', choices=COMPONENT_TYPE_CHOICES)
+    component_id = models.PositiveIntegerField('ID комплектующей')
+    period = models.CharField('Период', max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateField('Начало периода')
+    # Сумма и количество, а не среднее: так агрегаты складываются при дозаписи
+    count = models.PositiveIntegerField('Количество наблюдений')
+    price_sum = models.DecimalField('Сумма цен', max_digits=14, decimal_places=2)
+    min_price = models.DecimalField('Минимальная цена', max_digits=10, decimal_places=2)
+    max_price = models.DecimalField('Максимальная цена', max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Агрегат цен'
+        verbose_name_plural = 'Агрегаты цен'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['component_type', 'component_id', 'period', 'period_start'],
+                name='price_rollup_period_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_component_type_display()} #{self.component_id}, {self.period} {self.period_start}"
+
+    @property
+    def avg_price(self):
+        return self.price_sum / self.count if self.count else None
+
+
+def _component_value(model, fk_field, field, output_field):
+    """Значение поля компонента сборки (0, если компонент не выбран)"""
+    subquery = model.objects.filter(pk=OuterRef(fk_field)).values(field)[:1]
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def build_totals_expressions():
+    """Выражения для пересчёта итогов сборок одним UPDATE.
+
+    Дублируют Build.get_total_price(), get_total_tdp() и get_benchmark_score()
+    на стороне БД: Build.objects.filter(...).update(**build_totals_expressions()).
+    """
+    price = DecimalField(max_digits=12, decimal_places=2)
+    integer = IntegerField()
+    components = {'cpu': CPU, 'gpu': GPU, 'motherboard': Motherboard, 'ram': RAM, 'psu': PSU, 'case': Case}
+
+    total_price = Value(0, output_field=price)
+    for fk_field, model in components.items():
+        total_price = total_price + _component_value(model, fk_field, 'avg_used_price', price)
+
+    cpu_tdp = _component_value(CPU, 'cpu', 'tdp', integer)
+    gpu_tdp = _component_value(GPU, 'gpu', 'tdp', integer)
+    cpu_score = _component_value(CPU, 'cpu', 'benchmark_score', integer)
+    gpu_score = _component_value(GPU, 'gpu', 'benchmark_score', integer)
+
+    return {
+        'total_price': total_price,
+        'total_tdp': cpu_tdp + gpu_tdp + Value(Build.BASE_TDP),
+        'benchmark_score': Cast(
+            gpu_score * Value(Build.GPU_SCORE_WEIGHT) + cpu_score * Value(Build.CPU_SCORE_WEIGHT),
+            integer,
+        ),
+    }
+
+
+def compatibility_flags_expression():
+    """Флаги совместимости для queryset сборок: LEFT JOIN на детали.
+
+    Те же правила, что у Build.get_compatibility_flags() (rules.py),
+    но сравнения идут по соединённым таблицам.
+    """
+    from .rules import get_rules
+
+    return get_rules().flags_expression()
+
+
+def build_compatibility_expressions():
+    """Пересчёт флагов одним UPDATE: Build.objects.filter(...).update(**build_compatibility_expressions()).
+
+    UPDATE не умеет JOIN, поэтому флаги берутся коррелированным
+    подзапросом по той же сборке с соединёнными деталями.
+    """
+    flags = Build.objects.filter(pk=OuterRef('pk')).order_by().annotate(
+        flags=compatibility_flags_expression()
+    ).values('flags')[:1]
+    return {'compatibility_flags': Subquery(flags, output_field=IntegerField())}
+
+
+def compatible_builds(queryset):
+    """Сборки без нарушений правил уровня error: compatibility_flags & error_flags = 0"""
+    from .rules import get_rules
+
+    return queryset.alias(
+        error_bits=models.F('compatibility_flags').bitand(get_rules().error_flags)
+    ).filter(error_bits=0)
+
+
+def revalidate_builds(queryset=None):
+    """Пересчёт флагов совместимости сборок в БД.
+
+    Обновляются только сборки, у которых флаги разошлись с деталями;
+    возвращает их число.
+    """
+    if queryset is None:
+        queryset = Build.objects.all()
+    return queryset.alias(
+        current_flags=compatibility_flags_expression()
+    ).exclude(compatibility_flags=models.F('current_flags')).update(**build_compatibility_expressions())
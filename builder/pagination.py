@@ -0,0 +1,108 @@
+"""Курсорная (keyset) пагинация для списков каталога.
+
+В отличие от OFFSET, следующая страница выбирается условием
+«после последней показанной позиции» по ключу сортировки и pk, поэтому
+стоимость запроса не растёт с номером страницы и опирается на составные
+индексы (поле фильтра, поле сортировки, id) из Meta.indexes моделей.
+"""
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+CATALOG_PAGE_SIZE = 24
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([str(value), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(значение ключа, pk) или None, если курсор пустой или испорчен"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """Страница списка: позиции и курсор следующей страницы"""
+
+    def __init__(self, items, next_cursor, is_first):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _keyset_queryset(queryset, sort, cursor):
+    """Упорядоченный queryset после курсора, поле сортировки и позиция курсора"""
+    field = sort.lstrip('-')
+    descending = sort.startswith('-')
+    queryset = queryset.order_by(sort, '-pk' if descending else 'pk')
+
+    position = decode_cursor(cursor)
+    if position is not None:
+        value, pk = position
+        try:
+            value = queryset.model._meta.get_field(field).to_python(value)
+        except ValidationError:
+            position = None
+        else:
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk})
+            )
+    return queryset, field, position
+
+
+def _keyset_page(items, field, position, per_page):
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items, next_cursor, is_first=position is None)
+
+
+def keyset_paginate(queryset, sort, cursor=None, per_page=CATALOG_PAGE_SIZE):
+    """Одна страница queryset, упорядоченного по sort с добором по pk.
+
+    sort — имя поля, с минусом для убывания (как в order_by).
+    """
+    queryset, field, position = _keyset_queryset(queryset, sort, cursor)
+    return _keyset_page(list(queryset[:per_page + 1]), field, position, per_page)
+
+
+async def akeyset_paginate(queryset, sort, cursor=None, per_page=CATALOG_PAGE_SIZE):
+    """keyset_paginate через async ORM"""
+    queryset, field, position = _keyset_queryset(queryset, sort, cursor)
+    items = [item async for item in queryset[:per_page + 1]]
+    return _keyset_page(items, field, position, per_page)
+
+
+def page_links(params, page):
+    """Query string для ссылок «дальше» и «в начало» с сохранением фильтров"""
+    params = {name: value for name, value in params.items() if value not in (None, '') and name != 'cursor'}
+    first_query = urlencode(params)
+    next_query = None
+    if page.has_next:
+        next_query = urlencode({**params, 'cursor': page.next_cursor})
+    return {'page': page, 'first_query': first_query, 'next_query': next_query}
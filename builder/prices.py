@@ -0,0 +1,218 @@
+"""История цен комплектующих.
+
+Каждое наблюдение цены дописывается в PriceObservation и больше не
+меняется. Для графиков и средней цены используются агрегаты PriceRollup
+по дням и неделям. Они обновляются инкрементально: новая пачка наблюдений
+группируется pandas (в копейках, int64), и результат складывается с уже
+сохранёнными агрегатами тех же периодов (count и сумма складываются,
+min/max берутся по обоим). Поэтому годовой график детали читает около
+52 строк недельных агрегатов, а не все наблюдения.
+
+avg_used_price комплектующей — средняя цена за последние
+PRICE_WINDOW_DAYS дней по дневным агрегатам.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .cache import bump_version
+from .compatibility import CATALOG_FIELDS, spec_from_instance, update_specs
+from .models import (
+    COMPONENT_TYPE_CODES, Build, PriceObservation, PricePerformanceMixin, PriceRollup, build_totals_expressions,
+)
+from .search import update_documents
+
+
+PRICE_WINDOW_DAYS = 30
+
+ROLLUP_FIELDS = ['count', 'price_sum', 'min_price', 'max_price']
+ROLLUP_KEY = ['component_type', 'component_id', 'period_start']
+
+CENT = Decimal('0.01')
+
+
+def _from_cents(value):
+    return Decimal(int(value)).scaleb(-2)
+
+
+def record_prices(observations, now=None):
+    """Добавление наблюдений и пересчёт агрегатов и avg_used_price.
+
+    observations — итерируемое из кортежей (слот, pk, цена, время);
+    время может быть None — тогда берётся now.
+    """
+    now = now or timezone.now()
+    objects = [
+        PriceObservation(
+            component_type=COMPONENT_TYPE_CODES[slot],
+            component_id=pk,
+            price=Decimal(price).quantize(CENT),
+            observed_at=observed_at or now,
+        )
+        for slot, pk, price, observed_at in observations
+    ]
+    if not objects:
+        return 0
+    with transaction.atomic():
+        PriceObservation.objects.bulk_create(objects)
+        update_rollups(objects)
+        refresh_avg_prices({(obj.component_type, obj.component_id) for obj in objects}, now)
+    return len(objects)
+
+
+def _aggregate(frame):
+    return frame.groupby(ROLLUP_KEY).agg(
+        count=('count', 'sum'),
+        cents=('cents', 'sum'),
+        min_cents=('min_cents', 'min'),
+        max_cents=('max_cents', 'max'),
+    )
+
+
+def update_rollups(observations):
+    """Слияние новых наблюдений с дневными и недельными агрегатами"""
+    import numpy as np
+    import pandas as pd
+
+    cents = np.array([int(obs.price * 100) for obs in observations], dtype=np.int64)
+    observed_at = pd.to_datetime([obs.observed_at for obs in observations], utc=True)
+    day = observed_at.tz_convert(settings.TIME_ZONE).tz_localize(None).normalize()
+    frame = pd.DataFrame({
+        'component_type': np.array([obs.component_type for obs in observations], dtype=np.int64),
+        'component_id': np.array([obs.component_id for obs in observations], dtype=np.int64),
+        'count': 1,
+        'cents': cents,
+        'min_cents': cents,
+        'max_cents': cents,
+    })
+
+    starts = {
+        'day': day,
+        'week': day - pd.to_timedelta(day.dayofweek, unit='D'),
+    }
+    for period, period_start in starts.items():
+        fresh = _aggregate(frame.assign(period_start=period_start))
+        merged = _aggregate(pd.concat([fresh, _existing_rollups(period, fresh)]).reset_index())
+        PriceRollup.objects.bulk_create(
+            [
+                PriceRollup(
+                    component_type=int(component_type),
+                    component_id=int(component_id),
+                    period=period,
+                    period_start=period_start.date(),
+                    count=int(count),
+                    price_sum=_from_cents(cents),
+                    min_price=_from_cents(min_cents),
+                    max_price=_from_cents(max_cents),
+                )
+                for (component_type, component_id, period_start), (count, cents, min_cents, max_cents)
+                in zip(merged.index, merged.itertuples(index=False, name=None))
+            ],
+            update_conflicts=True,
+            unique_fields=['component_type', 'component_id', 'period', 'period_start'],
+            update_fields=ROLLUP_FIELDS,
+        )
+
+
+def _existing_rollups(period, fresh):
+    """Уже сохранённые агрегаты тех же деталей и периодов, что и в fresh"""
+    import pandas as pd
+
+    component_types, component_ids, period_starts = (fresh.index.get_level_values(level) for level in range(3))
+    rows = PriceRollup.objects.filter(
+        period=period,
+        component_type__in={int(value) for value in component_types},
+        component_id__in={int(value) for value in component_ids},
+        period_start__range=(period_starts.min().date(), period_starts.max().date()),
+    ).values_list(*ROLLUP_KEY, *ROLLUP_FIELDS)
+    existing = pd.DataFrame(
+        [
+            (component_type, component_id, period_start, count,
+             int(price_sum * 100), int(min_price * 100), int(max_price * 100))
+            for component_type, component_id, period_start, count, price_sum, min_price, max_price in rows
+        ],
+        columns=[*ROLLUP_KEY, 'count', 'cents', 'min_cents', 'max_cents'],
+    )
+    existing['period_start'] = pd.to_datetime(existing['period_start'])
+    existing = existing.set_index(ROLLUP_KEY)
+    # Диапазон дат мог захватить лишние пары (деталь, период)
+    return existing[existing.index.isin(fresh.index)]
+
+
+def refresh_avg_prices(components, now=None):
+    """avg_used_price по скользящему окну для набора (код типа, pk).
+
+    Детали без наблюдений в окне сохраняют прежнюю цену.
+    """
+    now = now or timezone.now()
+    window_start = timezone.localdate(now) - timedelta(days=PRICE_WINDOW_DAYS - 1)
+    for slot, code in COMPONENT_TYPE_CODES.items():
+        pks = {pk for component_type, pk in components if component_type == code}
+        if not pks:
+            continue
+        rows = PriceRollup.objects.filter(
+            component_type=code, component_id__in=pks, period='day', period_start__gte=window_start,
+        ).values('component_id').annotate(observations=Sum('count'), total=Sum('price_sum'))
+        averages = {
+            row['component_id']: (row['total'] / row['observations']).quantize(CENT)
+            for row in rows
+        }
+        _apply_prices(slot, averages, now)
+
+
+def _apply_prices(slot, prices, now):
+    """Запись новых средних цен одним bulk_update.
+
+    bulk_update не отправляет сигналы, поэтому индекс совместимости,
+    версии кэша и итоги сборок обновляются здесь же.
+    """
+    model = CATALOG_FIELDS[slot][0]
+    changed = [
+        component for component in model.objects.filter(pk__in=prices)
+        if component.avg_used_price != prices[component.pk]
+    ]
+    if not changed:
+        return
+    fields = ['avg_used_price', 'updated_at']
+    if issubclass(model, PricePerformanceMixin):
+        fields.append('score_per_rub')
+    for component in changed:
+        component.avg_used_price = prices[component.pk]
+        component.updated_at = now
+        if 'score_per_rub' in fields:
+            component.refresh_score_per_rub()
+    model.objects.bulk_update(changed, fields)
+
+    bump_version(slot)
+    update_specs(slot, [spec_from_instance(slot, component) for component in changed])
+    # Текст поисковых документов от цены не зависит: поиску достаточно новой версии
+    update_documents(slot)
+    Build.objects.filter(**{f'{slot}__in': [component.pk for component in changed]}).update(
+        **build_totals_expressions()
+    )
+    bump_version('build')
+
+
+def price_history(slot, pk, period='week', days=365, today=None):
+    """Агрегаты цены детали за последние days дней для графика"""
+    today = today or timezone.localdate()
+    rows = PriceRollup.objects.filter(
+        component_type=COMPONENT_TYPE_CODES[slot],
+        component_id=pk,
+        period=period,
+        period_start__gt=today - timedelta(days=days),
+    ).order_by('period_start').values_list('period_start', 'count', 'price_sum', 'min_price', 'max_price')
+    return [
+        {
+            'period_start': period_start.isoformat(),
+            'count': count,
+            'avg': float(price_sum / count),
+            'min': float(min_price),
+            'max': float(max_price),
+        }
+        for period_start, count, price_sum, min_price, max_price in rows
+    ]
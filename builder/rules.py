@@ -0,0 +1,429 @@
+"""Правила совместимости, заданные данными.
+
+Каждое правило — словарь: какие поля каких деталей сравниваются, как,
+с каким уровнем (error/warning), флагом Build и сообщением. Виды правил:
+
+* equal — значения равны (сокет процессора и платы);
+* at_most — left не больше right (длина видеокарты и корпус);
+* contains — left входит в table[right] (форм-фактор платы и корпуса);
+* threshold — left не меньше int((сумма terms + base) * margin)
+  (мощность БП и TDP процессора и видеокарты).
+
+Правило проверяется, только если выбраны все детали из left и right
+(у threshold — деталь из left; отсутствующие terms считаются нулём).
+
+Список компилируется один раз (get_rules) в три равнозначные формы:
+
+* check/flags — одна сборка в Python (модель Build или SpecBuild);
+* flags_batch — массивы NumPy со столбцами «деталь.поле»; столбцы
+  транслируются друг с другом, поэтому можно проверить сразу матрицу
+  «сборки × кандидаты» (upgrades.py);
+* flags_expression — выражение Django ORM над соединёнными таблицами
+  (денормализованные флаги и revalidate_builds).
+
+Дополнительные правила подключаются настройкой
+BUILDER_EXTRA_COMPATIBILITY_RULES — списком словарей того же вида.
+Флаг у такого правила необязателен: без него правило видно в проверке,
+но не сохраняется в Build.compatibility_flags. Флаги — разные степени
+двойки: в SQL они складываются, в Python объединяются через |.
+Сборка совместима, если в её флагах нет флагов правил уровня error
+(RuleSet.error_flags); label — подпись флага в revalidate_builds.
+"""
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Case as CaseExpression, F, IntegerField, Q, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Build, Case
+
+
+DEFAULT_RULES = (
+    {
+        'name': 'socket',
+        'kind': 'equal',
+        'left': 'cpu.socket',
+        'right': 'motherboard.socket',
+        'level': 'error',
+        'flag': Build.SOCKET_MISMATCH,
+        'label': 'сокет CPU не совпадает с платой',
+        'message': 'Сокет процессора ({left}) не совместим с материнской платой ({right})',
+    },
+    {
+        'name': 'memory_type',
+        'kind': 'equal',
+        'left': 'ram.memory_type',
+        'right': 'motherboard.memory_type',
+        'level': 'error',
+        'flag': Build.MEMORY_TYPE_MISMATCH,
+        'label': 'тип памяти не поддерживается платой',
+        'message': 'Тип памяти ({left}) не поддерживается материнской платой ({right})',
+    },
+    {
+        'name': 'gpu_length',
+        'kind': 'at_most',
+        'left': 'gpu.length',
+        'right': 'case.max_gpu_length',
+        'level': 'error',
+        'flag': Build.GPU_TOO_LONG,
+        'label': 'видеокарта не помещается в корпус',
+        'message': 'Видеокарта ({left}мм) не поместится в корпус (макс. {right}мм)',
+    },
+    {
+        'name': 'form_factor',
+        'kind': 'contains',
+        'left': 'motherboard.form_factor',
+        'right': 'case.form_factor',
+        # Форм-фактор корпуса -> подходящие форм-факторы плат
+        'table': Case.SUPPORTED_FORM_FACTORS,
+        'level': 'error',
+        'flag': Build.FORM_FACTOR_MISMATCH,
+        'label': 'плата не подходит к корпусу',
+        'message': 'Материнская плата ({left}) не подходит для корпуса ({right})',
+    },
+    {
+        'name': 'psu_wattage',
+        'kind': 'threshold',
+        'left': 'psu.wattage',
+        'terms': ('cpu.tdp', 'gpu.tdp'),
+        'base': Build.BASE_TDP,
+        'margin': Build.PSU_MARGIN,
+        'level': 'warning',
+        'flag': Build.PSU_TOO_WEAK,
+        'label': 'мощности БП может не хватить',
+        'message': 'Мощности БП ({left}Вт) может не хватить. Рекомендуется: {right}Вт',
+    },
+)
+
+RULE_KINDS = ('equal', 'at_most', 'contains', 'threshold')
+RULE_LEVELS = ('error', 'warning')
+
+
+def _path(path):
+    slot, _, field = path.partition('.')
+    if slot not in Build.COMPONENT_FIELDS or not field:
+        raise ValueError(f'Некорректное поле правила: {path!r}')
+    return slot, field
+
+
+def _lookup(path):
+    slot, field = _path(path)
+    return f'{slot}__{field}'
+
+
+class CompiledRule:
+    """Одно правило с заранее разобранными путями; kind определяет сравнение"""
+
+    def __init__(self, spec, vocabulary):
+        self.name = spec['name']
+        self.kind = spec['kind']
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f'Неизвестный вид правила {self.name}: {self.kind}')
+        self.level = spec.get('level', 'error')
+        if self.level not in RULE_LEVELS:
+            raise ValueError(f'Неизвестный уровень правила {self.name}: {self.level}')
+        self.flag = spec.get('flag') or 0
+        self.label = spec.get('label', self.name)
+        self.message = spec['message']
+        self.left = spec['left']
+        self.right = spec.get('right')
+        self.terms = tuple(spec.get('terms', ()))
+        self.base = spec.get('base', 0)
+        self.margin = spec.get('margin', 1)
+
+        # Слоты, без которых правило не проверяется, и все читаемые поля
+        self.required_slots = {_path(self.left)[0]}
+        if self.kind != 'threshold':
+            self.required_slots.add(_path(self.right)[0])
+        self.paths = (self.left, *([self.right] if self.right else ()), *self.terms)
+        self.slots = {_path(path)[0] for path in self.paths}
+
+        self.table = None
+        if self.kind == 'contains':
+            # Таблица как множество пар (right, left) и как матрица по кодам значений
+            self.mapping = {key: tuple(values) for key, values in spec['table'].items()}
+            self.table = {(key, value) for key, values in self.mapping.items() for value in values}
+            for key, value in self.table:
+                vocabulary.code(key)
+                vocabulary.code(value)
+            self.table_codes = [(vocabulary.code(key), vocabulary.code(value)) for key, value in self.table]
+            self.table_size = len(vocabulary)
+            self._matrix = None
+
+    @property
+    def categorical_paths(self):
+        return (self.left, self.right) if self.kind in ('equal', 'contains') else ()
+
+    # ---------- одна сборка ----------
+
+    def required(self, values):
+        return int((sum(values[path] or 0 for path in self.terms) + self.base) * self.margin)
+
+    def violated(self, values):
+        """values — {путь: значение}; None у пути значит, что детали нет"""
+        left = values[self.left]
+        if self.kind == 'threshold':
+            if left is None:
+                return None
+            right = self.required(values)
+            return (left, right) if left < right else None
+        right = values[self.right]
+        if left is None or right is None:
+            return None
+        if self.kind == 'equal':
+            broken = left != right
+        elif self.kind == 'at_most':
+            broken = left > right
+        else:
+            broken = (right, left) not in self.table
+        return (left, right) if broken else None
+
+    # ---------- массивы ----------
+
+    def violated_batch(self, columns):
+        """Булев массив нарушений; columns — {путь: массив, слот: массив «деталь выбрана»}"""
+        import numpy as np
+
+        applies = columns[_path(self.left)[0]]
+        for slot in self.required_slots:
+            applies = applies & columns[slot]
+        left = columns[self.left]
+        if self.kind == 'threshold':
+            total = self.base
+            for path in self.terms:
+                total = total + np.where(columns[_path(path)[0]], columns[path], 0)
+            right = (total * self.margin).astype(np.int64)
+            return applies & (left < right)
+        right = columns[self.right]
+        if self.kind == 'equal':
+            return applies & (left != right)
+        if self.kind == 'at_most':
+            return applies & (left > right)
+        if self._matrix is None:
+            matrix = np.zeros((self.table_size + 1, self.table_size + 1), dtype=bool)
+            for key, value in self.table_codes:
+                matrix[key, value] = True
+            self._matrix = matrix
+        # Коды вне таблицы (и -1 у пустых значений) попадают в последнюю строку/столбец
+        outside = self.table_size
+        rows = np.where((right >= 0) & (right < outside), right, outside)
+        cols = np.where((left >= 0) & (left < outside), left, outside)
+        return applies & ~self._matrix[rows, cols]
+
+    # ---------- SQL ----------
+
+    def condition(self):
+        """Q-условие нарушения для queryset сборок"""
+        left = _lookup(self.left)
+        if self.kind == 'threshold':
+            total = Value(self.base)
+            for path in self.terms:
+                total = total + Coalesce(F(_lookup(path)), 0)
+            required = Cast(total * Value(self.margin), IntegerField())
+            return Q(**{f'{left}__lt': required})
+        right = _lookup(self.right)
+        both = Q(**{f'{slot}__isnull': False for slot in self.required_slots})
+        if self.kind == 'equal':
+            return both & ~Q(**{left: F(right)})
+        if self.kind == 'at_most':
+            return Q(**{f'{left}__gt': F(right)})
+        allowed = Q(pk__in=[])
+        for key in {key for key, _ in self.table}:
+            values = sorted(value for other, value in self.table if other == key)
+            allowed |= Q(**{right: key, f'{left}__in': values})
+        return both & ~allowed
+
+
+def _shape(columns):
+    import numpy as np
+
+    return np.broadcast_shapes(*(np.shape(value) for value in columns.values()))
+
+
+class Vocabulary:
+    """Коды категориальных значений (сокеты, форм-факторы...) для массивов NumPy"""
+
+    def __init__(self):
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._codes)
+
+    def code(self, value):
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.setdefault(value, len(self._codes))
+        return code
+
+
+Problem = namedtuple('Problem', 'rule type message flag')
+
+
+class RuleSet:
+    """Скомпилированный список правил"""
+
+    def __init__(self, specs):
+        self.vocabulary = Vocabulary()
+        self.rules = [CompiledRule(spec, self.vocabulary) for spec in specs]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError('Имена правил совместимости повторяются')
+        flags = [rule.flag for rule in self.rules if rule.flag]
+        for rule in self.rules:
+            if rule.flag and (rule.flag < 0 or rule.flag & (rule.flag - 1)):
+                raise ImproperlyConfigured(f'Флаг правила {rule.name} должен быть степенью двойки: {rule.flag}')
+        if len(set(flags)) != len(flags):
+            raise ImproperlyConfigured('Флаги правил совместимости повторяются')
+        self.paths = tuple(dict.fromkeys(path for rule in self.rules for path in rule.paths))
+        self.categorical = {path for rule in self.rules for path in rule.categorical_paths}
+        self.error_flags = 0
+        for rule in self.rules:
+            if rule.level == 'error':
+                self.error_flags |= rule.flag
+
+    def _involving(self, slots, exclude=()):
+        rules = [rule for rule in self.rules if rule.name not in exclude]
+        return rules if slots is None else [rule for rule in rules if rule.slots & set(slots)]
+
+    # ---------- одна сборка ----------
+
+    def values(self, build):
+        """Значения всех полей правил; каждое поле читается один раз"""
+        values = {}
+        for path in self.paths:
+            slot, field = _path(path)
+            component = getattr(build, slot)
+            values[path] = getattr(component, field) if component is not None else None
+        return values
+
+    def problems(self, build, slots=None):
+        values = self.values(build)
+        found = []
+        for rule in self._involving(slots):
+            violation = rule.violated(values)
+            if violation is not None:
+                left, right = violation
+                found.append(Problem(rule.name, rule.level, rule.message.format(left=left, right=right), rule.flag))
+        return found
+
+    def check(self, build):
+        """Список проблем в формате check_compatibility: [{'type', 'message'}]"""
+        return [{'type': problem.type, 'message': problem.message} for problem in self.problems(build)]
+
+    def flags(self, build):
+        result = 0
+        for problem in self.problems(build):
+            result |= problem.flag
+        return result
+
+    # ---------- массивы ----------
+
+    def column(self, path, values):
+        """Столбец для flags_batch из значений поля (None — детали нет)"""
+        import numpy as np
+
+        values = list(values)
+        if path in self.categorical:
+            return np.array([self.vocabulary.code(value) for value in values], dtype=np.int64)
+        return np.array([0 if value is None else value for value in values], dtype=np.int64)
+
+    def columns(self, rows, paths=None):
+        """Столбцы для flags_batch из {слот: список деталей или None}"""
+        import numpy as np
+
+        columns = {}
+        for slot, components in rows.items():
+            components = list(components)
+            columns[slot] = np.array([component is not None for component in components], dtype=bool)
+            for path in paths or self.paths:
+                if _path(path)[0] == slot:
+                    columns[path] = self.column(
+                        path, (getattr(component, _path(path)[1]) if component is not None else None
+                               for component in components),
+                    )
+        return columns
+
+    def flags_batch(self, columns, slots=None):
+        """Флаги для каждой строки (или ячейки при трансляции) столбцов.
+
+        slots — проверять только правила, в которых участвуют эти слоты:
+        так при замене одной детали старые проблемы остальных не мешают.
+        """
+        import numpy as np
+
+        result = np.zeros(_shape(columns), dtype=np.int64)
+        for rule in self._involving(slots):
+            result |= np.where(rule.violated_batch(columns), rule.flag, 0)
+        return result
+
+    def violations_batch(self, columns, slots=None, exclude=()):
+        """Есть ли нарушение любого уровня (в том числе у правил без флага).
+
+        exclude — имена правил, которые вызывающий уже проверил иначе
+        (индекс совместимости группами и диапазонами).
+        """
+        import numpy as np
+
+        result = np.zeros(_shape(columns), dtype=bool)
+        for rule in self._involving(slots, exclude):
+            result |= rule.violated_batch(columns)
+        return result
+
+    # ---------- SQL ----------
+
+    def flags_expression(self):
+        """Сумма флагов нарушенных правил для queryset сборок (LEFT JOIN на детали)"""
+        expression = Value(0)
+        for rule in self.rules:
+            if rule.flag:
+                expression = expression + CaseExpression(
+                    When(rule.condition(), then=Value(rule.flag)), default=Value(0), output_field=IntegerField(),
+                )
+        return expression
+
+    # ---------- для других модулей ----------
+
+    def flag_labels(self):
+        """{флаг: подпись} правил с флагом"""
+        return {rule.flag: rule.label for rule in self.rules if rule.flag}
+
+    def is_compatible(self, flags):
+        """Нет флагов правил уровня error (предупреждения совместимости не мешают)"""
+        return not flags & self.error_flags
+
+    def fields(self, slot):
+        """Поля детали slot, которые читают правила (от них зависят флаги сборок)"""
+        return tuple(field for path in self.paths for path_slot, field in [_path(path)] if path_slot == slot)
+
+    def rule(self, name):
+        for rule in self.rules:
+            if rule.name == name:
+                return rule
+        raise KeyError(name)
+
+
+_rules = None
+_rules_lock = threading.Lock()
+
+
+def get_rules():
+    """Правила по умолчанию и из настроек, скомпилированные один раз на процесс"""
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                extra = getattr(settings, 'BUILDER_EXTRA_COMPATIBILITY_RULES', ())
+                _rules = RuleSet([*DEFAULT_RULES, *extra])
+    return _rules
+
+
+def reset_rules():
+    global _rules
+    with _rules_lock:
+        _rules = None
@@ -0,0 +1,233 @@
+"""Поиск по каталогу: триграммный индекс в памяти процесса.
+
+Производитель, название и чипсет каждой детали разбиваются на слова
+в нижнем регистре. В индекс попадают триграммы каждого слова (короткие
+слова вроде «i5» или «ti» — целиком) и триграммы «сжатой» строки без
+пробелов и знаков, поэтому «RTX 3060», «rtx3060» и «RTX-3060» совпадают.
+Для каждой триграммы хранится список документов.
+
+Запрос раскладывается на триграммы по словам; документ подходит, если
+в нём есть не меньше MIN_SIMILARITY триграмм запроса. Поэтому опечатка
+(«ryzn 5600x») или пропущенная буква не мешают найти деталь. Подсчёт
+совпадений — один np.bincount по спискам документов, без перебора
+каталога в Python.
+
+Индекс строится при первом поиске. Изменения через ORM сигналы вносят
+в него сразу (см. signals.py), а изменения в обход сигналов (import_catalog,
+другие процессы) видны по версиям каталога из cache.get_versions —
+тогда индекс перестраивается целиком.
+"""
+import re
+import threading
+from array import array
+from collections import defaultdict, namedtuple
+
+from .cache import get_versions
+from .compatibility import CATALOG_FIELDS
+
+
+SEARCH_FIELDS = {
+    'cpu': ('manufacturer', 'name'),
+    'gpu': ('manufacturer', 'name'),
+    'motherboard': ('manufacturer', 'name', 'chipset'),
+    'ram': ('manufacturer', 'name'),
+    'psu': ('manufacturer', 'name'),
+    'case': ('manufacturer', 'name'),
+}
+SLOTS = tuple(SEARCH_FIELDS)
+
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# Доля триграмм запроса, которая должна найтись в документе
+MIN_SIMILARITY = 0.6
+
+SearchHit = namedtuple('SearchHit', 'slot pk score')
+
+_NOT_WORD = re.compile(r'[\W_]+')
+
+
+def words(text):
+    """Слова строки в нижнем регистре, без знаков"""
+    return [word for word in _NOT_WORD.split(text.lower().replace('ё', 'е')) if word]
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _word_grams(text_words):
+    grams = set()
+    for word in text_words:
+        grams |= trigrams(word) if len(word) > 2 else {word}
+    return grams
+
+
+def query_grams(query):
+    return _word_grams(words(query))
+
+
+def document_grams(text):
+    text_words = words(text)
+    return _word_grams(text_words) | trigrams(''.join(text_words))
+
+
+class SearchIndex:
+    """Триграммы -> номера документов; документ — одна деталь каталога"""
+
+    def __init__(self, rows=()):
+        # Параллельные массивы по номеру документа
+        self.keys = []
+        self.slot_codes = array('b')
+        self.lengths = array('i')
+        self.alive = array('b')
+        self.postings = defaultdict(lambda: array('i'))
+        self.place = {}
+        for slot, pk, text in rows:
+            self.add(slot, pk, text)
+
+    @classmethod
+    def from_db(cls):
+        def rows():
+            for slot, fields in SEARCH_FIELDS.items():
+                model = CATALOG_FIELDS[slot][0]
+                for pk, *values in model.objects.order_by().values_list('pk', *fields).iterator(chunk_size=2000):
+                    yield slot, pk, ' '.join(values)
+        return cls(rows())
+
+    def __len__(self):
+        return len(self.place)
+
+    def add(self, slot, pk, text):
+        self.remove(slot, pk)
+        doc = len(self.keys)
+        self.keys.append((slot, pk))
+        self.slot_codes.append(SLOTS.index(slot))
+        self.lengths.append(len(text))
+        self.alive.append(1)
+        for gram in document_grams(text):
+            self.postings[gram].append(doc)
+        self.place[slot, pk] = doc
+
+    def remove(self, slot, pk):
+        # Старые вхождения в списках остаются, документ лишь помечается удалённым
+        doc = self.place.pop((slot, pk), None)
+        if doc is not None:
+            self.alive[doc] = 0
+
+    @property
+    def garbage(self):
+        """Доля удалённых документов (при большой доле индекс стоит перестроить)"""
+        return 1 - len(self.place) / len(self.keys) if self.keys else 0
+
+    def search(self, query, slots=None, limit=SEARCH_LIMIT):
+        import numpy as np
+
+        grams = query_grams(query)
+        if not grams or not self.keys:
+            return []
+        wanted = np.isin(
+            np.frombuffer(self.slot_codes, dtype=np.int8),
+            [SLOTS.index(slot) for slot in (slots or SLOTS)],
+        )
+        mask = wanted & np.frombuffer(self.alive, dtype=np.int8).astype(bool)
+        lengths = np.frombuffer(self.lengths, dtype=np.int32)
+
+        postings = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not postings:
+            return []
+        hits = np.bincount(
+            np.concatenate([np.frombuffer(posting, dtype=np.int32) for posting in postings]),
+            minlength=len(self.keys),
+        )
+        scores = hits / len(grams)
+        mask &= scores >= MIN_SIMILARITY
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > limit:
+            # Лучшие limit по совпадению, при равенстве — более короткие названия
+            rank = scores[candidates] * 10_000 - np.minimum(lengths[candidates], 9_999)
+            candidates = candidates[np.argpartition(-rank, limit - 1)[:limit]]
+        order = np.lexsort((candidates, lengths[candidates], -scores[candidates]))
+        return [
+            SearchHit(*self.keys[doc], round(float(scores[doc]), 3))
+            for doc in candidates[order].tolist()
+        ]
+
+
+_index = None
+_versions = None
+_index_lock = threading.RLock()
+
+
+def get_search_index():
+    """Индекс для текущих версий каталога; перестраивается после изменений в обход сигналов"""
+    global _index, _versions
+    versions = get_versions(*SLOTS)
+    if _index is not None and _versions == versions:
+        return _index
+    with _index_lock:
+        versions = get_versions(*SLOTS)
+        if _index is None or _versions != versions:
+            _index, _versions = SearchIndex.from_db(), versions
+    return _index
+
+
+def update_document(slot, instance, deleted=False):
+    """Изменение одной детали через ORM (вызывается из сигналов после bump_version)"""
+    if deleted:
+        update_documents(slot, removed=[instance.pk])
+    else:
+        update_documents(slot, [instance])
+
+
+def update_documents(slot, instances=(), removed=()):
+    """Изменения деталей одного типа после одного bump_version(slot).
+
+    Индекс принимает изменения, только если до них он был актуален:
+    версия slot выросла ровно на единицу, остальные не менялись.
+    Иначе он перестроится при следующем поиске. Без instances и removed
+    индекс лишь принимает новую версию — для изменений, которые не
+    затрагивают текст документов (цены, см. prices.py).
+    """
+    global _versions
+    with _index_lock:
+        if _index is None:
+            return
+        versions = get_versions(*SLOTS)
+        position = SLOTS.index(slot)
+        expected = _versions[:position] + (_versions[position] + 1,) + _versions[position + 1:]
+        if versions != expected:
+            return
+        for pk in removed:
+            _index.remove(slot, pk)
+        for instance in instances:
+            _index.add(slot, instance.pk, ' '.join(str(getattr(instance, field)) for field in SEARCH_FIELDS[slot]))
+        _versions = versions
+
+
+def reset_search_index():
+    global _index, _versions
+    with _index_lock:
+        _index = _versions = None
+
+
+def search_catalog(query, slots=None, limit=SEARCH_LIMIT):
+    """Найденные детали: список (slot, объект модели, score), лучшие — первыми.
+
+    Объекты загружаются только для найденных позиций — по запросу на тип.
+    """
+    # Массивы индекса читаются через np.frombuffer: пока идёт поиск, их нельзя дописывать
+    with _index_lock:
+        index = get_search_index()
+        if index.garbage > 0.25:
+            reset_search_index()
+            index = get_search_index()
+        hits = index.search(query, slots, limit)
+    pks = defaultdict(list)
+    for hit in hits:
+        pks[hit.slot].append(hit.pk)
+    objects = {slot: CATALOG_FIELDS[slot][0].objects.in_bulk(ids) for slot, ids in pks.items()}
+    return [
+        (hit.slot, objects[hit.slot][hit.pk], hit.score)
+        for hit in hits if hit.pk in objects[hit.slot]
+    ]
@@ -0,0 +1,142 @@
+"""Обработчики сигналов: поддержание индексов, кэша, итогов и флагов совместимости сборок"""
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .compatibility import SLOT_BY_MODEL, spec_from_instance, update_specs
+from .search import update_document
+from .models import Build, PricePerformanceMixin, build_compatibility_expressions, build_totals_expressions
+from .rules import get_rules
+
+
+# Поля компонентов, от которых зависят итоги сборки
+TOTALS_SOURCE_FIELDS = {
+    'cpu': ('avg_used_price', 'tdp', 'benchmark_score'),
+    'gpu': ('avg_used_price', 'tdp', 'benchmark_score'),
+    'motherboard': ('avg_used_price',),
+    'ram': ('avg_used_price',),
+    'psu': ('avg_used_price',),
+    'case': ('avg_used_price',),
+}
+
+
+def _source_fields(slot):
+    # Поля, от которых зависит совместимость, берутся из правил (rules.py)
+    return tuple(dict.fromkeys(TOTALS_SOURCE_FIELDS[slot] + get_rules().fields(slot)))
+
+
+def _affected_build_expressions(slot, changed):
+    """Выражения UPDATE для сборок с компонентом, у которого изменились поля changed"""
+    expressions = {}
+    if set(changed) & set(TOTALS_SOURCE_FIELDS[slot]):
+        expressions.update(build_totals_expressions())
+    if set(changed) & set(get_rules().fields(slot)):
+        expressions.update(build_compatibility_expressions())
+    return expressions
+
+
+# ---------- кэш фрагментов ----------
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_cache_version(sender, **kwargs):
+    """Новая версия данных: фрагменты со старой версией больше не используются"""
+    if sender is Build:
+        bump_version('build')
+    elif sender in SLOT_BY_MODEL:
+        bump_version(SLOT_BY_MODEL[sender])
+
+
+# ---------- итоги и совместимость сборок ----------
+
+@receiver(pre_save)
+def refresh_raw_score_per_rub(sender, instance, raw=False, **kwargs):
+    """loaddata сохраняет детали в обход save(): score_per_rub считаем здесь"""
+    if raw and issubclass(sender, PricePerformanceMixin):
+        instance.refresh_score_per_rub()
+
+
+@receiver(pre_save)
+def remember_totals_source(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Запоминаем старые цену/TDP/score и размеры, чтобы не трогать сборки без изменений"""
+    slot = SLOT_BY_MODEL.get(sender)
+    if slot is None or raw or instance.pk is None:
+        return
+    fields = _source_fields(slot)
+    if update_fields is not None and not set(fields) & set(update_fields):
+        instance._totals_source = None
+        return
+    instance._totals_source = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save)
+def refresh_build_totals(sender, instance, created=False, raw=False, **kwargs):
+    """Один UPDATE по всем сборкам с изменившимся компонентом"""
+    if sender is Build:
+        # loaddata сохраняет сборки в обход Build.save()
+        if raw:
+            Build.objects.filter(pk=instance.pk).update(
+                **build_totals_expressions(), **build_compatibility_expressions()
+            )
+        return
+
+    slot = SLOT_BY_MODEL.get(sender)
+    if slot is None or created or raw:
+        return
+    old = getattr(instance, '_totals_source', None)
+    instance._totals_source = None
+    if old is None:
+        return
+    changed = [field for field in old if old[field] != getattr(instance, field)]
+    if not changed:
+        return
+    Build.objects.filter(**{slot: instance}).update(**_affected_build_expressions(slot, changed))
+
+
+@receiver(pre_delete)
+def remember_affected_builds(sender, instance, **kwargs):
+    slot = SLOT_BY_MODEL.get(sender)
+    if slot is None:
+        return
+    instance._affected_builds = list(Build.objects.filter(**{slot: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_delete)
+def refresh_totals_after_delete(sender, instance, **kwargs):
+    """Компонент удалён, в сборках он обнулён через SET_NULL — итоги и флаги надо пересчитать"""
+    affected = getattr(instance, '_affected_builds', None)
+    if affected:
+        Build.objects.filter(pk__in=affected).update(
+            **build_totals_expressions(), **build_compatibility_expressions()
+        )
+
+
+# ---------- индексы совместимости и поиска ----------
+# Подключены после bump_cache_version: индексы сверяют версию каталога уже после увеличения
+
+@receiver(post_save)
+def update_compatibility_index(sender, instance, raw=False, **kwargs):
+    slot = SLOT_BY_MODEL.get(sender)
+    if slot is not None:
+        update_specs(slot, [spec_from_instance(slot, instance)])
+
+
+@receiver(post_delete)
+def discard_from_compatibility_index(sender, instance, **kwargs):
+    slot = SLOT_BY_MODEL.get(sender)
+    if slot is not None:
+        update_specs(slot, removed=[instance.pk])
+
+
+@receiver(post_save)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    slot = SLOT_BY_MODEL.get(sender)
+    if slot is not None:
+        update_document(slot, instance)
+
+
+@receiver(post_delete)
+def discard_from_search_index(sender, instance, **kwargs):
+    slot = SLOT_BY_MODEL.get(sender)
+    if slot is not None:
+        update_document(slot, instance, deleted=True)
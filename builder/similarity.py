@@ -0,0 +1,118 @@
+"""Похожие комплектующие: поиск ближайших соседей по характеристикам.
+
+Для каждого типа деталей характеристики собираются в матрицу NumPy и
+нормируются: цена и score логарифмируются (их распределения сильно
+скошены), затем каждый столбец приводится к нулевому среднему и единичному
+стандартному отклонению. Похожие детали — ближайшие по евклидову
+расстоянию внутри группы совместимости (процессоры — в пределах сокета,
+видеокарты — с тем же объёмом видеопамяти).
+
+Матрица строится одним запросом и переиспользуется, пока не изменилась
+версия каталога этого типа (см. cache.get_versions); поиск по группе из
+нескольких тысяч строк занимает доли миллисекунды.
+"""
+import threading
+
+import numpy as np
+
+from .cache import get_versions
+from .compatibility import CATALOG_FIELDS
+
+
+SIMILAR_LIMIT = 4
+
+SIMILARITY_FEATURES = {
+    'cpu': ('cores', 'threads', 'base_clock', 'boost_clock', 'tdp', 'benchmark_score', 'avg_used_price'),
+    'gpu': ('tdp', 'length', 'benchmark_score', 'avg_used_price'),
+}
+
+# Признаки, которые сравниваются в логарифмической шкале
+LOG_FEATURES = {'benchmark_score', 'avg_used_price'}
+
+# Поле, в пределах значения которого ищутся соседи (None — по всему каталогу)
+SIMILARITY_GROUPS = {
+    'cpu': 'socket',
+    'gpu': 'vram',
+}
+
+
+class SimilarityIndex:
+    """Нормированная матрица характеристик одного типа деталей"""
+
+    def __init__(self, slot, rows):
+        features = SIMILARITY_FEATURES[slot]
+        self.pks = np.array([row[0] for row in rows], dtype=np.int64)
+
+        matrix = np.array([row[2:] for row in rows], dtype=np.float64).reshape(len(rows), len(features))
+        for column, name in enumerate(features):
+            if name in LOG_FEATURES:
+                matrix[:, column] = np.log1p(np.clip(matrix[:, column], 0, None))
+        std = matrix.std(axis=0)
+        std[std == 0] = 1.0
+        self.matrix = (matrix - matrix.mean(axis=0)) / std
+
+        # Для каждой группы — своя непрерывная матрица и pk её строк,
+        # чтобы поиск не копировал строки из общей матрицы
+        groups = {}
+        for i, row in enumerate(rows):
+            groups.setdefault(row[1], []).append(i)
+        self.groups = {}
+        self.place = {}
+        for key, members in groups.items():
+            members = np.asarray(members, dtype=np.intp)
+            self.groups[key] = (np.ascontiguousarray(self.matrix[members]), self.pks[members])
+            for offset, i in enumerate(members):
+                self.place[int(self.pks[i])] = (key, offset)
+
+    @classmethod
+    def from_db(cls, slot):
+        model = CATALOG_FIELDS[slot][0]
+        group = SIMILARITY_GROUPS[slot]
+        rows = model.objects.order_by().values_list('pk', group or 'pk', *SIMILARITY_FEATURES[slot])
+        if group is None:
+            # Все детали в одной группе
+            rows = [(row[0], None, *row[2:]) for row in rows]
+        return cls(slot, list(rows))
+
+    def similar(self, pk, limit=SIMILAR_LIMIT):
+        """pk ближайших деталей в порядке возрастания расстояния"""
+        if pk not in self.place:
+            return []
+        key, offset = self.place[pk]
+        matrix, pks = self.groups[key]
+        count = min(limit, len(pks) - 1)
+        if count <= 0:
+            return []
+        diff = matrix - matrix[offset]
+        # Квадрат расстояния: порядок тот же, корень не нужен
+        distances = np.einsum('ij,ij->i', diff, diff)
+        distances[offset] = np.inf
+        nearest = np.argpartition(distances, count - 1)[:count]
+        nearest = nearest[np.lexsort((pks[nearest], distances[nearest]))]
+        return [int(pk) for pk in pks[nearest]]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_similarity_index(slot):
+    """Индекс для текущей версии каталога slot; перестраивается после изменений"""
+    version = get_versions(slot)
+    cached = _indexes.get(slot)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _indexes_lock:
+        cached = _indexes.get(slot)
+        if cached is None or cached[0] != version:
+            cached = (version, SimilarityIndex.from_db(slot))
+            _indexes[slot] = cached
+    return cached[1]
+
+
+def similar_parts(slot, component, limit=SIMILAR_LIMIT):
+    """Похожие детали (объекты модели), ближайшие — первыми"""
+    pks = get_similarity_index(slot).similar(component.pk, limit)
+    model = CATALOG_FIELDS[slot][0]
+    by_pk = model.objects.in_bulk(pks)
+    return [by_pk[pk] for pk in pks if pk in by_pk]
@@ -0,0 +1,73 @@
+"""Статистика каталога для главной: количество, диапазон и средняя цена.
+
+Все таблицы считаются одним запросом — UNION ALL агрегатов по каждой
+модели комплектующих и по публичным сборкам (их итоговой цене). Результат
+хранится в кэше под версиями каталога и сборок (cache.get_versions):
+после изменения данных версия меняется, и статистика считается заново
+при следующем обращении.
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Avg, CharField, Count, Max, Min, Value
+
+from .cache import aget_versions, get_versions, make_key
+from .compatibility import CATALOG_FIELDS
+from .models import Build
+
+
+STATS_SLOTS = (*CATALOG_FIELDS, 'build')
+
+CategoryStats = namedtuple('CategoryStats', 'count min_price max_price avg_price')
+
+EMPTY_STATS = CategoryStats(0, None, None, None)
+
+
+def _sources():
+    """Слот -> (queryset, поле цены)"""
+    sources = {slot: (model.objects.all(), 'avg_used_price') for slot, (model, _) in CATALOG_FIELDS.items()}
+    sources['build'] = (Build.objects.filter(is_public=True), 'total_price')
+    return sources
+
+
+def stats_query():
+    """Один запрос: строка (слот, количество, мин., макс. и средняя цена) на каждую таблицу"""
+    queries = [
+        queryset.order_by()
+        .annotate(slot=Value(slot, output_field=CharField()))
+        .values_list('slot')
+        .annotate(count=Count('pk'), min_price=Min(price), max_price=Max(price), avg_price=Avg(price))
+        for slot, (queryset, price) in _sources().items()
+    ]
+    return queries[0].union(*queries[1:], all=True)
+
+
+def _collect(rows):
+    stats = dict.fromkeys(STATS_SLOTS, EMPTY_STATS)
+    for slot, *values in rows:
+        stats[slot] = CategoryStats(*values)
+    return stats
+
+
+def _key(versions):
+    return make_key('stats', versions)
+
+
+def catalog_stats():
+    """{слот: CategoryStats} для всех типов деталей и для 'build'"""
+    key = _key(get_versions(*STATS_SLOTS))
+    stats = cache.get(key)
+    if stats is None:
+        stats = _collect(stats_query())
+        cache.set(key, stats, None)
+    return stats
+
+
+async def acatalog_stats():
+    """catalog_stats через async ORM"""
+    key = _key(await aget_versions(*STATS_SLOTS))
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = _collect([row async for row in stats_query()])
+        await cache.aset(key, stats, None)
+    return stats
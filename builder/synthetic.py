@@ -0,0 +1,289 @@
+"""Синтетический каталог для нагрузочных замеров (см. команду bench_views).
+
+fill_catalog(rows) заполняет таблицы комплектующих, пользователей и
+сборок; rows — общее число строк, оно делится между таблицами по
+TABLE_SHARES. Распределения приближены к реальному рынку б/у:
+
+* сокеты и форм-факторы — с весами SOCKET_WEIGHTS и FORM_FACTOR_WEIGHTS,
+  тип памяти платы определяется сокетом (SOCKET_MEMORY_TYPES);
+* score процессоров и видеокарт логнормальный вокруг «уровня» модели,
+  цена пропорциональна score с разбросом, поэтому score_per_rub разный;
+* большинство сборок собраны совместимо (плата под сокет процессора,
+  память под плату, корпус под форм-фактор), около BROKEN_BUILD_SHARE —
+  из случайных деталей.
+
+При одинаковых rows и seed каталог получается одним и тем же.
+Строки пишутся bulk_create пачками, итоги и флаги сборок — одним UPDATE,
+поэтому миллион строк заполняется за несколько минут. Сигналы при этом
+не срабатывают: в конце повышаются версии каталога (как в import_catalog).
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .cache import bump_version
+from .models import (
+    CPU, GPU, PSU, RAM, Build, Case, Motherboard,
+    build_compatibility_expressions, build_totals_expressions,
+)
+
+
+MIN_ROWS = 1_000
+MAX_ROWS = 1_000_000
+
+# Доли общего числа строк по таблицам
+TABLE_SHARES = {
+    'cpu': 0.15,
+    'gpu': 0.15,
+    'motherboard': 0.15,
+    'ram': 0.1,
+    'psu': 0.1,
+    'case': 0.1,
+    'build': 0.25,
+}
+# Сборок на одного пользователя
+BUILDS_PER_USER = 20
+# Доля сборок из случайных (возможно несовместимых) деталей
+BROKEN_BUILD_SHARE = 0.1
+PUBLIC_BUILD_SHARE = 0.8
+BATCH_SIZE = 2000
+
+SOCKET_WEIGHTS = {'AM4': 30, 'AM5': 15, 'LGA1151': 10, 'LGA1200': 20, 'LGA1700': 25}
+FORM_FACTOR_WEIGHTS = {'ATX': 50, 'mATX': 35, 'ITX': 15}
+SOCKET_MEMORY_TYPES = {
+    'AM4': ('DDR4',),
+    'AM5': ('DDR5',),
+    'LGA1151': ('DDR4',),
+    'LGA1200': ('DDR4',),
+    'LGA1700': ('DDR4', 'DDR5'),
+}
+SOCKET_CHIPSETS = {
+    'AM4': ('A520', 'B450', 'B550', 'X570'),
+    'AM5': ('A620', 'B650', 'X670'),
+    'LGA1151': ('H310', 'B365', 'Z390'),
+    'LGA1200': ('H410', 'B460', 'B560', 'Z590'),
+    'LGA1700': ('H610', 'B660', 'B760', 'Z790'),
+}
+CPU_SERIES = {
+    'AMD': ('Ryzen 3', 'Ryzen 5', 'Ryzen 7', 'Ryzen 9'),
+    'Intel': ('Core i3', 'Core i5', 'Core i7', 'Core i9'),
+}
+GPU_SERIES = {
+    'NVIDIA': ('GeForce GTX', 'GeForce RTX'),
+    'AMD': ('Radeon RX',),
+    'Intel': ('Arc A',),
+}
+GPU_VENDOR_WEIGHTS = {'NVIDIA': 60, 'AMD': 32, 'Intel': 8}
+BOARD_VENDORS = ('ASUS', 'MSI', 'Gigabyte', 'ASRock')
+RAM_VENDORS = ('Kingston', 'Corsair', 'G.Skill', 'Crucial', 'Patriot')
+PSU_VENDORS = ('Corsair', 'be quiet!', 'Seasonic', 'Chieftec', 'DeepCool', 'Cooler Master')
+CASE_VENDORS = ('NZXT', 'Fractal Design', 'DeepCool', 'Zalman', 'Lian Li', 'Cooler Master')
+
+# Диапазон длины видеокарты, которую вмещает корпус, по форм-фактору
+CASE_GPU_LENGTH = {'ATX': (300, 420), 'mATX': (250, 360), 'ITX': (180, 330)}
+
+
+def table_sizes(rows):
+    """Число строк по таблицам для общего размера rows"""
+    sizes = {table: max(1, int(rows * share)) for table, share in TABLE_SHARES.items()}
+    sizes['user'] = max(1, sizes['build'] // BUILDS_PER_USER)
+    return sizes
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _price(value, low=500):
+    """Цена, округлённая до сотни рублей"""
+    return Decimal(max(low, int(round(value, -2))))
+
+
+def _score_per_rub(score, price):
+    return float(score) / float(price) if price else 0.0
+
+
+def _cpu(rng, number):
+    socket = _weighted(rng, SOCKET_WEIGHTS)
+    vendor = 'AMD' if socket.startswith('AM') else 'Intel'
+    tier = rng.choices(range(4), weights=(20, 40, 28, 12))[0]
+    cores = (4, 6, 8, 16)[tier] + rng.choice((0, 0, 2)) * (tier > 0)
+    threads = cores * 2 if vendor == 'AMD' or rng.random() < 0.7 else cores
+    base_clock = round(rng.uniform(2.5, 4.0), 1)
+    # Новые сокеты быстрее на ядро
+    generation = 1.3 if socket in ('AM5', 'LGA1700') else (0.8 if socket == 'LGA1151' else 1.0)
+    score = int(cores * 2800 * generation * rng.lognormvariate(0, 0.15))
+    price = _price(score * 0.4 * rng.lognormvariate(0, 0.3), low=1000)
+    return CPU(
+        name=f'{CPU_SERIES[vendor][tier]} S{number:07d}',
+        manufacturer=vendor,
+        socket=socket,
+        cores=cores,
+        threads=threads,
+        base_clock=base_clock,
+        boost_clock=round(base_clock + rng.uniform(0.4, 1.6), 1),
+        tdp=rng.choice((35, 65, 65, 95, 105, 125) if tier < 3 else (105, 125, 170)),
+        has_integrated_gpu=vendor == 'Intel' or rng.random() < 0.2,
+        benchmark_score=score,
+        avg_used_price=price,
+        score_per_rub=_score_per_rub(score, price),
+    )
+
+
+def _gpu(rng, number):
+    vendor = _weighted(rng, GPU_VENDOR_WEIGHTS)
+    level = rng.lognormvariate(0, 0.6)
+    score = int(9000 * level)
+    tdp = int(min(450, max(75, 60 + 90 * level)) // 5 * 5)
+    price = _price(score * 1.1 * rng.lognormvariate(0, 0.25), low=2000)
+    return GPU(
+        name=f'{rng.choice(GPU_SERIES[vendor])} S{number:07d}',
+        manufacturer=vendor,
+        vram=rng.choice((4, 6, 8) if level < 1 else (8, 10, 12, 16, 24)),
+        memory_type=rng.choice(('GDDR5', 'GDDR6') if level < 1 else ('GDDR6', 'GDDR6X')),
+        core_clock=rng.randint(1200, 2600),
+        tdp=tdp,
+        length=min(340, 160 + tdp // 2 + rng.randint(-20, 20)),
+        benchmark_score=score,
+        avg_used_price=price,
+        score_per_rub=_score_per_rub(score, price),
+    )
+
+
+def _motherboard(rng, number):
+    socket = _weighted(rng, SOCKET_WEIGHTS)
+    form_factor = _weighted(rng, FORM_FACTOR_WEIGHTS)
+    chipset = rng.choice(SOCKET_CHIPSETS[socket])
+    return Motherboard(
+        name=f'{chipset}{"M" if form_factor == "mATX" else ""}-{form_factor} S{number:07d}',
+        manufacturer=rng.choice(BOARD_VENDORS),
+        socket=socket,
+        chipset=chipset,
+        form_factor=form_factor,
+        memory_type=rng.choice(SOCKET_MEMORY_TYPES[socket]),
+        memory_slots=2 if form_factor == 'ITX' else 4,
+        max_memory=64 if form_factor == 'ITX' else rng.choice((64, 128, 192)),
+        avg_used_price=_price(rng.lognormvariate(8.8, 0.45), low=2000),
+    )
+
+
+def _ram(rng, number):
+    memory_type = rng.choices(('DDR4', 'DDR5'), weights=(65, 35))[0]
+    capacity = rng.choices((8, 16, 32, 64), weights=(15, 45, 30, 10))[0]
+    return RAM(
+        name=f'{memory_type} S{number:07d}',
+        manufacturer=rng.choice(RAM_VENDORS),
+        memory_type=memory_type,
+        capacity=capacity,
+        modules=1 if capacity == 8 else rng.choice((1, 2, 2)),
+        speed=rng.choice((2666, 3200, 3600) if memory_type == 'DDR4' else (4800, 5600, 6000, 6400)),
+        avg_used_price=_price(capacity * (170 if memory_type == 'DDR4' else 230) * rng.lognormvariate(0, 0.2)),
+    )
+
+
+def _psu(rng, number):
+    wattage = rng.choices((400, 450, 500, 550, 600, 650, 750, 850, 1000), weights=(6, 8, 14, 16, 16, 14, 14, 8, 4))[0]
+    efficiency = rng.choices(('80+', 'Bronze', 'Silver', 'Gold', 'Platinum'), weights=(10, 45, 5, 35, 5))[0]
+    return PSU(
+        name=f'{efficiency} {wattage}W S{number:07d}',
+        manufacturer=rng.choice(PSU_VENDORS),
+        wattage=wattage,
+        efficiency=efficiency,
+        is_modular=efficiency in ('Gold', 'Platinum') and rng.random() < 0.7,
+        avg_used_price=_price(wattage * 7 * rng.lognormvariate(0, 0.25), low=1500),
+    )
+
+
+def _case(rng, number):
+    form_factor = _weighted(rng, FORM_FACTOR_WEIGHTS)
+    return Case(
+        name=f'{form_factor} Tower S{number:07d}',
+        manufacturer=rng.choice(CASE_VENDORS),
+        form_factor=form_factor,
+        max_gpu_length=rng.randint(*CASE_GPU_LENGTH[form_factor]),
+        max_cpu_cooler_height=rng.randint(60, 120) if form_factor == 'ITX' else rng.randint(140, 185),
+        avg_used_price=_price(rng.lognormvariate(8.4, 0.4), low=1500),
+    )
+
+
+FACTORIES = {'cpu': _cpu, 'gpu': _gpu, 'motherboard': _motherboard, 'ram': _ram, 'psu': _psu, 'case': _case}
+
+
+def _insert(model, objects):
+    created = []
+    for start in range(0, len(objects), BATCH_SIZE):
+        created.extend(model.objects.bulk_create(objects[start:start + BATCH_SIZE]))
+    return created
+
+
+class _PartPicker:
+    """Выбор деталей для сборок: по группам совместимости и случайно"""
+
+    def __init__(self, rng, parts):
+        self.rng = rng
+        self.parts = parts
+        self.groups = {}
+        for slot, field in (('motherboard', 'socket'), ('ram', 'memory_type'), ('case', 'form_factor')):
+            groups = self.groups[slot] = {}
+            for part in parts[slot]:
+                groups.setdefault(getattr(part, field), []).append(part)
+
+    def any(self, slot):
+        return self.rng.choice(self.parts[slot])
+
+    def matching(self, slot, *keys):
+        candidates = [part for key in keys for part in self.groups[slot].get(key, ())]
+        return self.rng.choice(candidates) if candidates else self.any(slot)
+
+    def build(self, broken):
+        cpu = self.any('cpu')
+        if broken:
+            board, ram, case = self.any('motherboard'), self.any('ram'), self.any('case')
+        else:
+            board = self.matching('motherboard', cpu.socket)
+            ram = self.matching('ram', board.memory_type)
+            fitting = [ff for ff, boards in Case.SUPPORTED_FORM_FACTORS.items() if board.form_factor in boards]
+            case = self.matching('case', *fitting)
+        gpu = self.any('gpu') if self.rng.random() < 0.9 else None
+        return {'cpu': cpu, 'gpu': gpu, 'motherboard': board, 'ram': ram, 'psu': self.any('psu'), 'case': case}
+
+
+def fill_catalog(rows, seed=42):
+    """Заполнить пустые таблицы синтетическим каталогом; возвращает число строк по таблицам"""
+    rng = random.Random(seed)
+    sizes = table_sizes(rows)
+
+    with transaction.atomic():
+        parts = {}
+        for slot, factory in FACTORIES.items():
+            parts[slot] = _insert(
+                Build._meta.get_field(slot).related_model,
+                [factory(rng, number) for number in range(sizes[slot])],
+            )
+
+        # Вход бенчмарк-пользователей по паролю не нужен
+        password = make_password(None)
+        users = _insert(User, [
+            User(username=f'bench{number:06d}', password=password) for number in range(sizes['user'])
+        ])
+
+        picker = _PartPicker(rng, parts)
+        builds = [
+            Build(
+                user=rng.choice(users),
+                name=f'Сборка {number}',
+                is_public=rng.random() < PUBLIC_BUILD_SHARE,
+                **picker.build(broken=rng.random() < BROKEN_BUILD_SHARE),
+            )
+            for number in range(sizes['build'])
+        ]
+        _insert(Build, builds)
+        # bulk_create обходит Build.save(): итоги и флаги — одним UPDATE
+        Build.objects.update(**build_totals_expressions(), **build_compatibility_expressions())
+
+    for slot in (*FACTORIES, 'build'):
+        bump_version(slot)
+    return sizes
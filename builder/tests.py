@@ -1,3 +1,1316 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import product
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .builds import load_build
+from .cache import bump_version
+from .forms import BuildForm
+from .charts import generate_budget_chart, render_budget_chart
+from .compatibility import get_index, reset_index
+from .configurator import find_best_build
+from .loadgen import run_load
+from .metrics import registry
+from .models import (
+    CPU, GPU, Motherboard, RAM, PSU, Case, Build, PriceObservation, PriceRollup, compatibility_flags_expression,
+    compatible_builds,
+)
+from .prices import PRICE_WINDOW_DAYS, record_prices
+from .rules import get_rules, reset_rules
+from .search import get_search_index
+from .stats import CategoryStats, catalog_stats
+from .similarity import get_similarity_index, similar_parts
+from .synthetic import SOCKET_MEMORY_TYPES, fill_catalog, table_sizes
+from . import views
+from .views import check_compatibility
+
+
+def make_catalog():
+    """Небольшой каталог: две платформы AM4/AM5 и корпуса разного размера"""
+    parts = {
+        'cpu_am4': CPU.objects.create(
+            name='Ryzen 5 5600', manufacturer='AMD', socket='AM4', cores=6, threads=12,
+            base_clock=3.5, boost_clock=4.4, tdp=65, benchmark_score=21000,
+            avg_used_price=Decimal('8500'),
+        ),
+        'cpu_am5': CPU.objects.create(
+            name='Ryzen 5 7600', manufacturer='AMD', socket='AM5', cores=6, threads=12,
+            base_clock=3.8, boost_clock=5.1, tdp=65, benchmark_score=27000,
+            avg_used_price=Decimal('15000'),
+        ),
+        'gpu_small': GPU.objects.create(
+            name='GTX 1650', manufacturer='NVIDIA', vram=4, memory_type='GDDR5', core_clock=1485,
+            tdp=75, length=170, benchmark_score=7800, avg_used_price=Decimal('7000'),
+        ),
+        'gpu_big': GPU.objects.create(
+            name='RTX 3070', manufacturer='NVIDIA', vram=8, memory_type='GDDR6', core_clock=1500,
+            tdp=220, length=300, benchmark_score=22000, avg_used_price=Decimal('28000'),
+        ),
+        'mb_am4': Motherboard.objects.create(
+            name='B450M', manufacturer='MSI', socket='AM4', chipset='B450', form_factor='mATX',
+            memory_type='DDR4', memory_slots=2, max_memory=64, avg_used_price=Decimal('4000'),
+        ),
+        'mb_am5': Motherboard.objects.create(
+            name='B650', manufacturer='ASUS', socket='AM5', chipset='B650', form_factor='ATX',
+            memory_type='DDR5', memory_slots=4, max_memory=128, avg_used_price=Decimal('12000'),
+        ),
+        'ram_ddr4': RAM.objects.create(
+            name='Vengeance', manufacturer='Corsair', memory_type='DDR4', capacity=16,
+            modules=2, speed=3200, avg_used_price=Decimal('2500'),
+        ),
+        'ram_ddr5': RAM.objects.create(
+            name='Fury', manufacturer='Kingston', memory_type='DDR5', capacity=32,
+            modules=2, speed=5600, avg_used_price=Decimal('7000'),
+        ),
+        'psu_small': PSU.objects.create(
+            name='System Power', manufacturer='be quiet!', wattage=400, efficiency='Bronze',
+            avg_used_price=Decimal('2500'),
+        ),
+        'psu_big': PSU.objects.create(
+            name='RM650', manufacturer='Corsair', wattage=650, efficiency='Gold',
+            avg_used_price=Decimal('5000'),
+        ),
+        'case_matx': Case.objects.create(
+            name='Q300L', manufacturer='Cooler Master', form_factor='mATX', max_gpu_length=200,
+            max_cpu_cooler_height=157, avg_used_price=Decimal('2500'),
+        ),
+        'case_atx': Case.objects.create(
+            name='4000D', manufacturer='Corsair', form_factor='ATX', max_gpu_length=360,
+            max_cpu_cooler_height=170, avg_used_price=Decimal('6000'),
+        ),
+    }
+    return parts
+
+
+class CatalogTestCase(TestCase):
+    """Каталог из make_catalog() и чистые индексы в памяти для каждого теста"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parts = make_catalog()
+
+    def setUp(self):
+        reset_index()
+        cache.clear()
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета SQL-запросов view (@query_budget) по метрикам MetricsMiddleware"""
+
+    def get_within_budget(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        metrics = response.wsgi_request.metrics
+        self.assertIsNotNone(metrics.budget, f'У {metrics.view} не объявлен бюджет запросов')
+        sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+        self.assertLessEqual(
+            metrics.queries, metrics.budget,
+            f'{metrics.view}: {metrics.queries} SQL-запросов при бюджете {metrics.budget}:\n{sql}',
+        )
+        return response
+
+
+class CompatibilityIndexTests(CatalogTestCase):
+
+    def test_compatible_lookups(self):
+        index = get_index()
+        parts = self.parts
+        self.assertEqual(index.compatible('motherboard', {'cpu': parts['cpu_am4'].pk}), {parts['mb_am4'].pk})
+        self.assertEqual(index.compatible('ram', {'motherboard': parts['mb_am5'].pk}), {parts['ram_ddr5'].pk})
+        # ATX-плата не влезет в mATX-корпус, длинная видеокарта — тоже
+        self.assertEqual(index.compatible('case', {'motherboard': parts['mb_am5'].pk}), {parts['case_atx'].pk})
+        self.assertEqual(index.compatible('gpu', {'case': parts['case_matx'].pk}), {parts['gpu_small'].pk})
+        self.assertEqual(
+            index.compatible('psu', {'cpu': parts['cpu_am5'].pk, 'gpu': parts['gpu_big'].pk}),
+            {parts['psu_big'].pk},
+        )
+        self.assertEqual(
+            index.compatible('case', {'gpu': parts['gpu_big'].pk, 'motherboard': parts['mb_am4'].pk}),
+            {parts['case_atx'].pk},
+        )
+
+    def test_index_follows_catalog_changes(self):
+        index = get_index()
+        case = self.parts['case_matx']
+        case.max_gpu_length = 320
+        case.save()
+        self.assertIn(case.pk, index.compatible('case', {'gpu': self.parts['gpu_big'].pk}))
+
+        board = Motherboard.objects.create(
+            name='A520M', manufacturer='ASRock', socket='AM4', chipset='A520', form_factor='mATX',
+            memory_type='DDR4', memory_slots=2, max_memory=64, avg_used_price=Decimal('3000'),
+        )
+        self.assertIn(board.pk, index.compatible('motherboard', {'cpu': self.parts['cpu_am4'].pk}))
+        board_pk = board.pk
+        board.delete()
+        self.assertNotIn(board_pk, index.compatible('motherboard', {'cpu': self.parts['cpu_am4'].pk}))
+
+    def test_index_rebuilt_after_changes_bypassing_signals(self):
+        gpu = self.parts['gpu_small']
+        self.assertIsNotNone(get_index().get('gpu', gpu.pk))
+        # Удаление в обход сигналов, как в import_catalog: меняется только версия каталога
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {GPU._meta.db_table} WHERE id = %s', [gpu.pk])
+        bump_version('gpu')
+        self.assertIsNone(get_index().get('gpu', gpu.pk))
+        data = self.client.get(reverse('api_compatibility_check'), {'gpu': gpu.pk}).json()
+        self.assertEqual(data['missing'], ['gpu'])
+
+
+class AutoBuildTests(CatalogTestCase):
+
+    def test_small_budget_picks_cheapest_compatible_build(self):
+        build = find_best_build(30000)
+        self.assertEqual(build.cpu, self.parts['cpu_am4'])
+        self.assertEqual(build.gpu, self.parts['gpu_small'])
+        self.assertEqual(build.case, self.parts['case_matx'])
+        self.assertEqual(check_compatibility(build), [])
+        self.assertLessEqual(build.get_total_price(), 30000)
+
+    def test_large_budget_needs_long_case_and_big_psu(self):
+        build = find_best_build(100000)
+        self.assertEqual(build.cpu, self.parts['cpu_am5'])
+        self.assertEqual(build.gpu, self.parts['gpu_big'])
+        self.assertEqual(build.case, self.parts['case_atx'])
+        self.assertEqual(build.psu, self.parts['psu_big'])
+        self.assertEqual(check_compatibility(build), [])
+
+    def test_budget_too_small(self):
+        self.assertIsNone(find_best_build(1000))
+
+    def test_skips_parts_deleted_from_database(self):
+        self.assertEqual(find_best_build(100000).gpu, self.parts['gpu_big'])
+        # Строки нет, а индекс о ней не знает: подбор повторяется без неё
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {GPU._meta.db_table} WHERE id = %s', [self.parts['gpu_big'].pk])
+        build = find_best_build(100000)
+        self.assertEqual(build.gpu, self.parts['gpu_small'])
+        self.assertEqual(check_compatibility(build), [])
+
+    def test_view(self):
+        response = self.client.get(reverse('auto_build'), {'budget': 30000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['build'].cpu, self.parts['cpu_am4'])
+
+
+class BuildTotalsTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('tester', password='secret-pass')
+
+    def setUp(self):
+        super().setUp()
+        self.build = Build.objects.create(
+            user=self.user, name='AM4', cpu=self.parts['cpu_am4'], gpu=self.parts['gpu_small'],
+            motherboard=self.parts['mb_am4'], ram=self.parts['ram_ddr4'], psu=self.parts['psu_small'],
+            case=self.parts['case_matx'],
+        )
+
+    def assertTotalsCurrent(self, build):
+        build.refresh_from_db()
+        fresh = Build.objects.select_related(*Build.COMPONENT_FIELDS).get(pk=build.pk)
+        self.assertEqual(build.total_price, fresh.get_total_price())
+        self.assertEqual(build.total_tdp, fresh.get_total_tdp())
+        self.assertEqual(build.benchmark_score, fresh.get_benchmark_score())
+
+    def test_totals_saved_with_build(self):
+        self.assertEqual(self.build.total_price, Decimal('27000'))
+        self.assertEqual(self.build.total_tdp, 190)
+        self.assertEqual(self.build.benchmark_score, int(7800 * 0.6 + 21000 * 0.4))
+
+    def test_component_change_updates_builds_in_one_query(self):
+        gpu = self.parts['gpu_small']
+        gpu.avg_used_price = Decimal('6500')
+        gpu.benchmark_score = 8123
+        gpu.tdp = 80
+        # SELECT старых значений, UPDATE детали, UPDATE сборок
+        with self.assertNumQueries(3):
+            gpu.save()
+        self.assertTotalsCurrent(self.build)
+
+    def test_unchanged_component_does_not_touch_builds(self):
+        case = self.parts['case_matx']
+        case.name = 'Q300L V2'
+        with self.assertNumQueries(2):
+            case.save()
+
+    def test_component_delete_updates_builds(self):
+        self.parts['gpu_small'].delete()
+        self.assertTotalsCurrent(self.build)
+        self.assertEqual(self.build.total_tdp, 65 + Build.BASE_TDP)
+
+    def test_build_list_sorted_by_price(self):
+        Build.objects.create(
+            user=self.user, name='AM5', cpu=self.parts['cpu_am5'], motherboard=self.parts['mb_am5'],
+            ram=self.parts['ram_ddr5'], psu=self.parts['psu_big'],
+        )
+        response = self.client.get(reverse('build_list'), {'sort': '-total_price'})
+        self.assertEqual([build.name for build in response.context['builds']], ['AM5', 'AM4'])
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Одинаковые цены и score: порядок держится только на добивке по pk
+        for i in range(30):
+            CPU.objects.create(
+                name=f'CPU {i:02d}', manufacturer='AMD', socket='AM4' if i % 2 else 'AM5', cores=6,
+                threads=12, base_clock=3.5, boost_clock=4.4, tdp=65, benchmark_score=10000 + i // 10,
+                avg_used_price=Decimal('5000') + i // 10,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, params):
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(reverse('cpu_list'), {**params, **({'cursor': cursor} if cursor else {})})
+            page = response.context['page']
+            seen.extend(cpu.pk for cpu in page)
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_pages_cover_queryset_in_order(self):
+        for sort in ['-benchmark_score', 'avg_used_price', '-avg_used_price', 'name']:
+            expected = list(CPU.objects.order_by(sort, '-pk' if sort.startswith('-') else 'pk')
+                            .values_list('pk', flat=True))
+            self.assertEqual(self.walk({'sort': sort}), expected, sort)
+
+    def test_filters_are_kept(self):
+        expected = list(CPU.objects.filter(socket='AM4').order_by('name', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk({'sort': 'name', 'socket': 'AM4'}), expected)
+
+    def test_broken_cursor_shows_first_page(self):
+        response = self.client.get(reverse('cpu_list'), {'cursor': 'not-a-cursor'})
+        self.assertTrue(response.context['page'].is_first)
+
+
+class FragmentCacheTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('owner', password='secret-pass')
+        cls.build = Build.objects.create(
+            user=cls.user, name='AM4', cpu=cls.parts['cpu_am4'], gpu=cls.parts['gpu_small'],
+            motherboard=cls.parts['mb_am4'], ram=cls.parts['ram_ddr4'], psu=cls.parts['psu_small'],
+        )
+
+    def test_catalog_list_served_from_cache_until_catalog_changes(self):
+        url = reverse('cpu_list')
+        self.client.get(url, {'socket': 'AM4'})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'socket': 'AM4', 'manufacturer': ''})
+
+        cpu = self.parts['cpu_am4']
+        cpu.avg_used_price = Decimal('7777')
+        cpu.save()
+        self.assertContains(self.client.get(url, {'socket': 'AM4'}), '7777 ₽')
+
+    def test_home_cached(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('home'))
+
+    def test_build_detail_invalidated_by_component_update(self):
+        url = reverse('build_detail', args=[self.build.pk])
+        self.assertContains(self.client.get(url), 'Все компоненты совместимы')
+
+        # Одна выборка сборки с компонентами, всё остальное — из кэша
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        board = self.parts['mb_am4']
+        board.socket = 'AM5'
+        board.save()
+        self.assertContains(self.client.get(url), 'не совместим с материнской платой')
+
+
+class BudgetChartTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('owner', password='secret-pass')
+        cls.build = Build.objects.create(
+            user=cls.user, name='AM4', cpu=cls.parts['cpu_am4'], gpu=cls.parts['gpu_small'],
+            motherboard=cls.parts['mb_am4'], ram=cls.parts['ram_ddr4'], psu=cls.parts['psu_small'],
+        )
+
+    def test_chart_memoized_by_prices(self):
+        render_budget_chart.cache_clear()
+        html = generate_budget_chart(self.build)
+        same_prices = Build(cpu=self.build.cpu, gpu=self.build.gpu, motherboard=self.build.motherboard,
+                            ram=self.build.ram, psu=self.build.psu)
+        self.assertIs(generate_budget_chart(same_prices), html)
+        self.assertEqual(render_budget_chart.cache_info().misses, 1)
+
+    @override_settings(BUDGET_CHART_MODE='json')
+    def test_client_side_mode_embeds_spec(self):
+        response = self.client.get(reverse('build_detail', args=[self.build.pk]))
+        self.assertContains(response, 'id="budget-chart-spec"')
+        self.assertContains(response, 'Plotly.newPlot')
+
+    def test_chart_json(self):
+        response = self.client.get(reverse('build_chart_data', args=[self.build.pk]))
+        data = response.json()['data'][0]
+        self.assertEqual(data['labels'], ['Процессор', 'Видеокарта', 'Мат. плата', 'RAM', 'Блок питания'])
+        self.assertEqual(data['values'], [8500.0, 7000.0, 4000.0, 2500.0, 2500.0])
+
+
+class ImportCatalogTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('importer', password='secret-pass')
+        cls.build = Build.objects.create(
+            user=cls.user, name='AM4', cpu=cls.parts['cpu_am4'], gpu=cls.parts['gpu_small'],
+            motherboard=cls.parts['mb_am4'], ram=cls.parts['ram_ddr4'], psu=cls.parts['psu_small'],
+        )
+
+    def run_import(self, rows, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8') as stream:
+            stream.write('\n'.join(
+                row if isinstance(row, str) else json.dumps(row, ensure_ascii=False) for row in rows
+            ))
+            stream.flush()
+            errors = StringIO()
+            call_command('import_catalog', stream.name, *args, stdout=StringIO(), stderr=errors)
+        return errors.getvalue()
+
+    def test_upsert_by_natural_key(self):
+        cpu = {
+            'model': 'cpu', 'name': 'Ryzen 5 5600', 'manufacturer': 'AMD', 'socket': 'AM4',
+            'cores': 6, 'threads': 12, 'base_clock': '3.5', 'boost_clock': '4.4', 'tdp': 65,
+            'has_integrated_gpu': 'false', 'benchmark_score': 21000, 'avg_used_price': '9000',
+        }
+        new_cpu = {**cpu, 'name': 'Ryzen 7 5800X', 'tdp': 105, 'benchmark_score': 28000}
+        broken = {**cpu, 'name': 'Ryzen 9', 'socket': 'AM9'}
+        errors = self.run_import([cpu, new_cpu, broken])
+
+        self.assertIn('socket', errors)
+        self.assertEqual(CPU.objects.count(), 3)
+        self.assertEqual(CPU.objects.get(pk=self.parts['cpu_am4'].pk).avg_used_price, Decimal('9000'))
+        self.assertFalse(CPU.objects.filter(name='Ryzen 9').exists())
+        # Сигналы не срабатывают, итоги сборок пересчитываются командой
+        self.build.refresh_from_db()
+        self.assertEqual(self.build.total_price, Decimal('25000'))
+
+    def test_strict_mode_stops_on_invalid_row(self):
+        with self.assertRaises(CommandError):
+            self.run_import([{'model': 'fan', 'name': 'X'}], '--strict')
+
+    def cpu_row(self, **values):
+        return {
+            'model': 'cpu', 'name': 'Ryzen 5 5600', 'manufacturer': 'AMD', 'socket': 'AM4',
+            'cores': 6, 'threads': 12, 'base_clock': '3.5', 'boost_clock': '4.4', 'tdp': 65,
+            'benchmark_score': 21000, 'avg_used_price': '9000', **values,
+        }
+
+    def test_broken_json_line_is_invalid_row(self):
+        errors = self.run_import(['{"model": "cpu", "name": ', '[1, 2]', self.cpu_row(name='Ryzen 7 5800X')])
+        self.assertIn('Строка 1: некорректный JSON', errors)
+        self.assertIn('Строка 2: строка JSONL должна быть объектом', errors)
+        self.assertTrue(CPU.objects.filter(name='Ryzen 7 5800X').exists())
+
+    def test_strict_failure_after_committed_batch(self):
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            self.run_import([self.cpu_row(), 'not json'], '--strict', '--batch-size', '1')
+        # Первый пакет уже записан: итоги сборок пересчитаны
+        self.build.refresh_from_db()
+        self.assertEqual(self.build.total_price, Decimal('25000'))
+
+
+class PriceHistoryTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('watcher', password='secret-pass')
+        cls.build = Build.objects.create(
+            user=cls.user, name='AM4', cpu=cls.parts['cpu_am4'], gpu=cls.parts['gpu_small'],
+            motherboard=cls.parts['mb_am4'], ram=cls.parts['ram_ddr4'], psu=cls.parts['psu_small'],
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.make_aware(datetime(2026, 3, 11, 12, 0))
+        self.cpu = self.parts['cpu_am4']
+
+    def observe(self, *prices_by_days_ago):
+        record_prices(
+            [('cpu', self.cpu.pk, price, self.now - timedelta(days=days)) for days, price in prices_by_days_ago],
+            now=self.now,
+        )
+
+    def test_rollups_are_merged_incrementally(self):
+        self.observe((0, '8000'), (0, '9000'))
+        self.observe((0, '7000'), (1, '10000'))
+        day = PriceRollup.objects.get(period='day', component_id=self.cpu.pk, period_start=self.now.date())
+        self.assertEqual((day.count, day.min_price, day.max_price), (3, Decimal('7000'), Decimal('9000')))
+        self.assertEqual(day.avg_price, Decimal('8000'))
+        # 10 и 11 марта — одна неделя, начинающаяся в понедельник 9 марта
+        week = PriceRollup.objects.get(period='week', component_id=self.cpu.pk)
+        self.assertEqual((week.period_start, week.count), (date(2026, 3, 9), 4))
+        self.assertEqual(PriceObservation.objects.count(), 4)
+
+    def test_avg_price_uses_rolling_window(self):
+        self.observe((0, '8000'), (10, '10000'), (PRICE_WINDOW_DAYS + 5, '20000'))
+        self.cpu.refresh_from_db()
+        self.assertEqual(self.cpu.avg_used_price, Decimal('9000'))
+        self.build.refresh_from_db()
+        self.assertEqual(self.build.total_price, Decimal('25000'))
+
+    def test_price_change_keeps_search_index(self):
+        index = get_search_index()
+        self.observe((0, '8000'))
+        # Цена не меняет документы поиска: индекс принимает новую версию без перестройки
+        self.assertIs(get_search_index(), index)
+        self.assertEqual(index.search('ryzen 5600')[0].pk, self.cpu.pk)
+
+    def test_history_endpoint(self):
+        self.observe((0, '8000'), (7, '9000'))
+        url = reverse('price_history_data', args=['cpu', self.cpu.pk])
+        with patch('django.utils.timezone.now', return_value=self.now):
+            history = self.client.get(url).json()['history']
+        self.assertEqual([row['avg'] for row in history], [9000.0, 8000.0])
+        self.assertEqual(self.client.get(reverse('price_history_data', args=['fan', 1])).status_code, 404)
+
+
+class ApiTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('client', password='secret-pass')
+        cls.build = Build.objects.create(
+            user=cls.user, name='AM5', cpu=cls.parts['cpu_am5'], gpu=cls.parts['gpu_big'],
+            motherboard=cls.parts['mb_am5'], ram=cls.parts['ram_ddr4'], psu=cls.parts['psu_big'],
+            case=cls.parts['case_atx'],
+        )
+
+    def get_list(self, **params):
+        response = self.client.get(reverse('api_catalog_list', args=['cpu']), params)
+        return response, json.loads(b''.join(response.streaming_content))
+
+    def test_list_uses_catalog_filters_and_fields(self):
+        response, data = self.get_list(socket='AM5', fields='id,name,avg_used_price')
+        self.assertEqual(data['results'], [
+            {'id': self.parts['cpu_am5'].pk, 'name': 'Ryzen 5 7600', 'avg_used_price': '15000.00'},
+        ])
+        _, data = self.get_list(sort='avg_used_price', fields='name')
+        self.assertEqual([row['name'] for row in data['results']], ['Ryzen 5 5600', 'Ryzen 5 7600'])
+        response = self.client.get(reverse('api_catalog_list', args=['cpu']), {'fields': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_not_modified_until_catalog_changes(self):
+        response, _ = self.get_list()
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_catalog_list', args=['cpu']), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        CPU.objects.filter(pk=self.parts['cpu_am4'].pk).delete()
+        response = self.client.get(reverse('api_catalog_list', args=['cpu']), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_build_detail_with_compatibility(self):
+        url = reverse('api_build_detail', args=[self.build.pk])
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(data['components']['cpu']['socket'], 'AM5')
+        self.assertEqual(
+            data['compatibility'][0]['message'], 'Тип памяти (DDR4) не поддерживается материнской платой (DDR5)'
+        )
+        self.assertEqual(self.client.get(url, {'fields': 'total_price'}).json(), {'total_price': '68500.00'})
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.parts['gpu_big'].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_private_build_hidden(self):
+        Build.objects.filter(pk=self.build.pk).update(is_public=False)
+        response = self.client.get(reverse('api_build_detail', args=[self.build.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class BuildComparisonTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('comparer', password='secret-pass')
+        parts = cls.parts
+        cls.builds = [
+            Build.objects.create(
+                user=cls.user, name='AM4', cpu=parts['cpu_am4'], gpu=parts['gpu_small'],
+                motherboard=parts['mb_am4'], ram=parts['ram_ddr4'], psu=parts['psu_small'],
+                case=parts['case_matx'],
+            ),
+            Build.objects.create(
+                user=cls.user, name='AM5', cpu=parts['cpu_am5'], gpu=parts['gpu_big'],
+                motherboard=parts['mb_am5'], ram=parts['ram_ddr5'], psu=parts['psu_big'],
+                case=parts['case_atx'],
+            ),
+            Build.objects.create(user=cls.user, name='Без видеокарты', cpu=parts['cpu_am5']),
+            Build.objects.create(user=cls.user, name='Приватная', cpu=parts['cpu_am4'], is_public=False),
+        ]
+
+    def test_metrics_match_build_methods(self):
+        ids = ','.join(str(build.pk) for build in self.builds)
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('api_build_compare'), {'ids': ids}).json()['builds']
+        # Приватная сборка чужому пользователю недоступна
+        self.assertEqual([row['id'] for row in data], [build.pk for build in self.builds[:3]])
+        for row, build in zip(data, self.builds):
+            self.assertEqual(row['price'], float(build.get_total_price()))
+            self.assertEqual(row['tdp'], build.get_total_tdp())
+            self.assertEqual(row['score'], build.get_benchmark_score())
+        self.assertEqual([row['best'] for row in data], [[], ['score'], ['price', 'score_per_1000', 'tdp']])
+
+    def test_page_renders_table_and_single_chart(self):
+        response = self.client.get(reverse('build_compare'), {'ids': [self.builds[0].pk, self.builds[1].pk]})
+        self.assertContains(response, 'id="comparison-chart-spec"', count=1)
+        chart = response.context['comparison_chart_spec']
+        self.assertEqual([trace['name'] for trace in chart['data']],
+                         ['Цена', 'Benchmark Score', 'Score на 1000 ₽', 'Энергопотребление'])
+        self.assertEqual(chart['data'][1]['y'][1], 100)
+
+
+class PricePerformanceTests(CatalogTestCase):
+
+    def test_score_per_rub_follows_price_and_score(self):
+        cpu = self.parts['cpu_am4']
+        self.assertAlmostEqual(cpu.score_per_rub, 21000 / 8500)
+        cpu.avg_used_price = Decimal('7000')
+        cpu.save(update_fields=['avg_used_price'])
+        cpu.refresh_from_db()
+        self.assertAlmostEqual(cpu.score_per_rub, 3.0)
+
+    def test_score_per_rub_after_loaddata(self):
+        call_command('loaddata', 'sample_data', verbosity=0)
+        cpu = CPU.objects.get(pk=1)
+        self.assertAlmostEqual(cpu.score_per_rub, cpu.benchmark_score / float(cpu.avg_used_price))
+        self.assertFalse(GPU.objects.filter(score_per_rub=0).exists())
+
+    def test_list_sorted_in_sql(self):
+        response = self.client.get(reverse('gpu_list'), {'sort': '-score_per_rub'})
+        self.assertEqual(response.context['current_sort'], '-score_per_rub')
+        names = [gpu.name for gpu in GPU.objects.order_by('-score_per_rub')]
+        self.assertEqual(names, ['GTX 1650', 'RTX 3070'])
+
+    def test_ranking_per_bucket(self):
+        CPU.objects.create(
+            name='Ryzen 7 5700X', manufacturer='AMD', socket='AM4', cores=8, threads=16,
+            base_clock=3.4, boost_clock=4.6, tdp=65, benchmark_score=26000, avg_used_price=Decimal('9000'),
+        )
+        url = reverse('api_best_value', args=['cpu'])
+        with self.assertNumQueries(2):
+            groups = self.client.get(url, {'limit': 1}).json()['groups']
+        self.assertEqual(
+            [(group['socket'], [item['name'] for item in group['items']]) for group in groups],
+            [('AM4', ['Ryzen 7 5700X']), ('AM5', ['Ryzen 5 7600'])],
+        )
+        groups = self.client.get(url, {'socket': 'AM4'}).json()['groups']
+        self.assertEqual([item['name'] for item in groups[0]['items']], ['Ryzen 7 5700X', 'Ryzen 5 5600'])
+        self.assertEqual(self.client.get(reverse('api_best_value', args=['ram'])).status_code, 404)
+
+
+class SimilarPartsTests(CatalogTestCase):
+
+    def test_nearest_cpus_within_socket(self):
+        near = CPU.objects.create(
+            name='Ryzen 5 5600X', manufacturer='AMD', socket='AM4', cores=6, threads=12,
+            base_clock=3.7, boost_clock=4.6, tdp=65, benchmark_score=22000, avg_used_price=Decimal('9000'),
+        )
+        CPU.objects.create(
+            name='Ryzen 9 5950X', manufacturer='AMD', socket='AM4', cores=16, threads=32,
+            base_clock=3.4, boost_clock=4.9, tdp=105, benchmark_score=46000, avg_used_price=Decimal('35000'),
+        )
+        similar = similar_parts('cpu', self.parts['cpu_am4'], limit=2)
+        self.assertEqual([cpu.name for cpu in similar], ['Ryzen 5 5600X', 'Ryzen 9 5950X'])
+        # AM5-процессор в похожие для AM4 не попадает
+        self.assertNotIn(self.parts['cpu_am5'], similar_parts('cpu', near))
+
+    def test_index_rebuilt_after_catalog_change(self):
+        index = get_similarity_index('gpu')
+        self.assertIs(get_similarity_index('gpu'), index)
+        # Видеокарты сравниваются только с таким же объёмом памяти: у GTX 1650 пары нет
+        self.assertEqual(index.similar(self.parts['gpu_small'].pk), [])
+        gpu = GPU.objects.create(
+            name='GTX 1050 Ti', manufacturer='NVIDIA', vram=4, memory_type='GDDR5', core_clock=1290,
+            tdp=75, length=180, benchmark_score=6000, avg_used_price=Decimal('5000'),
+        )
+        self.assertEqual(get_similarity_index('gpu').similar(self.parts['gpu_small'].pk), [gpu.pk])
+        gpu.delete()
+        self.assertEqual(get_similarity_index('gpu').similar(self.parts['gpu_small'].pk), [])
+
+    def test_detail_page(self):
+        GPU.objects.create(
+            name='RTX 3060 Ti', manufacturer='NVIDIA', vram=8, memory_type='GDDR6', core_clock=1410,
+            tdp=200, length=242, benchmark_score=20000, avg_used_price=Decimal('24000'),
+        )
+        response = self.client.get(reverse('gpu_detail', args=[self.parts['gpu_big'].pk]))
+        self.assertContains(response, 'Похожие видеокарты')
+        self.assertContains(response, 'RTX 3060 Ti')
+        self.assertNotContains(response, 'GTX 1650')
+
+
+class UpgradeAdvisorTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        parts = cls.parts
+        cls.user = User.objects.create_user('upgrader', password='secret-pass')
+        cls.am4 = Build.objects.create(
+            user=cls.user, name='AM4', cpu=parts['cpu_am4'], gpu=parts['gpu_small'],
+            motherboard=parts['mb_am4'], ram=parts['ram_ddr4'], psu=parts['psu_small'],
+            case=parts['case_matx'],
+        )
+        cls.am5 = Build.objects.create(
+            user=cls.user, name='AM5', cpu=parts['cpu_am5'], gpu=parts['gpu_big'],
+            motherboard=parts['mb_am5'], ram=parts['ram_ddr5'], psu=parts['psu_big'],
+            case=parts['case_atx'], is_public=False,
+        )
+        cpu = dict(manufacturer='AMD', socket='AM4', cores=8, threads=16, base_clock=3.4, boost_clock=4.6)
+        cls.cpu_value = CPU.objects.create(
+            name='Ryzen 7 5700X', tdp=65, benchmark_score=26000, avg_used_price=Decimal('9000'), **cpu
+        )
+        CPU.objects.create(name='Ryzen 9 5950X', tdp=105, benchmark_score=46000, avg_used_price=Decimal('35000'), **cpu)
+        # Дешёвый и быстрый, но 400-ваттный БП его не потянет
+        CPU.objects.create(name='Hot Chip', tdp=250, benchmark_score=50000, avg_used_price=Decimal('9000'), **cpu)
+        gpu = dict(manufacturer='AMD', memory_type='GDDR6', core_clock=1800)
+        cls.gpu_fits = GPU.objects.create(
+            name='RX 6600', vram=8, tdp=120, length=190, benchmark_score=12000, avg_used_price=Decimal('12000'), **gpu
+        )
+        cls.gpu_free = GPU.objects.create(
+            name='RX 6800', vram=16, tdp=250, length=267, benchmark_score=30000, avg_used_price=Decimal('25000'), **gpu
+        )
+
+    def test_best_compatible_upgrade_per_slot(self):
+        upgrades = self.client.get(reverse('api_build_upgrades', args=[self.am4.pk])).json()['upgrades']
+        self.assertEqual(upgrades['cpu']['id'], self.cpu_value.pk)
+        self.assertEqual(upgrades['cpu']['score_gain'], 2000)
+        self.assertEqual(upgrades['cpu']['extra_price'], 500.0)
+        self.assertEqual(upgrades['cpu']['gain_per_rub'], 4.0)
+        # RX 6800 и RTX 3070 не помещаются в mATX-корпус
+        self.assertEqual(upgrades['gpu']['name'], 'AMD RX 6600')
+        self.assertEqual(upgrades['gpu']['score_gain'], 2520)
+
+        # Сборка с новыми деталями должна быть совместимой и быстрее
+        build = Build(
+            cpu=self.cpu_value, gpu=self.gpu_fits, motherboard=self.am4.motherboard,
+            ram=self.am4.ram, psu=self.am4.psu, case=self.am4.case,
+        )
+        self.assertEqual(check_compatibility(build), [])
+        self.assertEqual(build.get_benchmark_score() - self.am4.get_benchmark_score(), 2000 + 2520)
+
+    def test_batch_for_my_builds(self):
+        self.client.login(username='upgrader', password='secret-pass')
+        get_index()
+        with self.assertNumQueries(5):
+            builds = self.client.get(reverse('api_my_builds_upgrades')).json()['builds']
+        by_id = {row['id']: row['upgrades'] for row in builds}
+        # Более дешёвая и быстрая видеокарта — апгрейд без доплаты
+        self.assertEqual(by_id[self.am5.pk]['gpu']['id'], self.gpu_free.pk)
+        self.assertEqual(by_id[self.am5.pk]['gpu']['extra_price'], -3000.0)
+        self.assertIsNone(by_id[self.am5.pk]['gpu']['gain_per_rub'])
+        self.assertIsNone(by_id[self.am5.pk]['cpu'])
+
+        response = self.client.get(reverse('my_builds'))
+        self.assertContains(response, 'без доплаты')
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_my_builds_upgrades')).status_code, 401)
+        self.assertEqual(self.client.get(reverse('api_build_upgrades', args=[self.am5.pk])).status_code, 403)
+
+
+class CompatibilityFlagsTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        parts = cls.parts
+        cls.user = User.objects.create_user('validator', password='secret-pass')
+        cls.good = Build.objects.create(
+            user=cls.user, name='AM4', cpu=parts['cpu_am4'], gpu=parts['gpu_small'],
+            motherboard=parts['mb_am4'], ram=parts['ram_ddr4'], psu=parts['psu_small'],
+            case=parts['case_matx'],
+        )
+        cls.bad = Build.objects.create(
+            user=cls.user, name='Всё мимо', cpu=parts['cpu_am5'], gpu=parts['gpu_big'],
+            motherboard=parts['mb_am4'], ram=parts['ram_ddr5'], psu=parts['psu_small'],
+            case=parts['case_matx'],
+        )
+
+    def assertFlagsMatchRules(self):
+        builds = Build.objects.select_related(*Build.COMPONENT_FIELDS).annotate(
+            current=compatibility_flags_expression()
+        )
+        for build in builds:
+            self.assertEqual(build.compatibility_flags, build.get_compatibility_flags())
+            self.assertEqual(build.current, build.compatibility_flags)
+            self.assertEqual(build.is_compatible, all(e['type'] != 'error' for e in check_compatibility(build)))
+
+    def test_flags_saved_with_build(self):
+        self.assertEqual(self.good.compatibility_flags, 0)
+        self.assertEqual(
+            self.bad.compatibility_flags,
+            Build.SOCKET_MISMATCH | Build.MEMORY_TYPE_MISMATCH | Build.GPU_TOO_LONG | Build.PSU_TOO_WEAK,
+        )
+        self.assertFlagsMatchRules()
+
+    def test_spec_change_revalidates_affected_builds(self):
+        case = self.parts['case_matx']
+        case.max_gpu_length = 160
+        # SELECT старых значений, UPDATE детали, UPDATE флагов сборок
+        with self.assertNumQueries(3):
+            case.save()
+        self.good.refresh_from_db()
+        self.assertEqual(self.good.compatibility_flags, Build.GPU_TOO_LONG)
+        self.assertFlagsMatchRules()
+
+    def test_command_fixes_stale_flags(self):
+        Build.objects.update(compatibility_flags=0)
+        out = StringIO()
+        call_command('revalidate_builds', stdout=out)
+        self.assertIn('изменились флаги: 1', out.getvalue())
+        self.assertFlagsMatchRules()
+        call_command('revalidate_builds', '--slot', 'cpu', '--ids', str(self.parts['cpu_am5'].pk), stdout=out)
+        self.assertIn('Проверено сборок: 1, изменились флаги: 0', out.getvalue())
+
+    def test_build_list_only_compatible(self):
+        response = self.client.get(reverse('build_list'))
+        self.assertEqual(len(response.context['builds']), 2)
+        self.assertContains(response, 'Несовместима', count=1)
+        response = self.client.get(reverse('build_list'), {'compatible': '1'})
+        self.assertEqual([build.name for build in response.context['builds']], ['AM4'])
+
+    def test_extra_warning_rule_keeps_build_compatible(self):
+        extra = {
+            'name': 'gpu_power', 'kind': 'threshold', 'left': 'psu.wattage', 'terms': ('gpu.tdp',),
+            'margin': 6, 'level': 'warning', 'flag': 32, 'label': 'БП слабоват для видеокарты',
+            'message': 'Для видеокарты нужен БП от {right}Вт',
+        }
+        self.addCleanup(reset_rules)
+        with override_settings(BUILDER_EXTRA_COMPATIBILITY_RULES=[extra]):
+            reset_rules()
+            out = StringIO()
+            call_command('revalidate_builds', stdout=out)
+            self.assertIn('изменились флаги: 2', out.getvalue())
+            self.assertIn('БП слабоват для видеокарты: 2', out.getvalue())
+            self.good.refresh_from_db()
+            self.assertEqual(self.good.compatibility_flags, 32)
+            self.assertTrue(self.good.is_compatible)
+            self.assertFlagsMatchRules()
+            response = self.client.get(reverse('build_list'), {'compatible': '1'})
+            self.assertEqual([build.name for build in response.context['builds']], ['AM4'])
+            # Флаги в БД и в Python совпадают: повторная проверка ничего не меняет
+            call_command('revalidate_builds', stdout=out)
+            self.assertIn('изменились флаги: 0', out.getvalue())
+
+    def test_invalid_extra_rule_flags(self):
+        extra = {
+            'name': 'gpu_power', 'kind': 'threshold', 'left': 'psu.wattage', 'terms': ('gpu.tdp',),
+            'message': 'Для видеокарты нужен БП от {right}Вт',
+        }
+        self.addCleanup(reset_rules)
+        for flag in (3, Build.PSU_TOO_WEAK):
+            with override_settings(BUILDER_EXTRA_COMPATIBILITY_RULES=[{**extra, 'flag': flag}]):
+                reset_rules()
+                with self.assertRaises(ImproperlyConfigured):
+                    get_rules()
+
+
+class SearchTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cpu = dict(manufacturer='AMD', socket='AM4', cores=6, threads=12, base_clock=3.7, boost_clock=4.6, tdp=65)
+        cls.cpu_x = CPU.objects.create(name='Ryzen 5 5600X', benchmark_score=22000, avg_used_price=Decimal('9000'), **cpu)
+        CPU.objects.create(name='Ryzen 5 5600X3D', benchmark_score=24000, avg_used_price=Decimal('14000'), **cpu)
+        cls.gpu = GPU.objects.create(
+            name='GeForce RTX 3060', manufacturer='NVIDIA', vram=12, memory_type='GDDR6', core_clock=1320,
+            tdp=170, length=242, benchmark_score=17000, avg_used_price=Decimal('21000'),
+        )
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('api_search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(row['slot'], row['name']) for row in response.json()['results']]
+
+    def test_compact_and_typo_tolerant_matching(self):
+        self.assertEqual(self.search('5600x')[:2], [('cpu', 'AMD Ryzen 5 5600X'), ('cpu', 'AMD Ryzen 5 5600X3D')])
+        self.assertEqual(self.search('rtx3060')[0], ('gpu', 'NVIDIA GeForce RTX 3060'))
+        self.assertEqual(self.search('ryzn 5600x')[0], ('cpu', 'AMD Ryzen 5 5600X'))
+        # Чипсет материнской платы тоже ищется
+        self.assertEqual(self.search('b650', slot='motherboard'), [('motherboard', 'ASUS B650')])
+        self.assertEqual(self.search('nvidia', slot='cpu'), [])
+        self.assertEqual(self.client.get(reverse('api_search'), {'q': 'x', 'slot': 'ssd'}).status_code, 400)
+
+    def test_signals_keep_index_current(self):
+        self.search('5600x')
+        index = get_search_index()
+        self.gpu.name = 'GeForce RTX 3060 Ti'
+        self.gpu.save()
+        self.cpu_x.delete()
+        self.assertEqual(self.search('rtx 3060 ti')[0], ('gpu', 'NVIDIA GeForce RTX 3060 Ti'))
+        self.assertNotIn(('cpu', 'AMD Ryzen 5 5600X'), self.search('5600x'))
+        # Изменения внесены в тот же индекс, без перестроения
+        self.assertIs(get_search_index(), index)
+
+    def test_bulk_changes_rebuild_index(self):
+        index = get_search_index()
+        GPU.objects.filter(pk=self.gpu.pk).update(name='GeForce RTX 3060 LHR')
+        bump_version('gpu')
+        self.assertIsNot(get_search_index(), index)
+        self.assertEqual(self.search('3060 lhr'), [('gpu', 'NVIDIA GeForce RTX 3060 LHR')])
+
+
+class FacetTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        CPU.objects.create(
+            name='Core i5-12400F', manufacturer='Intel', socket='LGA1700', cores=6, threads=12,
+            base_clock=2.5, boost_clock=4.4, tdp=65, benchmark_score=23000, avg_used_price=Decimal('11000'),
+        )
+
+    def facets(self, slot, **params):
+        response = self.client.get(reverse('api_catalog_facets', args=[slot]), params)
+        return {
+            facet['param']: {
+                item['label'] if facet['param'] == 'price' else item['value']: item['count']
+                for item in facet['values']
+            }
+            for facet in response.json()['facets']
+        }
+
+    def test_counts_exclude_own_filter(self):
+        with self.assertNumQueries(1):
+            facets = self.facets('cpu', socket='AM4')
+        # По сокету — все варианты, остальные фасеты — только AM4
+        self.assertEqual(facets['socket'], {'AM4': 1, 'AM5': 1, 'LGA1700': 1})
+        self.assertEqual(facets['manufacturer'], {'AMD': 1})
+        self.assertEqual(facets['price'], {'5 000–10 000 ₽': 1})
+        # Тот же каталог и диапазон цен: сгруппированные строки берутся из кэша
+        with self.assertNumQueries(0):
+            facets = self.facets('cpu', manufacturer='amd')
+        self.assertEqual(facets['socket'], {'AM4': 1, 'AM5': 1})
+        self.assertEqual(facets['price'], {'5 000–10 000 ₽': 1, '10 000–20 000 ₽': 1})
+
+    def test_price_on_bucket_edge(self):
+        cpu = self.parts['cpu_am4']
+        cpu.avg_used_price = Decimal('10000')
+        cpu.save()
+        price = {item['label']: item for item in self.client.get(
+            reverse('api_catalog_facets', args=['cpu'])
+        ).json()['facets'][-1]['values']}
+        self.assertEqual({label: item['count'] for label, item in price.items()}, {'10 000–20 000 ₽': 3})
+        self.assertEqual(price['10 000–20 000 ₽']['value'], {'min_price': 10000, 'price_below': 20000})
+        # Фильтр диапазона находит ровно те детали, что посчитаны в нём
+        for low, high, count in ((5000, 10000, 0), (10000, 20000, 3)):
+            response = self.client.get(reverse('api_catalog_list', args=['cpu']), {
+                'min_price': low, 'price_below': high, 'fields': 'id',
+            })
+            self.assertEqual(len(json.loads(b''.join(response.streaming_content))['results']), count)
+
+    def test_range_filters_and_catalog_changes(self):
+        self.assertEqual(self.facets('cpu', max_price='10000')['socket'], {'AM4': 1})
+        self.parts['cpu_am5'].delete()
+        self.assertEqual(self.facets('cpu')['socket'], {'AM4': 1, 'LGA1700': 1})
+
+    def test_list_page_links(self):
+        response = self.client.get(reverse('motherboard_list'), {'socket': 'AM4'})
+        facets = {facet['param']: facet for facet in response.context['facets']}
+        am4, am5 = sorted(facets['socket']['values'], key=lambda item: item['value'])
+        self.assertTrue(am4['selected'])
+        self.assertEqual(am4['query'], 'sort=name')
+        self.assertIn('socket=AM5', am5['query'])
+        self.assertContains(response, 'href="?socket=AM5&amp;sort=name"')
+
+
+class MetricsTests(QueryBudgetMixin, CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        parts = cls.parts
+        cls.user = User.objects.create_user('metrics', password='secret-pass')
+        for number in range(5):
+            Build.objects.create(
+                user=User.objects.create_user(f'owner{number}'), name=f'Сборка {number}', cpu=parts['cpu_am4'], gpu=parts['gpu_small'],
+                motherboard=parts['mb_am4'], ram=parts['ram_ddr4'], psu=parts['psu_small'],
+                case=parts['case_matx'],
+            )
+
+    def test_views_within_query_budget(self):
+        self.client.login(username='metrics', password='secret-pass')
+        # Холодный кэш: фрагменты рендерятся заново, шаблон обходит все сборки
+        for name in ('home', 'build_list'):
+            self.get_within_budget(reverse(name))
+        self.get_within_budget(reverse('build_list'), {'sort': '-total_price', 'compatible': '1'})
+
+    def test_budget_violation_is_reported(self):
+        registry.reset()
+        with patch.object(views.build_list, 'query_budget', 1):
+            with self.assertLogs('builder.metrics', 'WARNING') as logs:
+                response = self.client.get(reverse('build_list'))
+                with self.assertRaises(AssertionError):
+                    self.get_within_budget(reverse('build_list'))
+        event = json.loads(logs.output[0].split(':', 2)[2])
+        self.assertEqual(event['view'], 'build_list')
+        self.assertEqual(event['queries'], response.wsgi_request.metrics.queries)
+        self.assertGreater(response.wsgi_request.metrics.template_time, 0)
+
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('builder_requests_total{view="build_list"} 2', text)
+        self.assertIn('builder_query_budget_exceeded_total{view="build_list"} 2', text)
+        self.assertIn('builder_request_duration_seconds_bucket{view="build_list",le="+Inf"} 2', text)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 404)
+
+
+class LoadedBuildTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('owner')
+        cls.build = Build.objects.create(
+            user=cls.user, name='Смешанная', cpu=cls.parts['cpu_am5'], gpu=cls.parts['gpu_big'],
+            motherboard=cls.parts['mb_am5'], ram=cls.parts['ram_ddr4'], psu=cls.parts['psu_small'],
+            case=cls.parts['case_atx'],
+        )
+
+    def test_loaded_in_one_query(self):
+        with self.assertNumQueries(1):
+            loaded = load_build(self.build.pk)
+            # Все компоненты и владелец уже загружены: дальше запросов нет
+            self.assertEqual(loaded.build.user.username, 'owner')
+            self.assertEqual([issue.type for issue in loaded.compatibility], ['error', 'warning'])
+            self.assertFalse(loaded.is_compatible)
+        self.assertEqual(loaded.total_price, self.build.total_price)
+        self.assertEqual(loaded.recommended_psu, self.build.get_recommended_psu_wattage())
+        self.assertEqual(len(loaded.budget_items), 6)
+        with self.assertRaises(AttributeError):
+            loaded.total_price = 0
+        self.assertIsNone(load_build(0))
+
+    def test_page_and_api_share_result(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('build_detail', args=[self.build.pk]))
+        self.assertContains(response, 'Тип памяти (DDR4) не поддерживается')
+        data = self.client.get(reverse('api_build_detail', args=[self.build.pk])).json()
+        self.assertEqual(data['compatibility'][1]['type'], 'warning')
+        self.assertEqual(self.client.get(reverse('build_detail', args=[0])).status_code, 404)
+
+        Build.objects.filter(pk=self.build.pk).update(is_public=False)
+        self.assertRedirects(self.client.get(reverse('build_detail', args=[self.build.pk])), reverse('build_list'))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('build_chart_data', args=[self.build.pk])).status_code, 200)
+
+
+class BuildFormChoicesTests(CatalogTestCase):
+
+    def test_choices_cached_until_catalog_changes(self):
+        BuildForm().as_p()
+        with self.assertNumQueries(0):
+            html = BuildForm().as_p()
+        self.assertIn('Corsair Vengeance 16GB', html)
+        self.assertIn('Corsair RM650 650W', html)
+
+        CPU.objects.create(
+            name='Ryzen 7 5800X3D', manufacturer='AMD', socket='AM4', cores=8, threads=16,
+            base_clock=3.4, boost_clock=4.5, tdp=105, benchmark_score=28000, avg_used_price=Decimal('20000'),
+        )
+        self.assertIn('AMD Ryzen 7 5800X3D', BuildForm().as_p())
+
+    def test_typeahead_for_large_catalog(self):
+        user = User.objects.create_user('owner')
+        build = Build.objects.create(
+            user=user, name='AM4', cpu=self.parts['cpu_am4'], motherboard=self.parts['mb_am4'],
+            ram=self.parts['ram_ddr4'], psu=self.parts['psu_small'],
+        )
+        self.client.force_login(user)
+        with patch('builder.choices.TYPEAHEAD_THRESHOLD', 1):
+            response = self.client.get(reverse('build_edit', args=[build.pk]))
+            self.assertContains(response, reverse('api_component_options', args=['cpu']))
+            # В select только выбранный процессор
+            self.assertContains(response, 'AMD Ryzen 5 5600')
+            self.assertNotContains(response, 'AMD Ryzen 5 7600')
+
+            response = self.client.post(reverse('build_edit', args=[build.pk]), {
+                'name': 'AM5', 'cpu': self.parts['cpu_am5'].pk, 'motherboard': self.parts['mb_am5'].pk,
+                'ram': self.parts['ram_ddr5'].pk, 'psu': self.parts['psu_big'].pk, 'is_public': 'on',
+            })
+        self.assertRedirects(response, reverse('build_detail', args=[build.pk]))
+        build.refresh_from_db()
+        self.assertEqual(build.cpu, self.parts['cpu_am5'])
+
+    def test_compatible_options(self):
+        url = reverse('api_component_options', args=['motherboard'])
+        data = self.client.get(url, {'cpu': self.parts['cpu_am4'].pk}).json()
+        self.assertEqual([item['id'] for item in data['results']], [self.parts['mb_am4'].pk])
+        self.assertEqual(data['results'][0]['text'], 'MSI B450M')
+
+        data = self.client.get(url, {'q': 'asus b6'}).json()
+        self.assertEqual([item['id'] for item in data['results']], [self.parts['mb_am5'].pk])
+
+        # БП — по мощности для выбранных CPU и GPU, от дешёвых к дорогим
+        data = self.client.get(reverse('api_component_options', args=['psu']), {
+            'cpu': self.parts['cpu_am5'].pk, 'gpu': self.parts['gpu_big'].pk, 'psu': self.parts['psu_small'].pk,
+        }).json()
+        self.assertEqual([item['text'] for item in data['results']], ['Corsair RM650 650W'])
+        self.assertEqual(self.client.get(reverse('api_component_options', args=['fan'])).status_code, 404)
+
+
+class CompatibilityCheckApiTests(CatalogTestCase):
+
+    def test_partial_selection_without_queries(self):
+        url = reverse('api_compatibility_check')
+        params = {'cpu': self.parts['cpu_am5'].pk, 'gpu': self.parts['gpu_big'].pk, 'motherboard': self.parts['mb_am5'].pk}
+        self.client.get(url, params)
+        with self.assertNumQueries(0):
+            data = self.client.get(url, {**params, 'ram': self.parts['ram_ddr4'].pk, 'psu': self.parts['psu_small'].pk}).json()
+        self.assertFalse(data['compatible'])
+        self.assertEqual(data['errors'], ['Тип памяти (DDR4) не поддерживается материнской платой (DDR5)'])
+        self.assertEqual(data['warnings'], ['Мощности БП (400Вт) может не хватить. Рекомендуется: 435Вт'])
+        self.assertEqual(data['recommended_psu'], 435)
+        self.assertEqual(data['total_price'], '60000.00')
+
+        # Те же правила и итоги, что у сохранённой сборки
+        build = Build(cpu=self.parts['cpu_am5'], gpu=self.parts['gpu_big'], motherboard=self.parts['mb_am5'])
+        data = self.client.get(url, params).json()
+        self.assertTrue(data['compatible'])
+        self.assertEqual(data['benchmark_score'], build.get_benchmark_score())
+        self.assertEqual(data['components']['ram'], None)
+
+    def test_unknown_and_invalid_ids(self):
+        url = reverse('api_compatibility_check')
+        data = self.client.get(url, {'cpu': 999999, 'psu': self.parts['psu_big'].pk}).json()
+        self.assertEqual(data['missing'], ['cpu'])
+        self.assertTrue(data['compatible'])
+        self.assertEqual(self.client.get(url, {'gpu': 'abc'}).status_code, 400)
+
+
+class RuleEngineTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        reset_rules()
+        self.addCleanup(reset_rules)
+
+    def test_batch_scalar_and_sql_agree(self):
+        user = User.objects.create_user('rules', password='secret-pass')
+        options = {
+            slot: [None, *(part for name, part in self.parts.items() if isinstance(part, model))]
+            for slot, model in zip(Build.COMPONENT_FIELDS, (CPU, GPU, Motherboard, RAM, PSU, Case))
+        }
+        combinations = [dict(zip(Build.COMPONENT_FIELDS, parts)) for parts in product(*options.values())]
+        Build.objects.bulk_create(Build(user=user, name='Перебор', **parts) for parts in combinations)
+
+        builds = list(
+            Build.objects.filter(user=user).select_related(*Build.COMPONENT_FIELDS)
+            .annotate(current=compatibility_flags_expression()).order_by('pk')
+        )
+        rules = get_rules()
+        batch = rules.flags_batch(rules.columns({
+            slot: [getattr(build, slot) for build in builds] for slot in Build.COMPONENT_FIELDS
+        }))
+        self.assertEqual(len(builds), 3 ** 6)
+        self.assertEqual([build.current for build in builds], [build.get_compatibility_flags() for build in builds])
+        self.assertEqual(batch.tolist(), [build.current for build in builds])
+        # Каждое правило хоть раз нарушено
+        self.assertEqual(int(np.bitwise_or.reduce(batch)), sum(rule.flag for rule in rules.rules))
+
+    def test_extra_rule_from_settings(self):
+        extra = {
+            'name': 'gpu_power', 'kind': 'threshold', 'left': 'psu.wattage', 'terms': ('gpu.tdp',),
+            'margin': 2, 'level': 'warning', 'message': 'Для видеокарты нужен БП от {right}Вт, а не {left}Вт',
+        }
+        build = Build(gpu=self.parts['gpu_big'], psu=self.parts['psu_small'])
+        with override_settings(BUILDER_EXTRA_COMPATIBILITY_RULES=[extra]):
+            reset_rules()
+            self.assertIn(
+                {'type': 'warning', 'message': 'Для видеокарты нужен БП от 440Вт, а не 400Вт'},
+                check_compatibility(build),
+            )
+            # Правило без флага не меняет сохраняемые флаги
+            self.assertEqual(build.get_compatibility_flags(), 0)
+        reset_rules()
+        self.assertEqual(check_compatibility(build), [])
+
+    def test_extra_rules_on_fields_outside_index(self):
+        extra = [
+            {
+                'name': 'ram_capacity', 'kind': 'at_most', 'left': 'ram.capacity', 'right': 'motherboard.max_memory',
+                'message': 'Объём памяти ({left}ГБ) больше, чем поддерживает плата ({right}ГБ)',
+            },
+            {
+                'name': 'gpu_power', 'kind': 'threshold', 'left': 'psu.wattage', 'terms': ('gpu.tdp',),
+                'margin': 3, 'level': 'warning', 'message': 'Для видеокарты нужен БП от {right}Вт',
+            },
+        ]
+        # Дешёвый модуль, который не поддерживает ни одна плата из каталога
+        big_ram = RAM.objects.create(
+            name='Server', manufacturer='Samsung', memory_type='DDR4', capacity=128,
+            modules=4, speed=2666, avg_used_price=Decimal('2000'),
+        )
+        self.assertEqual(find_best_build(30000).ram, big_ram)
+        with override_settings(BUILDER_EXTRA_COMPATIBILITY_RULES=extra):
+            reset_rules()
+            data = self.client.get(reverse('api_compatibility_check'), {
+                'motherboard': self.parts['mb_am4'].pk, 'ram': big_ram.pk,
+            }).json()
+            self.assertEqual(data['errors'], ['Объём памяти (128ГБ) больше, чем поддерживает плата (64ГБ)'])
+
+            options = self.client.get(reverse('api_component_options', args=['ram']), {
+                'motherboard': self.parts['mb_am4'].pk,
+            }).json()
+            self.assertEqual([item['id'] for item in options['results']], [self.parts['ram_ddr4'].pk])
+            options = self.client.get(reverse('api_component_options', args=['gpu']), {
+                'psu': self.parts['psu_big'].pk,
+            }).json()
+            self.assertEqual([item['id'] for item in options['results']], [self.parts['gpu_small'].pk])
+
+            self.assertEqual(find_best_build(30000).ram, self.parts['ram_ddr4'])
+            # RTX 3070 требует БП от 660Вт, а самый мощный в каталоге — 650Вт
+            build = find_best_build(100000)
+            self.assertEqual(build.gpu, self.parts['gpu_small'])
+            self.assertEqual(check_compatibility(build), [])
+
+
+class AsyncViewTests(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        parts = cls.parts
+        cls.user = User.objects.create_user('async', password='secret-pass')
+        cls.private = Build.objects.create(
+            user=cls.user, name='Закрытая', is_public=False, cpu=parts['cpu_am5'], motherboard=parts['mb_am5'],
+            gpu=parts['gpu_big'], psu=parts['psu_big'],
+        )
+
+    async def test_home_counts_through_async_orm(self):
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        # UNION ALL статистики и последние сборки (см. docstring views.home); под ASGI запросы тоже попадают в метрики
+        self.assertEqual(response.asgi_request.metrics.queries, 2)
+        self.assertEqual(response.context['stats_html'].count('<h3 class="mt-2">2</h3>'), 6)
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.asgi_request.metrics.queries, 0)
+
+    async def test_catalog_list(self):
+        response = await self.async_client.get(reverse('cpu_list'), {'socket': 'AM4'})
+        self.assertContains(response, 'Ryzen 5 5600')
+        self.assertNotContains(response, 'Ryzen 5 7600')
+        facets = {facet['param']: facet for facet in response.context['facets']}
+        self.assertEqual({item['value']: item['count'] for item in facets['socket']['values']}, {'AM4': 1, 'AM5': 1})
+
+    async def test_private_build_detail(self):
+        url = reverse('build_detail', args=[self.private.pk])
+        response = await self.async_client.get(url)
+        self.assertRedirects(response, reverse('build_list'), fetch_redirect_response=False)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Закрытая')
+        metrics = response.asgi_request.metrics
+        self.assertLessEqual(metrics.queries, metrics.budget)
+
+
+class CatalogStatsTests(CatalogTestCase):
+
+    def test_one_query_and_cache(self):
+        with self.assertNumQueries(1):
+            stats = catalog_stats()
+        self.assertEqual(stats['cpu'], CategoryStats(2, Decimal('8500'), Decimal('15000'), Decimal('11750')))
+        self.assertEqual(stats['build'], CategoryStats(0, None, None, None))
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog_stats(), stats)
+
+        # Изменение каталога меняет версию: статистика считается заново
+        cpu = self.parts['cpu_am4']
+        cpu.avg_used_price = Decimal('7500')
+        cpu.save()
+        self.assertEqual(catalog_stats()['cpu'].min_price, Decimal('7500'))
+
+    def test_home_shows_price_ranges(self):
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, '8500–15000 ₽, в среднем 11750 ₽')
+
+
+class SyntheticCatalogTests(TestCase):
+    def setUp(self):
+        reset_index()
+        cache.clear()
+
+    def test_fill_catalog(self):
+        sizes = fill_catalog(1000, seed=7)
+        self.assertEqual(sizes, table_sizes(1000))
+        self.assertEqual(CPU.objects.count(), sizes['cpu'])
+        self.assertEqual(Build.objects.count(), sizes['build'])
+        for socket, memory_type in Motherboard.objects.values_list('socket', 'memory_type').distinct():
+            self.assertIn(memory_type, SOCKET_MEMORY_TYPES[socket])
+
+        # Итоги и флаги из UPDATE совпадают с пересчётом в Python
+        build = Build.objects.order_by('pk').last()
+        stored = (build.total_price, build.total_tdp, build.benchmark_score, build.compatibility_flags)
+        build.refresh_totals()
+        self.assertEqual(stored, (build.total_price, build.total_tdp, build.benchmark_score, build.compatibility_flags))
+        compatible = compatible_builds(Build.objects.all()).count()
+        self.assertGreater(compatible, sizes['build'] * 0.8)
+
+    def test_bench_views_report(self):
+        from .management.commands.bench_views import Command
+
+        fill_catalog(1000, seed=7)
+        report = Command().run_scenarios({'seed': 7, 'runs': 2, 'warmup': 0, 'cold_cache': False})
+        self.assertIn('build_create', report)
+        self.assertEqual(report['home']['requests'], 2)
+        self.assertGreater(report['build_detail']['queries_max'], 0)
+
+
+class BenchServersTests(TransactionTestCase):
+    """Сервер отвечает из своих потоков: данные должны быть закоммичены"""
+
+    def setUp(self):
+        reset_index()
+        cache.clear()
+
+    def test_bench_servers_load(self):
+        from .management.commands.bench_servers import HOST, Command
+
+        fill_catalog(1000, seed=7)
+        paths = Command.scenario_paths(7)
+        with Command.serve_wsgi() as port:
+            load = run_load(HOST, port, paths['home'] + paths['build_detail'][:3], 8, 2)
+        stats = Command.summarize(load)
+        self.assertEqual((stats['requests'], stats['failed']), (8, 0))
@@ -0,0 +1,215 @@
+"""Советник по апгрейду: лучшая замена одной детали в готовой сборке.
+
+Benchmark Score сборки зависит только от процессора и видеокарты
+(Build.get_benchmark_score), поэтому прирост дают только их замены.
+Для каждого из этих слотов ищется совместимая с остальными деталями
+замена с наибольшим приростом score на каждый доплаченный рубль.
+Совместимость — все правила rules.py, в которых участвует слот, включая
+предупреждения: процессор — сокет платы, видеокарта — длина под корпус,
+для обоих — мощность установленного блока питания.
+
+Если замена даёт прирост без доплаты, она считается лучшей (среди таких —
+с наибольшим приростом). Характеристики берутся из индекса совместимости
+в памяти, сборки — одним запросом values_list; все кандидаты для пачки
+сборок оцениваются матрицами NumPy «сборки × кандидаты». Детали без
+цены не предлагаются.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .compatibility import get_index
+from .models import Build
+from .rules import get_rules
+
+
+UPGRADE_SLOTS = ('cpu', 'gpu')
+
+# Предельный размер матрицы «сборки × кандидаты» за один проход
+MAX_CELLS = 1 << 20
+
+Upgrade = namedtuple('Upgrade', 'slot pk score_gain extra_price gain_per_rub')
+
+
+def _spec_value(spec, field, missing=-1):
+    return getattr(spec, field) if spec is not None else missing
+
+
+def _price(spec):
+    # Деталь без цены (или отсутствующая) стоит 0 — как в Build.get_total_price
+    return float(spec.avg_used_price or 0) if spec is not None else 0.0
+
+
+class UpgradeAdvisor:
+    """Массивы характеристик CPU и GPU из снимка каталога (формат load_catalog)"""
+
+    def __init__(self, catalog):
+        self.rules = get_rules()
+
+        cpus = catalog['cpu']
+        self.cpu_pk = np.array([spec.pk for spec in cpus], dtype=np.int64)
+        self.cpu_score = np.array([spec.benchmark_score for spec in cpus], dtype=np.float64)
+        self.cpu_price = np.array([_price(spec) for spec in cpus], dtype=np.float64)
+
+        gpus = catalog['gpu']
+        self.gpu_pk = np.array([spec.pk for spec in gpus], dtype=np.int64)
+        self.gpu_score = np.array([spec.benchmark_score for spec in gpus], dtype=np.float64)
+        self.gpu_price = np.array([_price(spec) for spec in gpus], dtype=np.float64)
+
+        # Столбцы правил совместимости для кандидатов — строкой матрицы
+        self.candidate_columns = {
+            slot: {key: value[None, :] for key, value in self.rules.columns({slot: catalog[slot]}).items()}
+            for slot in UPGRADE_SLOTS
+        }
+
+        self.specs = {slot: {spec.pk: spec for spec in specs} for slot, specs in catalog.items()}
+
+    def _build_arrays(self, builds):
+        """Текущие характеристики сборок; builds — словари {слот: pk или None}"""
+        slots = {
+            slot: [self.specs[slot].get(build.get(slot)) for build in builds]
+            for slot in Build.COMPONENT_FIELDS
+        }
+        cpus, gpus = slots['cpu'], slots['gpu']
+        current = {
+            'cpu_score': np.array([_spec_value(cpu, 'benchmark_score', 0) for cpu in cpus], dtype=np.float64),
+            'cpu_price': np.array([_price(cpu) for cpu in cpus], dtype=np.float64),
+            'gpu_score': np.array([_spec_value(gpu, 'benchmark_score', 0) for gpu in gpus], dtype=np.float64),
+            'gpu_price': np.array([_price(gpu) for gpu in gpus], dtype=np.float64),
+        }
+        # Столбцы правил для остальных деталей сборки — столбцом матрицы
+        columns = {key: value[:, None] for key, value in self.rules.columns(slots).items()}
+        return current, columns
+
+    def _allowed(self, slot, price, columns):
+        """Кандидаты с ценой, при замене на которых не нарушается ни одно правило со слотом"""
+        candidate = {**columns, **self.candidate_columns[slot]}
+        return (price[None, :] > 0) & ~self.rules.violations_batch(candidate, slots=(slot,))
+
+    @staticmethod
+    def _best(slot, pks, allowed, gain, extra):
+        """Лучший кандидат в каждой строке матрицы (или None)"""
+        if not len(pks):
+            return [None] * len(gain)
+        useful = allowed & (gain > 0)
+        free = useful & (extra <= 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = np.where(useful & ~free, gain / extra, -np.inf)
+        # Без доплаты — вне конкуренции, между собой сравниваются по приросту
+        value = np.where(free, np.inf, value)
+        tie_break = np.where(useful, gain, -np.inf)
+
+        top = value.max(axis=1, keepdims=True)
+        columns = np.argmax(np.where(value == top, tie_break, -np.inf), axis=1)
+        rows = np.arange(len(columns))
+        found = useful[rows, columns]
+        best_gain = gain[rows, columns]
+        best_extra = extra[rows, columns]
+
+        results = []
+        for row, column in enumerate(columns.tolist()):
+            if not found[row]:
+                results.append(None)
+                continue
+            row_extra = float(best_extra[row])
+            results.append(Upgrade(
+                slot=slot,
+                pk=int(pks[column]),
+                score_gain=int(best_gain[row]),
+                extra_price=row_extra,
+                gain_per_rub=float(best_gain[row] / row_extra) if row_extra > 0 else None,
+            ))
+        return results
+
+    def _advise_batch(self, builds):
+        current, columns = self._build_arrays(builds)
+        old_score = (
+            current['gpu_score'] * Build.GPU_SCORE_WEIGHT + current['cpu_score'] * Build.CPU_SCORE_WEIGHT
+        ).astype(np.int64)[:, None]
+
+        cpu_allowed = self._allowed('cpu', self.cpu_price, columns)
+        cpu_gain = (
+            current['gpu_score'][:, None] * Build.GPU_SCORE_WEIGHT + self.cpu_score[None, :] * Build.CPU_SCORE_WEIGHT
+        ).astype(np.int64) - old_score
+        cpu_extra = self.cpu_price[None, :] - current['cpu_price'][:, None]
+
+        gpu_allowed = self._allowed('gpu', self.gpu_price, columns)
+        gpu_gain = (
+            self.gpu_score[None, :] * Build.GPU_SCORE_WEIGHT + current['cpu_score'][:, None] * Build.CPU_SCORE_WEIGHT
+        ).astype(np.int64) - old_score
+        gpu_extra = self.gpu_price[None, :] - current['gpu_price'][:, None]
+
+        cpu_best = self._best('cpu', self.cpu_pk, cpu_allowed, cpu_gain, cpu_extra)
+        gpu_best = self._best('gpu', self.gpu_pk, gpu_allowed, gpu_gain, gpu_extra)
+        return [{'cpu': cpu, 'gpu': gpu} for cpu, gpu in zip(cpu_best, gpu_best)]
+
+    def advise(self, builds):
+        """Лучшие замены для каждой сборки: список словарей {'cpu': Upgrade|None, 'gpu': ...}"""
+        builds = list(builds)
+        batch_size = max(1, MAX_CELLS // max(len(self.cpu_pk), len(self.gpu_pk), 1))
+        results = []
+        for start in range(0, len(builds), batch_size):
+            results.extend(self._advise_batch(builds[start:start + batch_size]))
+        return results
+
+
+_cached_advisor = (None, None)
+
+
+def get_upgrade_advisor():
+    """Советник по текущему индексу совместимости; пересобирается после изменений каталога и правил"""
+    global _cached_advisor
+    index = get_index()
+    key = (id(index), index.version, id(get_rules()))
+    cached_key, advisor = _cached_advisor
+    if cached_key != key:
+        advisor = UpgradeAdvisor(index.rows())
+        _cached_advisor = (key, advisor)
+    return advisor
+
+
+def advise_upgrades(queryset):
+    """{pk сборки: {'cpu': Upgrade|None, 'gpu': Upgrade|None}} для сборок из queryset.
+
+    Сборки читаются одним запросом без создания моделей.
+    """
+    fields = [f'{slot}_id' for slot in Build.COMPONENT_FIELDS]
+    rows = list(queryset.order_by().values_list('pk', *fields))
+    builds = [dict(zip(Build.COMPONENT_FIELDS, row[1:])) for row in rows]
+    advice = get_upgrade_advisor().advise(builds)
+    return {row[0]: result for row, result in zip(rows, advice)}
+
+
+def best_upgrade(result):
+    """Самая выгодная из замен сборки: без доплаты, иначе по приросту на рубль"""
+    upgrades = [upgrade for upgrade in result.values() if upgrade is not None]
+    if not upgrades:
+        return None
+    return max(upgrades, key=lambda upgrade: (
+        (1, upgrade.score_gain) if upgrade.gain_per_rub is None else (0, upgrade.gain_per_rub)
+    ))
+
+
+def suggested_components(advice):
+    """Объекты предложенных деталей {(слот, pk): деталь} — по запросу на слот"""
+    components = {}
+    for slot in UPGRADE_SLOTS:
+        pks = {result[slot].pk for result in advice.values() if result[slot] is not None}
+        if pks:
+            model = Build._meta.get_field(slot).related_model
+            for pk, component in model.objects.in_bulk(pks).items():
+                components[slot, pk] = component
+    return components
+
+
+def serialize_upgrade(upgrade, components):
+    if upgrade is None:
+        return None
+    component = components.get((upgrade.slot, upgrade.pk))
+    return {
+        'id': upgrade.pk,
+        'name': str(component) if component is not None else None,
+        'score_gain': upgrade.score_gain,
+        'extra_price': upgrade.extra_price,
+        'gain_per_rub': upgrade.gain_per_rub,
+    }
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Главная
@@ -14,15 +14,32 @@ urlpatterns = [
     path('ram/', views.ram_list, name='ram_list'),
     path('psu/', views.psu_list, name='psu_list'),
     path('case/', views.case_list, name='case_list'),
+    path('<slug:slot>/<int:pk>/prices.json', views.price_history_data, name='price_history_data'),
     
     # Сборки
     path('builds/', views.build_list, name='build_list'),
     path('builds/<int:pk>/', views.build_detail, name='build_detail'),
+    path('builds/<int:pk>/chart.json', views.build_chart_data, name='build_chart_data'),
     path('builds/new/', views.build_create, name='build_create'),
+    path('builds/auto/', views.auto_build, name='auto_build'),
+    path('builds/compare/', views.build_compare, name='build_compare'),
     path('builds/<int:pk>/edit/', views.build_edit, name='build_edit'),
     path('builds/<int:pk>/delete/', views.build_delete, name='build_delete'),
     path('my-builds/', views.my_builds, name='my_builds'),
     
+    # JSON API (только чтение)
+    path('api/catalog/<slug:slot>/', api.catalog_list, name='api_catalog_list'),
+    path('api/catalog/<slug:slot>/facets/', api.facet_counts, name='api_catalog_facets'),
+    path('api/builds/<int:pk>/', api.build_detail, name='api_build_detail'),
+    path('api/builds/compare/', api.build_compare, name='api_build_compare'),
+    path('api/builds/<int:pk>/upgrades/', api.build_upgrades, name='api_build_upgrades'),
+    path('api/my-builds/upgrades/', api.my_builds_upgrades, name='api_my_builds_upgrades'),
+    path('api/ranking/<slug:slot>/', api.best_value_ranking, name='api_best_value'),
+    path('api/search/', api.search, name='api_search'),
+    path('api/compatibility/', api.compatibility_check, name='api_compatibility_check'),
+    path('api/options/<slug:slot>/', api.component_options, name='api_component_options'),
+    path('metrics/', views.metrics, name='metrics'),
+    
     # Регистрация
     path('register/', views.register, name='register'),
 ]
\ No newline at end of file
@@ -1,240 +1,278 @@
+import asyncio
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib import messages
+from django.core.paginator import Paginator
 from django.db.models import Q, Avg, Count
-from .models import CPU, GPU, Motherboard, RAM, PSU, Case, Build
+from .models import CPU, GPU, Motherboard, RAM, PSU, Case, Build, compatible_builds
+from .builds import arequest_build, check_compatibility, request_build
 from .forms import BuildForm, CPUFilterForm, GPUFilterForm, RegistrationForm
-
-
-def home(request):
-    """Главная страница"""
+from .charts import client_side_charts, comparison_chart_spec, price_history_chart_spec, render_budget_chart
+from .pagination import akeyset_paginate, page_links
+from .catalog import acatalog_facets, filtered_catalog
+from .cache import acached_fragment, acatalog_fragment_key, aget_versions, build_fragment_key, make_key
+from .compatibility import CATALOG_FIELDS, SLOT_BY_MODEL, get_index
+from .prices import price_history
+from .stats import acatalog_stats
+from .metrics import query_budget, registry
+
+
+CATALOG_SLOTS = tuple(CATALOG_FIELDS)
+
+
+# Бюджеты SQL-запросов (builder/metrics.py): холодный кэш и вошедший пользователь
+# (+2 запроса: сессия и пользователь). Превышение — обычно N+1 в шаблоне.
+@query_budget(4)
+async def home(request):
+    """Главная страница.
+
+    При холодном кэше — два запроса: статистика всех таблиц одним UNION ALL
+    (stats.py) и последние публичные сборки. Сборки в UNION не входят:
+    у его веток общие столбцы агрегатов, а для карточек нужны строки сборок
+    с пользователем и деталями. Оба фрагмента кэшируются под версиями
+    данных, поэтому при тёплом кэше запросов нет.
+    """
+    versions = await aget_versions(*CATALOG_SLOTS, 'build')
+    
+    async def render_stats():
+        # Количество и цены по всем таблицам — один запрос (или кэш)
+        context = {'stats': await acatalog_stats()}
+        return render_to_string('builder/fragments/home_stats.html', context)
+    
+    async def render_latest_builds():
+        latest = Build.objects.filter(is_public=True).select_related('user', 'cpu', 'gpu')[:3]
+        context = {
+            'latest_builds': [build async for build in latest],
+        }
+        return render_to_string('builder/fragments/home_latest_builds.html', context)
+    
+    stats_html, latest_builds_html = await asyncio.gather(
+        acached_fragment(make_key('home:stats', versions[:-1]), render_stats),
+        acached_fragment(make_key('home:builds', versions), render_latest_builds),
+    )
     context = {
-        'cpu_count': CPU.objects.count(),
-        'gpu_count': GPU.objects.count(),
-        'motherboard_count': Motherboard.objects.count(),
-        'ram_count': RAM.objects.count(),
-        'psu_count': PSU.objects.count(),
-        'case_count': Case.objects.count(),
-        'build_count': Build.objects.filter(is_public=True).count(),
-        'latest_builds': Build.objects.filter(is_public=True)[:3],
+        'stats_html': stats_html,
+        'latest_builds_html': latest_builds_html,
     }
-    return render(request, 'builder/home.html', context)
+    return await arender(request, 'builder/home.html', context)
 
 
 # ==================== КАТАЛОГ ====================
 
-def cpu_list(request):
+async def cpu_list(request):
     """Список процессоров"""
-    cpus = CPU.objects.all()
-    
-    # Фильтрация
-    socket = request.GET.get('socket')
-    manufacturer = request.GET.get('manufacturer')
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    sort = request.GET.get('sort', '-benchmark_score')
-    
-    if socket:
-        cpus = cpus.filter(socket=socket)
-    if manufacturer:
-        cpus = cpus.filter(manufacturer__icontains=manufacturer)
-    if min_price:
-        cpus = cpus.filter(avg_used_price__gte=min_price)
-    if max_price:
-        cpus = cpus.filter(avg_used_price__lte=max_price)
-    
-    # Сортировка
-    if sort in ['avg_used_price', '-avg_used_price', 'benchmark_score', '-benchmark_score', 'name']:
-        cpus = cpus.order_by(sort)
+    cpus, filters = filtered_catalog('cpu', request.GET)
     
     context = {
-        'cpus': cpus,
+        **await catalog_page(request, 'cpu', cpus, filters),
         'socket_choices': CPU.SOCKET_CHOICES,
-        'current_socket': socket,
-        'current_sort': sort,
+        'current_socket': filters['socket'],
+        'current_sort': filters['sort'],
     }
-    return render(request, 'builder/cpu_list.html', context)
+    return await arender(request, 'builder/cpu_list.html', context)
 
 
 def cpu_detail(request, pk):
     """Детальная страница процессора"""
     cpu = get_object_or_404(CPU, pk=pk)
-    # Похожие процессоры (тот же сокет, похожая цена)
-    similar = CPU.objects.filter(socket=cpu.socket).exclude(pk=pk)[:4]
-    return render(request, 'builder/cpu_detail.html', {'cpu': cpu, 'similar': similar})
+    # Похожие процессоры: ближайшие по характеристикам, цене и score в том же сокете
+    from .similarity import similar_parts
+    similar = similar_parts('cpu', cpu)
+    # Самые дешёвые подходящие материнские платы
+    index = get_index()
+    board_pks = index.cheapest('motherboard', index.compatible('motherboard', {'cpu': cpu.pk}), 4)
+    compatible_boards = sorted(
+        Motherboard.objects.filter(pk__in=board_pks), key=lambda board: board.avg_used_price
+    )
+    return render(request, 'builder/cpu_detail.html', {
+        'cpu': cpu,
+        'similar': similar,
+        'compatible_boards': compatible_boards,
+        'price_chart_spec': price_chart(cpu),
+    })
 
 
-def gpu_list(request):
+async def gpu_list(request):
     """Список видеокарт"""
-    gpus = GPU.objects.all()
-    
-    # Фильтрация
-    manufacturer = request.GET.get('manufacturer')
-    vram = request.GET.get('vram')
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
-    sort = request.GET.get('sort', '-benchmark_score')
-    
-    if manufacturer:
-        gpus = gpus.filter(manufacturer__icontains=manufacturer)
-    if vram:
-        gpus = gpus.filter(vram=vram)
-    if min_price:
-        gpus = gpus.filter(avg_used_price__gte=min_price)
-    if max_price:
-        gpus = gpus.filter(avg_used_price__lte=max_price)
-    
-    if sort in ['avg_used_price', '-avg_used_price', 'benchmark_score', '-benchmark_score', 'name']:
-        gpus = gpus.order_by(sort)
+    gpus, filters = filtered_catalog('gpu', request.GET)
     
     context = {
-        'gpus': gpus,
-        'current_sort': sort,
+        **await catalog_page(request, 'gpu', gpus, filters),
+        'current_sort': filters['sort'],
     }
-    return render(request, 'builder/gpu_list.html', context)
+    return await arender(request, 'builder/gpu_list.html', context)
 
 
 def gpu_detail(request, pk):
     """Детальная страница видеокарты"""
     gpu = get_object_or_404(GPU, pk=pk)
-    similar = GPU.objects.filter(vram=gpu.vram).exclude(pk=pk)[:4]
-    return render(request, 'builder/gpu_detail.html', {'gpu': gpu, 'similar': similar})
-
-
-def motherboard_list(request):
+    from .similarity import similar_parts
+    similar = similar_parts('gpu', gpu)
+    # Самые дешёвые корпуса, в которые поместится видеокарта
+    index = get_index()
+    case_pks = index.cheapest('case', index.compatible('case', {'gpu': gpu.pk}), 4)
+    compatible_cases = sorted(Case.objects.filter(pk__in=case_pks), key=lambda case: case.avg_used_price)
+    return render(request, 'builder/gpu_detail.html', {
+        'gpu': gpu,
+        'similar': similar,
+        'compatible_cases': compatible_cases,
+        'price_chart_spec': price_chart(gpu),
+    })
+
+
+async def motherboard_list(request):
     """Список материнских плат"""
-    motherboards = Motherboard.objects.all()
-    
-    socket = request.GET.get('socket')
-    form_factor = request.GET.get('form_factor')
-    sort = request.GET.get('sort', 'name')
-    
-    if socket:
-        motherboards = motherboards.filter(socket=socket)
-    if form_factor:
-        motherboards = motherboards.filter(form_factor=form_factor)
-    
-    if sort in ['avg_used_price', '-avg_used_price', 'name']:
-        motherboards = motherboards.order_by(sort)
+    motherboards, filters = filtered_catalog('motherboard', request.GET)
     
     context = {
-        'motherboards': motherboards,
+        **await catalog_page(request, 'motherboard', motherboards, filters),
         'socket_choices': Motherboard.SOCKET_CHOICES,
         'form_factor_choices': Motherboard.FORM_FACTOR_CHOICES,
-        'current_socket': socket,
-        'current_form_factor': form_factor,
-        'current_sort': sort,
+        'current_socket': filters['socket'],
+        'current_form_factor': filters['form_factor'],
+        'current_sort': filters['sort'],
     }
-    return render(request, 'builder/motherboard_list.html', context)
+    return await arender(request, 'builder/motherboard_list.html', context)
 
 
-def ram_list(request):
+async def ram_list(request):
     """Список оперативной памяти"""
-    rams = RAM.objects.all()
-    
-    memory_type = request.GET.get('memory_type')
-    capacity = request.GET.get('capacity')
-    sort = request.GET.get('sort', '-capacity')
-    
-    if memory_type:
-        rams = rams.filter(memory_type=memory_type)
-    if capacity:
-        rams = rams.filter(capacity=capacity)
-    
-    if sort in ['avg_used_price', '-avg_used_price', 'capacity', '-capacity', 'speed', '-speed']:
-        rams = rams.order_by(sort)
+    rams, filters = filtered_catalog('ram', request.GET)
     
     context = {
-        'rams': rams,
+        **await catalog_page(request, 'ram', rams, filters),
         'memory_type_choices': RAM.MEMORY_TYPE_CHOICES,
-        'current_memory_type': memory_type,
-        'current_sort': sort,
+        'current_memory_type': filters['memory_type'],
+        'current_sort': filters['sort'],
     }
-    return render(request, 'builder/ram_list.html', context)
+    return await arender(request, 'builder/ram_list.html', context)
 
 
-def psu_list(request):
+async def psu_list(request):
     """Список блоков питания"""
-    psus = PSU.objects.all()
-    
-    efficiency = request.GET.get('efficiency')
-    min_wattage = request.GET.get('min_wattage')
-    sort = request.GET.get('sort', '-wattage')
-    
-    if efficiency:
-        psus = psus.filter(efficiency=efficiency)
-    if min_wattage:
-        psus = psus.filter(wattage__gte=min_wattage)
-    
-    if sort in ['avg_used_price', '-avg_used_price', 'wattage', '-wattage']:
-        psus = psus.order_by(sort)
+    psus, filters = filtered_catalog('psu', request.GET)
     
     context = {
-        'psus': psus,
+        **await catalog_page(request, 'psu', psus, filters),
         'efficiency_choices': PSU.EFFICIENCY_CHOICES,
-        'current_efficiency': efficiency,
-        'current_sort': sort,
+        'current_efficiency': filters['efficiency'],
+        'current_sort': filters['sort'],
     }
-    return render(request, 'builder/psu_list.html', context)
+    return await arender(request, 'builder/psu_list.html', context)
 
 
-def case_list(request):
+async def case_list(request):
     """Список корпусов"""
-    cases = Case.objects.all()
-    
-    form_factor = request.GET.get('form_factor')
-    sort = request.GET.get('sort', 'name')
-    
-    if form_factor:
-        cases = cases.filter(form_factor=form_factor)
-    
-    if sort in ['avg_used_price', '-avg_used_price', 'name', 'max_gpu_length']:
-        cases = cases.order_by(sort)
+    cases, filters = filtered_catalog('case', request.GET)
     
     context = {
-        'cases': cases,
+        **await catalog_page(request, 'case', cases, filters),
         'form_factor_choices': Case.FORM_FACTOR_CHOICES,
-        'current_form_factor': form_factor,
-        'current_sort': sort,
+        'current_form_factor': filters['form_factor'],
+        'current_sort': filters['sort'],
     }
-    return render(request, 'builder/case_list.html', context)
+    return await arender(request, 'builder/case_list.html', context)
 
 
 # ==================== СБОРКИ ====================
 
+BUILDS_PER_PAGE = 12
+
+
+@query_budget(4)
 def build_list(request):
     """Список публичных сборок"""
     builds = Build.objects.filter(is_public=True).select_related(
         'user', 'cpu', 'gpu', 'motherboard', 'ram', 'psu', 'case'
     )
-    return render(request, 'builder/build_list.html', {'builds': builds})
+    
+    # Сортировка по денормализованным итогам идёт по индексам в БД
+    sort = request.GET.get('sort', '-created_at')
+    if sort in ['-created_at', 'total_price', '-total_price', '-benchmark_score', 'total_tdp']:
+        builds = builds.order_by(sort, '-pk')
+    
+    # Флаги совместимости хранятся в сборке — фильтр без проверки каждой строки в Python
+    only_compatible = request.GET.get('compatible') == '1'
+    if only_compatible:
+        builds = compatible_builds(builds)
+    
+    page = Paginator(builds, BUILDS_PER_PAGE).get_page(request.GET.get('page'))
+    context = {
+        'builds': page,
+        'page': page,
+        'current_sort': sort,
+        'only_compatible': only_compatible,
+    }
+    return render(request, 'builder/build_list.html', context)
 
 
-def build_detail(request, pk):
+@query_budget(3)
+async def build_detail(request, pk):
     """Детальная страница сборки"""
-    build = get_object_or_404(Build, pk=pk)
+    loaded = await arequest_build(request, pk)
+    if loaded is None:
+        raise Http404('Сборка не найдена')
+    
+    # Пользователь загружается асинхронно; его же потом читает шаблон
+    request.user = await request.auser()
     
     # Проверка доступа (приватные сборки видит только владелец)
-    if not build.is_public and build.user != request.user:
+    if not loaded.visible_to(request.user):
         messages.error(request, 'Эта сборка приватная.')
         return redirect('build_list')
     
-    # Проверка совместимости
-    compatibility_errors = check_compatibility(build)
-    
-    # График распределения бюджета
-    budget_chart = generate_budget_chart(build)
+    async def render_body():
+        # Компоненты загружены вместе со сборкой: шаблон не обращается к БД
+        context = {
+            'build': loaded.build,
+            'compatibility_errors': loaded.compatibility,
+            'total_price': loaded.total_price,
+            'total_tdp': loaded.total_tdp,
+            'recommended_psu': loaded.recommended_psu,
+        }
+        # График распределения бюджета: HTML с сервера или спецификация для plotly.js
+        if client_side_charts():
+            context['budget_chart_spec'] = loaded.chart_spec
+        elif loaded.budget_items:
+            # plotly строит HTML долго — не в цикле событий
+            context['budget_chart'] = await sync_to_async(render_budget_chart)(loaded.budget_items)
+        else:
+            context['budget_chart'] = None
+        return render_to_string('builder/fragments/build_detail_body.html', context)
     
     context = {
-        'build': build,
-        'compatibility_errors': compatibility_errors,
-        'budget_chart': budget_chart,
-        'total_price': build.get_total_price(),
-        'total_tdp': build.get_total_tdp(),
-        'recommended_psu': build.get_recommended_psu_wattage(),
+        'build': loaded.build,
+        'body_html': await acached_fragment(build_fragment_key(loaded.build), render_body),
     }
-    return render(request, 'builder/build_detail.html', context)
+    return await arender(request, 'builder/build_detail.html', context)
+
+
+def build_chart_data(request, pk):
+    """Данные графика бюджета в JSON для отрисовки на клиенте"""
+    loaded = request_build(request, pk)
+    if loaded is None:
+        raise Http404('Сборка не найдена')
+    if not loaded.visible_to(request.user):
+        return JsonResponse({'error': 'Эта сборка приватная.'}, status=403)
+    return JsonResponse(loaded.chart_spec or {})
+
+
+def price_history_data(request, slot, pk):
+    """Недельные (или дневные, ?period=day) агрегаты цены детали в JSON"""
+    if slot not in CATALOG_SLOTS:
+        raise Http404('Неизвестный тип комплектующих')
+    get_object_or_404(CATALOG_FIELDS[slot][0], pk=pk)
+    period = request.GET.get('period', 'week')
+    if period not in ('day', 'week'):
+        period = 'week'
+    return JsonResponse({'period': period, 'history': price_history(slot, pk, period)})
 
 
 @login_required
@@ -249,11 +287,70 @@ def build_create(request):
             messages.success(request, f'Сборка "{build.name}" успешно создана!')
             return redirect('build_detail', pk=build.pk)
     else:
-        form = BuildForm()
+        # Компоненты могут прийти из автоподбора (?cpu=1&gpu=2...)
+        initial = {slot: request.GET[slot] for slot in Build.COMPONENT_FIELDS if slot in request.GET}
+        form = BuildForm(initial=initial)
     
     return render(request, 'builder/build_form.html', {'form': form, 'title': 'Новая сборка'})
 
 
+def build_compare(request):
+    """Сравнение нескольких сборок: таблица и сгруппированная диаграмма"""
+    # numpy нужен только сравнению — импорт откладывается до первого запроса
+    from .comparison import BuildComparison, load_builds, parse_build_ids
+    
+    comparison = BuildComparison(load_builds(parse_build_ids(request.GET), request.user))
+    if len(comparison) < 2:
+        messages.info(request, 'Отметьте хотя бы две сборки для сравнения.')
+    rows = comparison.rows()
+    context = {
+        'rows': rows,
+        'comparison_chart_spec': comparison_chart_spec(rows) if rows else None,
+    }
+    return render(request, 'builder/build_compare.html', context)
+
+
+def auto_build(request):
+    """Автоподбор лучшей совместимой сборки под бюджет"""
+    budget = request.GET.get('budget')
+    build = None
+    
+    if budget:
+        try:
+            budget = int(budget)
+        except ValueError:
+            budget = None
+            messages.error(request, 'Бюджет должен быть целым числом.')
+    
+    if budget:
+        # numpy нужен только автоподбору — импорт откладывается до первого запроса
+        from .configurator import find_best_build
+        build = find_best_build(budget)
+        if build is None:
+            messages.warning(request, 'В этот бюджет не удалось собрать совместимый ПК.')
+    
+    context = {
+        'budget': budget,
+        'build': build,
+    }
+    if build is not None:
+        context.update({
+            'compatibility_errors': check_compatibility(build),
+            'total_price': build.get_total_price(),
+            'total_tdp': build.get_total_tdp(),
+            'recommended_psu': build.get_recommended_psu_wattage(),
+            'benchmark_score': build.get_benchmark_score(),
+            'components': [
+                (Build._meta.get_field(slot).verbose_name, getattr(build, slot))
+                for slot in Build.COMPONENT_FIELDS
+            ],
+            'create_query': urlencode({
+                slot: getattr(build, f'{slot}_id') for slot in Build.COMPONENT_FIELDS
+            }),
+        })
+    return render(request, 'builder/auto_build.html', context)
+
+
 @login_required
 def build_edit(request, pk):
     """Редактирование сборки"""
@@ -288,9 +385,18 @@ def build_delete(request, pk):
 @login_required
 def my_builds(request):
     """Мои сборки (личный кабинет)"""
-    builds = Build.objects.filter(user=request.user).select_related(
+    from .upgrades import advise_upgrades, best_upgrade, suggested_components
+
+    builds = list(Build.objects.filter(user=request.user).select_related(
         'cpu', 'gpu', 'motherboard', 'ram', 'psu', 'case'
-    )
+    ))
+    # Советы по апгрейду — пакетом для всех сборок пользователя
+    advice = advise_upgrades(Build.objects.filter(pk__in=[build.pk for build in builds]))
+    components = suggested_components(advice)
+    for build in builds:
+        upgrade = best_upgrade(advice.get(build.pk, {}))
+        build.upgrade = upgrade
+        build.upgrade_component = components.get((upgrade.slot, upgrade.pk)) if upgrade else None
     return render(request, 'builder/my_builds.html', {'builds': builds})
 
 
@@ -313,104 +419,61 @@ def register(request):
 
 # ==================== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ====================
 
-def check_compatibility(build):
-    """Проверка совместимости компонентов"""
-    errors = []
-    
-    # CPU + Motherboard (сокет)
-    if build.cpu and build.motherboard:
-        if build.cpu.socket != build.motherboard.socket:
-            errors.append({
-                'type': 'error',
-                'message': f'Сокет процессора ({build.cpu.socket}) не совместим с материнской платой ({build.motherboard.socket})'
-            })
-    
-    # RAM + Motherboard (тип памяти)
-    if build.ram and build.motherboard:
-        if build.ram.memory_type != build.motherboard.memory_type:
-            errors.append({
-                'type': 'error',
-                'message': f'Тип памяти ({build.ram.memory_type}) не поддерживается материнской платой ({build.motherboard.memory_type})'
-            })
-    
-    # GPU + Case (длина)
-    if build.gpu and build.case:
-        if build.gpu.length > build.case.max_gpu_length:
-            errors.append({
-                'type': 'error',
-                'message': f'Видеокарта ({build.gpu.length}мм) не поместится в корпус (макс. {build.case.max_gpu_length}мм)'
-            })
-    
-    # Motherboard + Case (форм-фактор)
-    if build.motherboard and build.case:
-        mb_ff = build.motherboard.form_factor
-        case_ff = build.case.form_factor
-        # ATX корпус поддерживает ATX, mATX, ITX
-        # mATX корпус поддерживает mATX, ITX
-        # ITX корпус поддерживает только ITX
-        compatible = False
-        if case_ff == 'ATX':
-            compatible = True
-        elif case_ff == 'mATX' and mb_ff in ['mATX', 'ITX']:
-            compatible = True
-        elif case_ff == 'ITX' and mb_ff == 'ITX':
-            compatible = True
-        
-        if not compatible:
-            errors.append({
-                'type': 'error',
-                'message': f'Материнская плата ({mb_ff}) не подходит для корпуса ({case_ff})'
-            })
-    
-    # PSU (мощность)
-    if build.psu:
-        recommended = build.get_recommended_psu_wattage()
-        if build.psu.wattage < recommended:
-            errors.append({
-                'type': 'warning',
-                'message': f'Мощности БП ({build.psu.wattage}Вт) может не хватить. Рекомендуется: {recommended}Вт'
-            })
-    
-    return errors
+async def arender(request, template_name, context):
+    """render для async view.
 
+    Базовый шаблон читает пользователя и сообщения из сессии обычным
+    (синхронным) ORM, поэтому рендер идёт в потоке для синхронного кода.
+    """
+    return await sync_to_async(render)(request, template_name, context)
 
-def generate_budget_chart(build):
-    """Генерация графика распределения бюджета (Plotly)"""
-    import plotly.graph_objects as go
-    
-    labels = []
-    values = []
-    
-    components = [
-        ('Процессор', build.cpu),
-        ('Видеокарта', build.gpu),
-        ('Мат. плата', build.motherboard),
-        ('RAM', build.ram),
-        ('Блок питания', build.psu),
-        ('Корпус', build.case),
-    ]
-    
-    for label, component in components:
-        if component and component.avg_used_price:
-            labels.append(label)
-            values.append(float(component.avg_used_price))
-    
-    if not values:
-        return None
-    
-    fig = go.Figure(data=[go.Pie(
-        labels=labels,
-        values=values,
-        hole=0.4,
-        textinfo='label+percent',
-        marker=dict(colors=['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40'])
-    )])
-    
-    fig.update_layout(
-        title='Распределение бюджета',
-        showlegend=True,
-        height=400,
-        margin=dict(t=50, b=50, l=50, r=50)
+
+async def catalog_page(request, slot, queryset, filters):
+    """Отрендеренный список и фасеты страницы каталога (считаются одновременно)"""
+    items_html, facets = await asyncio.gather(
+        catalog_items_html(request, slot, queryset, filters),
+        facet_links(slot, filters),
     )
+    return {'items_html': items_html, 'facets': facets}
+
+
+async def catalog_items_html(request, slot, queryset, filters):
+    """Отрендеренная страница списка каталога (из кэша, если фильтры уже встречались)"""
+    cursor = request.GET.get('cursor')
     
-    return fig.to_html(full_html=False, include_plotlyjs=False)
\ No newline at end of file
+    async def render_items():
+        page = await akeyset_paginate(queryset, filters['sort'], cursor)
+        context = {f'{slot}s': page, **page_links(filters, page)}
+        return render_to_string(f'builder/fragments/{slot}_items.html', context)
+    
+    key = await acatalog_fragment_key(slot, cursor=cursor, **filters)
+    return await acached_fragment(key, render_items)
+
+
+async def facet_links(slot, filters):
+    """Фасеты с query string для переключения каждого значения"""
+    facets = await acatalog_facets(slot, filters)
+    current = {name: value for name, value in filters.items() if value is not None}
+    for facet in facets:
+        for item in facet['values']:
+            if facet['param'] == 'price':
+                price = {'min_price': None, 'max_price': None, 'price_below': None}
+                changes = price if item['selected'] else {**price, **item['value']}
+            else:
+                changes = {facet['param']: None if item['selected'] else item['value']}
+            params = {**current, **changes}
+            item['query'] = urlencode({name: value for name, value in params.items() if value is not None})
+    return facets
+
+
+def metrics(request):
+    """Метрики запросов в формате Prometheus"""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS and not request.user.is_staff:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def price_chart(component):
+    """График истории цены детали (None, если наблюдений ещё нет)"""
+    history = price_history(SLOT_BY_MODEL[type(component)], component.pk)
+    return price_history_chart_spec(history) if history else None
@@ -0,0 +1,38 @@
+"""Прогрев тяжёлых зависимостей до форка воркеров.
+
+plotly и numpy импортируются лениво — в тех функциях, которым они нужны,
+поэтому холодный старт воркера их не ждёт. Если сервер загружает
+приложение в мастер-процессе и потом форкает воркеры (gunicorn --preload,
+uWSGI без lazy-apps), можно выставить BUILDER_PRELOAD=1: config/wsgi.py
+вызовет warm_up(), модули загрузятся один раз, а воркеры получат их
+страницы памяти через copy-on-write.
+"""
+import importlib
+import os
+
+
+HEAVY_MODULES = [
+    'numpy',
+    'pandas',
+    'plotly.graph_objects',
+    'plotly.io',
+]
+
+
+def preload_requested():
+    return os.environ.get('BUILDER_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+
+def warm_up():
+    """Импорт тяжёлых модулей и один пробный рендер графика"""
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+    # Валидаторы и шаблоны plotly подгружаются при первом построении фигуры
+    from .charts import budget_chart_spec, render_budget_chart
+    render_budget_chart.__wrapped__((('warm-up', 1.0),))
+    budget_chart_spec(())
+
+    # URLConf тянет за собой все представления
+    from django.urls import get_resolver
+    get_resolver().url_patterns
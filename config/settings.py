@@ -28,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: время ответа и SQL считаются с учётом остальных middleware
+    'builder.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,7 +43,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + учёт времени рендера в метриках (builder/metrics.py)
+        'BACKEND': 'builder.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # Добавляем папку templates
         'APP_DIRS': True,
         'OPTIONS': {
@@ -67,6 +70,46 @@ DATABASES = {
 }
 
 
+# Cache
+# Фрагменты страниц хранятся без TTL и инвалидируются сигналами (builder/cache.py).
+# Для нескольких воркеров нужен общий бэкенд (FileBasedCache, Redis).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pc-builder',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+# График бюджета сборки: 'html' — рендер plotly на сервере (с кэшем),
+# 'json' — сервер отдаёт только data/layout, рисует plotly.js в браузере
+BUDGET_CHART_MODE = 'html'
+
+
+# Метрики запросов (builder/metrics.py): /metrics/ доступен с этих адресов
+# и сотрудникам; строки JSON по каждому запросу пишутся в лог builder.metrics
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'builder.metrics': {
+            'handlers': ['console'],
+            # WARNING — только превышения бюджета, INFO — строка на каждый запрос
+            'level': os.environ.get('BUILDER_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
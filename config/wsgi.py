@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Прогрев plotly/numpy в мастер-процессе перед форком воркеров (builder/warmup.py)
+from builder.warmup import preload_requested, warm_up  # noqa: E402
+
+if preload_requested():
+    warm_up()